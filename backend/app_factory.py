@@ -7,16 +7,20 @@ from backend.routes.admin import admin_bp
 from backend.routes.draft import draft_bp  # Consolidated draft logic here
 from backend.routes.auth import auth_bp
 from backend.routes.home import home_bp
-from backend.utils.data_manager import ensure_data_dir_exists
+from backend.models.access_code import require_access_code_key
+from backend.utils.data_manager import ensure_data_dir_exists, migrate_legacy_players
 from backend.routes.invite import invite_bp
 from backend.routes.settings import settings_bp
 from backend.routes.api import api_bp
+from backend.utils.draft_scheduler import draft_scheduler
 
 
 load_dotenv()
 
 def create_app():
+    require_access_code_key() # Fail now rather than on the first login
     ensure_data_dir_exists() # Ensure data directory exists on startup
+    migrate_legacy_players() # Before any request can load the roster
 
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     # Assuming 'frontend' is at the same level as 'backend' in the project root
@@ -43,6 +47,9 @@ def create_app():
 
     # Removed captains_bp registration
 
+    # Auto-picks for captains who let a timed pick run out
+    draft_scheduler.start()
+
     # You might want to add context processors here later
     # Example: To make 'is_admin' available globally in templates
     # @app.context_processor
@@ -0,0 +1,37 @@
+# backend/models/access_code.py
+# Player access codes are never stored: only an HMAC-SHA256 of the normalised code,
+# keyed with ACCESS_CODE_KEY. That key is required and deliberately separate from
+# SECRET_KEY, so rotating the session key doesn't lock every player out; changing
+# ACCESS_CODE_KEY itself invalidates every stored code. Codes are matched
+# case-insensitively ("abc123" logs in as "ABC123").
+import hashlib
+import hmac
+import os
+import uuid
+
+
+def new_access_code():
+    """A fresh six-character uppercase code."""
+    return str(uuid.uuid4())[:6].upper()
+
+def normalise_code(code):
+    return (code or '').strip().upper()
+
+def require_access_code_key():
+    """The ACCESS_CODE_KEY setting; create_app calls this so a missing key stops startup."""
+    key = os.getenv('ACCESS_CODE_KEY')
+    if not key:
+        raise RuntimeError("ACCESS_CODE_KEY is not set. Access codes are hashed with it: set it "
+                           "(e.g. in .env) to a long random string and keep it stable.")
+    return key
+
+def _key():
+    return require_access_code_key().encode('utf-8')
+
+def hash_access_code(code):
+    """Hex digest stored in place of the code. Deterministic, so it can be indexed."""
+    return hmac.new(_key(), normalise_code(code).encode('utf-8'), hashlib.sha256).hexdigest()
+
+def codes_match(stored_hash, code):
+    """Constant-time check of a typed code against a stored hash."""
+    return bool(stored_hash) and hmac.compare_digest(stored_hash, hash_access_code(code))
@@ -1,8 +1,12 @@
 # backend/models/performance.py
 
+import threading
+from array import array
 from datetime import datetime
 
 class PerformanceLog:
+    __slots__ = ('goals', 'assists', 'tackles', 'saves', 'rating', 'match_id')
+
     def __init__(self, goals=0, assists=0, tackles=0, saves=0, rating=0, match_id=None):
         self.goals = goals
         self.assists = assists
@@ -32,6 +36,167 @@ class PerformanceLog:
             match_id=data.get("match_id")
         )
 
+
+class _MatchIdTable:
+    """Process-wide interning of match ids: every history stores a small int per log
+    and the (few) distinct id strings are kept once."""
+
+    def __init__(self):
+        self.ids = []
+        self._refs = {}
+        self._lock = threading.Lock()
+
+    def ref(self, match_id):
+        ref = self._refs.get(match_id)
+        if ref is None:
+            with self._lock:
+                ref = self._refs.get(match_id)
+                if ref is None:
+                    ref = len(self.ids)
+                    self.ids.append(match_id)
+                    self._refs[match_id] = ref
+        return ref
+
+MATCH_IDS = _MatchIdTable()
+
+# (attribute, log field, array typecode, the only type stored in the array)
+_COLUMNS = (('goals', 'goals', 'i', int), ('assists', 'assists', 'i', int), ('tackles', 'tackles', 'i', int),
+            ('saves', 'saves', 'i', int), ('ratings', 'rating', 'd', float))
+
+
+class MatchHistory:
+    """A player's PerformanceLogs stored column by column: parallel int/float arrays
+    for the stats and interned match ids, instead of one Python object per match.
+
+    Behaves like the list it replaces (len, iteration, indexing, slicing, append);
+    indexing builds a PerformanceLog on the fly, so treat those as read-only and
+    log new matches with append(). A column that meets a value its array type
+    can't hold exactly (an int rating, a missing stat) falls back to a plain list,
+    so to_dicts() always returns what was put in.
+    """
+    __slots__ = ('goals', 'assists', 'tackles', 'saves', 'ratings', '_match_refs')
+
+    def __init__(self, logs=()):
+        for name, _, typecode, _ in _COLUMNS:
+            setattr(self, name, array(typecode))
+        self._match_refs = array('i')
+        for log in logs:
+            self.append(log)
+
+    @classmethod
+    def from_dicts(cls, logs):
+        """Builds a history from stored log dicts without creating PerformanceLogs."""
+        logs = [data for data in logs if isinstance(data, dict)]
+        history = cls.__new__(cls)
+        for name, key, typecode, exact_type in _COLUMNS:
+            values = [data.get(key, 0) for data in logs]
+            column = values
+            if all(type(value) is exact_type for value in values):
+                try:
+                    column = array(typecode, values)
+                except OverflowError:
+                    pass
+            setattr(history, name, column)
+        history._match_refs = array('i', [MATCH_IDS.ref(data.get("match_id") or datetime.now().isoformat())
+                                          for data in logs])
+        return history
+
+    def append(self, log):
+        self._append(log.goals, log.assists, log.tackles, log.saves, log.rating, log.match_id)
+
+    def extend(self, logs):
+        for log in logs:
+            self.append(log)
+
+    def _append(self, *values):
+        for (name, _, _, exact_type), value in zip(_COLUMNS, values):
+            column = getattr(self, name)
+            if type(column) is array:
+                if type(value) is exact_type:
+                    try:
+                        column.append(value)
+                        continue
+                    except OverflowError:
+                        pass
+                column = list(column)
+                setattr(self, name, column)
+            column.append(value)
+        self._match_refs.append(MATCH_IDS.ref(values[-1]))
+
+    def _log(self, i):
+        log = PerformanceLog.__new__(PerformanceLog)
+        log.goals = self.goals[i]
+        log.assists = self.assists[i]
+        log.tackles = self.tackles[i]
+        log.saves = self.saves[i]
+        log.rating = self.ratings[i]
+        log.match_id = MATCH_IDS.ids[self._match_refs[i]]
+        return log
+
+    @property
+    def match_ids(self):
+        ids = MATCH_IDS.ids
+        return [ids[ref] for ref in self._match_refs]
+
+    def __len__(self):
+        return len(self._match_refs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._log(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("match history index out of range")
+        return self._log(index)
+
+    def __iter__(self):
+        return (self._log(i) for i in range(len(self)))
+
+    def __eq__(self, other):
+        if not isinstance(other, MatchHistory):
+            return NotImplemented
+        return all(_same(getattr(self, name), getattr(other, name))
+                   for name in ('_match_refs', 'ratings', 'goals', 'assists', 'tackles', 'saves'))
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"MatchHistory({len(self)} matches)"
+
+    def copy(self):
+        clone = MatchHistory.__new__(MatchHistory)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name)[:])
+        return clone
+
+    def to_dicts(self):
+        ids = MATCH_IDS.ids
+        return [{
+            "goals": goals, "assists": assists, "tackles": tackles, "saves": saves,
+            "rating": rating, "match_id": ids[ref],
+        } for goals, assists, tackles, saves, rating, ref
+            in zip(self.goals, self.assists, self.tackles, self.saves, self.ratings, self._match_refs)]
+
+
+def _same(a, b):
+    return a == b if type(a) is type(b) else list(a) == list(b)
+
+
+FALLBACK_POSITIONS = ("GK", "DEF", "MID", "ATT")
+
+def fallback_scores(last):
+    """How well a player's last match fits each position; used to fill a position
+    quota when nobody who plays there is available."""
+    if not last:
+        return dict.fromkeys(FALLBACK_POSITIONS, 0)
+    return {
+        "GK": last.saves + 0.5 * last.rating,
+        "DEF": last.tackles + 0.5 * last.rating,
+        "MID": last.rating,  # general all-rounder
+        "ATT": last.goals + last.assists + 0.5 * last.rating,
+    }
+
 def update_skill_rating(current_rating, match_history):
     if not match_history:
         return current_rating
@@ -1,6 +1,17 @@
 # backend/models/player.py
+import copy
 import uuid
-from backend.models.performance import update_skill_rating, recent_form, PerformanceLog
+from collections import Counter, deque
+from backend.models.performance import PerformanceLog, MatchHistory, fallback_scores
+from backend.models.access_code import new_access_code, hash_access_code, codes_match
+from backend.models.ratings import FORM_WINDOW, SKILL_WINDOW
+
+# How often each memoised value (form, skill_update, rating_diff) has been
+# recomputed in this process; reported by /api/cache/players.
+recompute_counts = Counter()
+
+# Sub-collections Player.from_dict leaves undecoded until first accessed
+LAZY_FIELDS = ('match_history', 'ratings_received', 'players_player_ratings')
 
 
 class Player:
@@ -19,16 +30,19 @@ class Player:
         preferred_locations=None,
         is_captain=False,
         match_history=None,
-        access_code=None,
+        access_code=None, # Plain code for a new player; only its hash is kept
+        access_code_hash=None,
         ratings_received=None,
-        notifications=None,
-        inbox=None, # Explicitly added inbox
         players_player_ratings=None # Explicitly added players_player_ratings
         
     ):
         self.id = player_id or str(uuid.uuid4())
         self.name = name
         self.position = position.upper() # Store position consistently
+        # Derived values cached until update_performance() or a skill_rating change
+        self._memo = {}
+        # Stored values of LAZY_FIELDS not decoded yet; shared between copies, never mutated
+        self._raw = {}
         self.skill_rating = skill_rating
         self.age = age # Store age
         self.available = available
@@ -37,42 +51,208 @@ class Player:
         self.preferred_days = preferred_days
         self.preferred_times = preferred_times
         self.preferred_locations = preferred_locations
-        self.access_code = access_code or str(uuid.uuid4())[:6].upper() # Ensure unique code is generated if None
+        # A player created without a code gets a random one; set_access_code() issues a known one
+        self.access_code_hash = access_code_hash or hash_access_code(access_code or new_access_code())
         self.is_captain = is_captain
         self.match_history = match_history or []
         # Ensure lists are initialized properly if None
         self.ratings_received = ratings_received if ratings_received is not None else []
-        self.notifications = notifications if notifications is not None else []
-        self.inbox = inbox if inbox is not None else []
         self.players_player_ratings = players_player_ratings if players_player_ratings is not None else []
 
-        # Attribute for calculating rating difference in views
-        self.rating_diff = 0
-        self._calculate_rating_diff()
+        # Notifications live in the notification store, not on the player record.
+        # Changes are queued here and appended when the player is saved.
+        self._notification_ops = []
+
+    # --- Lazily decoded sub-collections ---
+    # from_dict keeps the stored lists as they are and only builds the MatchHistory
+    # (or private copies of the rating dicts) when something reads them, so a
+    # request that only needs name, position and rating never pays for them.
+
+    def _defer(self, field, raw):
+        """Leaves `field` undecoded, backed by the stored value `raw`."""
+        if not raw:
+            setattr(self, field, [])
+            return
+        if field == 'match_history':
+            self._match_history = None
+            self._recent = None
+            self._memo.clear()
+        else:
+            setattr(self, '_' + field, None)
+        self._raw[field] = raw
+
+    def is_loaded(self, field):
+        return field not in self._raw
+
+    @property
+    def match_history(self):
+        if self._match_history is None:
+            self._match_history = MatchHistory.from_dicts(self._raw.get('match_history', ()))
+            self._raw.pop('match_history', None)
+        return self._match_history
+
+    @match_history.setter
+    def match_history(self, history):
+        if not isinstance(history, MatchHistory):
+            history = MatchHistory(history)
+        self._raw.pop('match_history', None)
+        self._match_history = history
+        self._recent = deque(history.ratings[-SKILL_WINDOW:], maxlen=SKILL_WINDOW)
+        self._memo.clear()
+
+    def _decoded_list(self, field):
+        value = getattr(self, '_' + field)
+        if value is None:
+            value = [dict(r) if isinstance(r, dict) else r for r in self._raw.get(field, ())]
+            setattr(self, '_' + field, value)
+            self._raw.pop(field, None)
+        return value
+
+    @property
+    def ratings_received(self):
+        return self._decoded_list('ratings_received')
+
+    @ratings_received.setter
+    def ratings_received(self, value):
+        self._raw.pop('ratings_received', None)
+        self._ratings_received = value
+
+    @property
+    def players_player_ratings(self):
+        return self._decoded_list('players_player_ratings')
+
+    @players_player_ratings.setter
+    def players_player_ratings(self, value):
+        self._raw.pop('players_player_ratings', None)
+        self._players_player_ratings = value
+
+    # --- Ratings (memoised) ---
+    # _window() holds the last SKILL_WINDOW ratings, so logging a match is O(1) and
+    # no value below needs to walk match_history. Append performances through
+    # update_performance() or assign a new list; both keep the window in step.
+
+    def _window(self):
+        if self._recent is None:
+            if self._match_history is None:
+                # Still undecoded: read just the tail of the stored logs
+                tail = []
+                for log in reversed(self._raw.get('match_history', ())):
+                    if isinstance(log, dict):
+                        tail.append(log.get('rating', 0))
+                        if len(tail) == SKILL_WINDOW:
+                            break
+                tail.reverse()
+            else:
+                tail = self._match_history.ratings[-SKILL_WINDOW:]
+            self._recent = deque(tail, maxlen=SKILL_WINDOW)
+        return self._recent
+
+    @property
+    def skill_rating(self):
+        return self._skill_rating
+
+    @skill_rating.setter
+    def skill_rating(self, value):
+        if self.__dict__.get('_skill_rating') != value:
+            self._memo.pop('form', None) # Form falls back to the skill rating
+            self._memo.pop('skill_update', None)
+        self._skill_rating = value
+
+    @property
+    def rating_diff(self):
+        """Difference between the last two match ratings (0 with fewer than two)."""
+        if 'rating_diff' not in self._memo:
+            self._calculate_rating_diff()
+        return self._memo['rating_diff']
 
     def _calculate_rating_diff(self):
         """Helper to calculate rating difference from last two matches."""
-        if len(self.match_history) >= 2:
-            last = self.match_history[-1].rating
-            second_last = self.match_history[-2].rating
-            self.rating_diff = round(last - second_last, 2)
+        recompute_counts['rating_diff'] += 1
+        recent = self._window()
+        if len(recent) >= 2:
+            self._memo['rating_diff'] = round(recent[-1] - recent[-2], 2)
         else:
-            self.rating_diff = 0
+            self._memo['rating_diff'] = 0
 
     def update_performance(self, performance: PerformanceLog):
+        recent = self._window()
         self.match_history.append(performance)
-        self._calculate_rating_diff() # Recalculate difference after adding performance
+        recent.append(performance.rating)
+        self._memo.clear() # Form, skill update and rating difference all move
+
+    def skill_update(self):
+        """The skill rating update_skill_rating() would set: 60% current skill, 40% the
+        mean of the last five ratings, rounded and clamped to 1-10."""
+        if 'skill_update' not in self._memo:
+            recompute_counts['skill_update'] += 1
+            recent = self._window()
+            if recent:
+                avg_rating = sum(recent) / len(recent)
+                new_rating = round((self._skill_rating * 0.6 + avg_rating * 0.4), 2)
+                self._memo['skill_update'] = max(1, min(10, new_rating))
+            else:
+                self._memo['skill_update'] = self._skill_rating
+        return self._memo['skill_update']
 
     def update_skill_rating(self):
         # Avoid mutation if no history
-        if not self.match_history:
+        if not self._window():
             return
-        self.skill_rating = update_skill_rating(self.skill_rating, self.match_history)
-        # Optionally, round the skill rating here if desired
-        # self.skill_rating = round(self.skill_rating, 2)
+        self.skill_rating = self.skill_update()
+
+    def fallback_score(self, position):
+        """Fit for `position` judged from the last match (0 without history)."""
+        if 'fallback' not in self._memo:
+            recompute_counts['fallback'] += 1
+            if self._match_history is not None:
+                last = self._match_history[-1] if self._match_history else None
+            else:
+                last = next((PerformanceLog.from_dict(log) for log in reversed(self._raw.get('match_history', ()))
+                             if isinstance(log, dict)), None)
+            self._memo['fallback'] = fallback_scores(last)
+        return self._memo['fallback'].get(position, 0)
+
+    def _match_count(self):
+        if 'matches' not in self._memo:
+            if self._match_history is not None:
+                self._memo['matches'] = len(self._match_history)
+            else:
+                self._memo['matches'] = sum(1 for log in self._raw.get('match_history', ()) if isinstance(log, dict))
+        return self._memo['matches']
+
+    def derived_stats(self):
+        """Values derived from the match history, saved with the player so a load can
+        pick them up instead of reading the history (checked by backend.utils.stats_check)."""
+        self.fallback_score(None) # Fills the cache
+        return {
+            'matches': self._match_count(),
+            'recent': list(self._window()),
+            'form': self.recent_form(),
+            'rating_diff': self.rating_diff,
+            'fallback': dict(self._memo['fallback']),
+        }
+
+    def _prime(self, stats):
+        """Seeds the ratings window and cached values from stored derived_stats()."""
+        self._recent = deque(stats['recent'], maxlen=SKILL_WINDOW)
+        self._memo['matches'] = stats['matches']
+        if isinstance(stats.get('fallback'), dict):
+            self._memo['fallback'] = dict(stats['fallback'])
+        if 'rating_diff' in stats:
+            self._memo['rating_diff'] = stats['rating_diff']
+        if stats['recent'] and 'form' in stats: # Without history form follows skill_rating
+            self._memo['form'] = stats['form']
 
     def recent_form(self):
-        return recent_form(self.match_history, self.skill_rating)
+        """Mean of the last three match ratings, or the skill rating without history."""
+        if 'form' not in self._memo:
+            recompute_counts['form'] += 1
+            if self._window():
+                recent = list(self._window())[-FORM_WINDOW:]
+                self._memo['form'] = sum(recent) / len(recent)
+            else:
+                self._memo['form'] = self._skill_rating
+        return self._memo['form']
 
     def has_rated_player(self, target_player, match_id):
         # This method checked 'ratings_received', which is for ratings *of* the target player.
@@ -83,18 +263,102 @@ class Player:
             for r in target_player.players_player_ratings # Check the correct list
         )
 
+    # --- Access code (stored hashed) ---
+    def set_access_code(self, code):
+        """Replaces the player's code. The plain code isn't kept; show it to them now."""
+        self.access_code_hash = hash_access_code(code)
+
+    def check_access_code(self, code):
+        return codes_match(self.access_code_hash, code)
+
+    # --- Notifications (backed by the notification store) ---
+    @property
+    def notifications(self):
+        """Messages since the last clear, oldest first. Read-only; use the methods below."""
+        from backend.utils.data_manager import get_notification_store
+        items = get_notification_store().notifications(self.id)
+        for op, data in self._notification_ops:
+            if op == 'add':
+                items.append(dict(data))
+            elif op == 'clear':
+                items = []
+            elif op == 'read':
+                for n in items:
+                    n['read'] = True
+        return items
+
+    @property
+    def inbox(self):
+        """Every message received, oldest first. Clearing notifications leaves it intact."""
+        from backend.utils.data_manager import get_notification_store
+        items = get_notification_store().inbox(self.id)
+        items.extend(dict(data) for op, data in self._notification_ops if op == 'add')
+        return items
+
+    @property
+    def notification_count(self):
+        """len(self.notifications), from the store's cursors when nothing is queued."""
+        if self._notification_ops:
+            return len(self.notifications)
+        from backend.utils.data_manager import get_notification_store
+        return get_notification_store().counts(self.id)['notifications']
+
     def add_notification(self, notification_data):
-        """Adds a notification and mirrors it to the inbox."""
+        """Adds a notification (it shows in both the notifications list and the inbox)."""
         # Ensure timestamp if not provided
         if "timestamp" not in notification_data:
             from datetime import datetime
             notification_data["timestamp"] = datetime.now().isoformat()
-        self.notifications.append(notification_data)
-        self.inbox.append(notification_data) # Mirror to inbox
+        self._notification_ops.append(('add', dict(notification_data)))
 
     def clear_notifications(self):
         """Clears only the notifications list, leaving inbox intact."""
-        self.notifications = []
+        self._notification_ops.append(('clear', None))
+
+    def mark_notifications_read(self):
+        """Marks every current notification as read."""
+        self._notification_ops.append(('read', None))
+
+    def take_notification_ops(self):
+        """Returns and forgets the queued notification changes (called when saving)."""
+        ops, self._notification_ops = self._notification_ops, []
+        return ops
+
+    def copy(self):
+        """Returns a copy whose lists (and the dicts inside them) can be mutated freely.
+        The match history columns are copied too; logs are never edited after being logged.
+        Fields that were never decoded stay undecoded and share the stored value."""
+        clone = copy.copy(self)
+        clone._raw = dict(self._raw)
+        if self._match_history is not None:
+            clone._match_history = self._match_history.copy()
+        if self._recent is not None:
+            clone._recent = deque(self._recent, maxlen=SKILL_WINDOW)
+        clone._memo = dict(self._memo) # Cached values carry over until the copy changes
+        for field in ('ratings_received', 'players_player_ratings'):
+            if self.is_loaded(field):
+                setattr(clone, field, [dict(r) if isinstance(r, dict) else r for r in getattr(self, field)])
+        clone._notification_ops = list(self._notification_ops)
+        return clone
+
+    def has_changes_from(self, original):
+        """True if this copy's stored record differs from the player it was copied from.
+        Cheap: match histories compare column arrays, everything else by value.
+        Queued notifications don't count; they are appended to their own store, and
+        neither do cached ratings, which are derived from the rest."""
+        mine, theirs = dict(vars(self)), dict(vars(original))
+        for transient in ('_notification_ops', '_memo', '_recent', '_raw') + tuple('_' + f for f in LAZY_FIELDS):
+            mine.pop(transient)
+            theirs.pop(transient)
+        if mine != theirs:
+            return True
+        for field in LAZY_FIELDS:
+            raw = self._raw.get(field)
+            if raw is not None and raw is original._raw.get(field):
+                continue # Neither side has decoded it, so neither changed it
+            if getattr(self, field) != getattr(original, field):
+                return True
+        return False
 
     def to_dict(self):
         return {
@@ -109,21 +373,21 @@ class Player:
             'preferred_days': self.preferred_days,
             'preferred_times': self.preferred_times,
             'preferred_locations': self.preferred_locations,
-            'access_code': self.access_code,
+            'access_code_hash': self.access_code_hash,
             'is_captain': self.is_captain,
-            'match_history': [p.to_dict() for p in self.match_history],
-            'ratings_received': self.ratings_received,
-            'notifications': self.notifications, # Use the property directly
-            'inbox': self.inbox, # Use the property directly
-            'players_player_ratings': self.players_player_ratings # Use the property
+            'match_history': self._stored_history(),
+            'ratings_received': self._raw.get('ratings_received', self._ratings_received),
+            'players_player_ratings': self._raw.get('players_player_ratings', self._players_player_ratings),
+            'stats': self.derived_stats()
         }
 
+    def _stored_history(self):
+        if self._match_history is None: # Normalise the stored logs without keeping the columns
+            return MatchHistory.from_dicts(self._raw.get('match_history', ())).to_dicts()
+        return self._match_history.to_dicts()
+
     @staticmethod
     def from_dict(data):
-        # Ensure match history is parsed correctly
-        match_history_data = data.get('match_history', [])
-        match_history = [PerformanceLog.from_dict(p) for p in match_history_data if isinstance(p, dict)]
-
         player = Player(
             name=data['name'],
             position=data.get('position', 'Unknown'), # Default position
@@ -136,13 +400,17 @@ class Player:
             preferred_days=data.get('preferred_days'),
             preferred_times=data.get('preferred_times'),
             preferred_locations=data.get('preferred_locations'),
-            access_code=data.get('access_code'),
+            access_code=data.get('access_code'), # Plain codes from older records are hashed here
+            access_code_hash=data.get('access_code_hash'),
             is_captain=data.get('is_captain', False),
-            match_history=match_history,
-            ratings_received=data.get('ratings_received'), # Let constructor handle None
-            notifications=data.get('notifications'), # Let constructor handle None
-            inbox=data.get('inbox'), # Let constructor handle None
-            players_player_ratings=data.get('players_player_ratings') # Let constructor handle None
         )
+        # Heavy lists are decoded on first access (match history straight into columns)
+        for field in LAZY_FIELDS:
+            player._defer(field, data.get(field))
+        # Stats saved with this exact history spare even reading its tail
+        stats, history = data.get('stats'), data.get('match_history')
+        if (isinstance(stats, dict) and isinstance(stats.get('recent'), list) and isinstance(history, list)
+                and stats.get('matches') == len(history)):
+            player._prime(stats)
         # Note: rating_diff is calculated dynamically, no need to load/save
         return player
\ No newline at end of file
@@ -0,0 +1,15 @@
+# backend/models/ratings.py
+# Rating windows shared by Player's memoised values and the stats check, and the
+# per-player form map the team generator, draft auto-picks and lineup search score by.
+#
+# Form comes from Player.recent_form(), which reads only the last few ratings
+# (the stored derived stats or the undecoded history's tail) and is memoised on
+# the player, so building the map never decodes a whole match history.
+
+FORM_WINDOW = 3   # recent_form() averages the last three ratings
+SKILL_WINDOW = 5  # update_skill_rating() averages the last five
+
+
+def form_by_id(players):
+    """{player id: recent_form()} for `players`."""
+    return {p.id: p.recent_form() for p in players}
@@ -0,0 +1,81 @@
+# backend/models/roster.py
+from collections import defaultdict
+
+from backend.models.access_code import hash_access_code
+
+
+class Roster(list):
+    """A list of Players with lookups by id, access code, name and position.
+
+    Still a plain list for iteration, slicing, len() and sorting. The indexes are
+    built together on the first lookup and dropped whenever players are added or
+    removed, so a lookup is O(1) after one O(n) pass. Changing a player's name,
+    code or position in place doesn't update them; call reindex() after doing so
+    if the same roster is queried again.
+    """
+
+    def __init__(self, players=()):
+        super().__init__(players)
+        self._indexes = None
+
+    def _index(self):
+        if self._indexes is None:
+            by_id, by_code = {}, {}
+            by_name, by_position = defaultdict(list), defaultdict(list)
+            for p in self:
+                by_id.setdefault(p.id, p) # First wins, as with a linear scan
+                if p.access_code_hash:
+                    by_code.setdefault(p.access_code_hash, p)
+                by_name[normalise_name(p.name)].append(p)
+                by_position[(p.position or '').upper()].append(p)
+            self._indexes = (by_id, by_code, by_name, by_position)
+        return self._indexes
+
+    def reindex(self):
+        self._indexes = None
+
+    def get(self, player_id, default=None):
+        """The player with this id, or `default`."""
+        return self._index()[0].get(player_id, default)
+
+    def has(self, player_id):
+        return player_id in self._index()[0]
+
+    def by_access_code(self, access_code):
+        """The player holding this (plain) code, or None."""
+        return self._index()[1].get(hash_access_code(access_code))
+
+    def by_name(self, name):
+        """Players whose stripped, lower-cased name matches."""
+        return list(self._index()[2].get(normalise_name(name), ()))
+
+    def by_position(self, position):
+        return list(self._index()[3].get((position or '').upper(), ()))
+
+    def ids(self):
+        """{id: player}; treat as read-only."""
+        return self._index()[0]
+
+    # Membership changes drop the indexes
+    def _changed(method):
+        def wrapper(self, *args, **kwargs):
+            self._indexes = None
+            return method(self, *args, **kwargs)
+        wrapper.__name__ = method.__name__
+        wrapper.__doc__ = method.__doc__
+        return wrapper
+
+    append = _changed(list.append)
+    extend = _changed(list.extend)
+    insert = _changed(list.insert)
+    remove = _changed(list.remove)
+    pop = _changed(list.pop)
+    clear = _changed(list.clear)
+    __setitem__ = _changed(list.__setitem__)
+    __delitem__ = _changed(list.__delitem__)
+    __iadd__ = _changed(list.__iadd__)
+    del _changed
+
+
+def normalise_name(name):
+    return (name or '').strip().lower()
@@ -2,13 +2,18 @@
 
 import os
 from datetime import datetime, timedelta
-from flask import Blueprint, render_template, redirect, url_for, request, session, flash
+from flask import Blueprint, render_template, redirect, url_for, request, session, flash, jsonify
 from backend.models.player import Player
 from backend.models.match import Match
 # Use the match manager functions for loading/saving Match objects
-from backend.utils.match_manager import load_matches, save_matches, get_match_by_id
-from backend.utils.data_manager import load_players, save_players, generate_unique_code, save_draft_state
-from backend.utils.team_generator import generate_balanced_teams
+from backend.utils.match_manager import get_match_by_id
+from backend.utils.data_manager import load_players, generate_unique_code, get_config_value
+from backend.utils.store import store
+from backend.utils.team_generator import balance_teams_for_match, DEFAULT_TIME_BUDGET, FALLBACK_WINDOW
+from backend.utils.lineup_search import top_lineups_for_match, DEFAULT_TOP_K
+from backend.utils.match_simulator import simulate_match, DEFAULT_SIMULATIONS
+from backend.utils.draft_engine import DraftError, new_draft_state
+from backend.utils.draft_helpers import announce_start, draft_settings
 from backend.utils.invite_manager import (generate_invite_link, generate_invite_code, get_all_invites, revoke_invite, validate_invite)
 
 
@@ -67,7 +72,6 @@ def generate_invite():
 @admin_required
 def add_player():
     if request.method == 'POST':
-        players = load_players()
         name = request.form.get('name', '').strip()
         position = request.form.get('position')
         age_str = request.form.get('age', '').strip()
@@ -84,27 +88,28 @@ def add_player():
             flash(f"Invalid age: {e}", "danger")
             return render_template('add_player.html')
 
-        # Consider adding checks for duplicate names
-        if any(p.name.lower() == name.lower() for p in players):
+        with store.transaction() as tx:
+            # Consider adding checks for duplicate names
+            duplicate = any(p.name.lower() == name.lower() for p in tx.players)
+            if not duplicate:
+                skill_rating = 5.0 # Default rating for new players
+                access_code = generate_unique_code()
+
+                player = Player(
+                    name=name,
+                    position=position,
+                    skill_rating=skill_rating,
+                    age=age, # Pass age here
+                    access_code=access_code
+                    # inbox/notifications/etc handled by default constructor
+                )
+                tx.add_player(player)
+
+        if duplicate:
             flash(f"Player with name '{name}' already exists.", "warning")
             return render_template('add_player.html', current_name=name, current_pos=position, current_age=age)
-
-        skill_rating = 5.0 # Default rating for new players
-        existing_codes = {p.access_code for p in players if p.access_code}
-        access_code = generate_unique_code(existing_codes)
-
-        player = Player(
-            name=name,
-            position=position,
-            skill_rating=skill_rating,
-            age=age, # Pass age here
-            access_code=access_code
-            # inbox/notifications/etc handled by default constructor
-        )
-
-        players.append(player)
-        save_players(players)
-        flash(f"Player '{player.name}' added successfully.", "success")
+        # Only the hash is stored, so this is the one time the code can be shown
+        flash(f"Player '{player.name}' added successfully. Access code: {access_code}", "success")
         return redirect(url_for('home_bp.index')) # Redirect to home/dashboard after adding
 
     return render_template('add_player.html')
@@ -112,99 +117,107 @@ def add_player():
 @admin_bp.route('/remove_player/<player_id>', methods=['POST'])
 @admin_required
 def remove_player(player_id):
-    players = load_players()
-    initial_length = len(players)
-    players = [p for p in players if p.id != player_id]
-
-    if len(players) < initial_length:
-        save_players(players)
+    with store.transaction() as tx:
+        removed = tx.remove_player(player_id)
+    if removed:
         flash("Player removed successfully.", "success")
     else:
         flash("Player not found.", "warning")
     return redirect(url_for('home_bp.index')) # Redirect to home/dashboard
 
+@admin_bp.route('/reset_code/<player_id>', methods=['POST'])
+@admin_required
+def reset_code(player_id):
+    # Codes are stored hashed, so a forgotten one can only be replaced
+    with store.transaction() as tx:
+        player = tx.player(player_id)
+        if not player:
+            flash("Player not found.", "warning")
+            return redirect(url_for('home_bp.index'))
+        access_code = generate_unique_code()
+        player.set_access_code(access_code)
+        flash(f"New access code for {player.name}: {access_code}", "success")
+    return redirect(url_for('home_bp.index'))
+
 @admin_bp.route('/assign_captain/<player_id>', methods=['POST'])
 @admin_required
 def assign_captain(player_id):
-    players = load_players()
-    target_player = next((p for p in players if p.id == player_id), None)
+    with store.transaction() as tx:
+        players = tx.players
+        target_player = tx.player(player_id)
 
-    if not target_player:
-        flash("Player not found.", "danger")
-        return redirect(url_for('home_bp.index'))
+        if not target_player:
+            flash("Player not found.", "danger")
+            return redirect(url_for('home_bp.index'))
 
-    captain_count = sum(1 for p in players if p.is_captain)
+        captain_count = sum(1 for p in players if p.is_captain)
 
-    if target_player.is_captain:
-        # Unassigning
-        target_player.is_captain = False
-        flash(f"{target_player.name} is no longer a captain.", "info")
-        # Optionally remove the captain notification (or leave it for history)
-    else:
-        # Assigning
-        if captain_count >= 2:
-            flash("Cannot assign more than two captains.", "warning")
-            return redirect(url_for('home_bp.index'))
-        target_player.is_captain = True
-        flash(f"{target_player.name} assigned as captain.", "success")
-        # Add notification and inbox message
-        message = {
-            "type": "captain_assignment",
-            "message": "You've been assigned as a captain! Access the draft via your player portal when it opens.",
-            "timestamp": datetime.now().isoformat()
-        }
-        target_player.add_notification(message) # Use helper method
-
-    save_players(players)
-    return redirect(url_for('home_bp.index'))
+        if target_player.is_captain:
+            # Unassigning
+            target_player.is_captain = False
+            flash(f"{target_player.name} is no longer a captain.", "info")
+            # Optionally remove the captain notification (or leave it for history)
+        else:
+            # Assigning
+            if captain_count >= 2:
+                flash("Cannot assign more than two captains.", "warning")
+                return redirect(url_for('home_bp.index'))
+            target_player.is_captain = True
+            flash(f"{target_player.name} assigned as captain.", "success")
+            # Add notification and inbox message
+            message = {
+                "type": "captain_assignment",
+                "message": "You've been assigned as a captain! Access the draft via your player portal when it opens.",
+                "timestamp": datetime.now().isoformat()
+            }
+            target_player.add_notification(message) # Use helper method
+
+        return redirect(url_for('home_bp.index'))
 
 @admin_bp.route('/assign_captains/<match_id>', methods=['GET', 'POST'])
 @admin_required
 def assign_captains(match_id):
-    players = load_players()
+    # Validation and the form read the cached roster; only the POST write takes data_lock
     match = get_match_by_id(match_id)
-
     if not match:
         flash("Match not found.", "danger")
         return redirect(url_for('home_bp.index'))
 
     # Only use available players
-    available_players = [p for p in players if p.available]
+    available_players = [p for p in load_players() if p.available]
 
     if len(available_players) < 4:
         flash("At least 4 available players are required to assign captains.", "warning")
         return redirect(url_for('home_bp.index'))
 
-    if request.method == 'POST':
-        captain1_id = request.form.get('captain1')
-        captain2_id = request.form.get('captain2')
+    if request.method != 'POST':
+        return render_template('assign_captains.html', players=available_players, match=match)
+
+    # One captain per team: fields captain1, captain2, ...
+    captain_ids = [request.form.get(f'captain{n}') for n in range(1, max(2, match.num_teams or 2) + 1)]
+
+    if not all(captain_ids) or len(set(captain_ids)) != len(captain_ids):
+        flash(f"Please select {len(captain_ids)} different captains.", "warning")
+        return render_template('assign_captains.html', players=available_players, match=match)
 
-        if not captain1_id or not captain2_id or captain1_id == captain2_id:
-            flash("Please select two different captains.", "warning")
-            return render_template('assign_captains.html', players=available_players, match=match)
+    with store.transaction() as tx:
+        match = tx.match(match_id)
+        if not match: # Deleted since the form was read
+            flash("Match not found.", "danger")
+            return redirect(url_for('home_bp.index'))
 
-        for p in players:
-            p.is_captain = p.id in [captain1_id, captain2_id]
+        for p in tx.players:
+            p.is_captain = p.id in captain_ids
             if p.is_captain:
                 p.add_notification({
                     "type": "captain_assignment",
                     "message": "You've been assigned as a captain! Access the draft via your player portal when it opens.",
                     "timestamp": datetime.now().isoformat()
                 })
-                
-        match.captains = [captain1_id, captain2_id]
-        matches = load_matches()
-        for i, m in enumerate(matches):
-            if m.match_id == match.match_id:
-                matches[i] = match
-                break
-        save_matches(matches)
-
-        save_players(players)
-        flash("Captains assigned successfully.", "success")
-        return redirect(url_for('home_bp.index'))  # Optional: redirect to draft lobby
 
-    return render_template('assign_captains.html', players=available_players, match=match)
+        match.captains = captain_ids
+        flash("Captains assigned successfully.", "success")
+    return redirect(url_for('home_bp.index'))  # Optional: redirect to draft lobby
 
 # --- Team Generation ---
 @admin_bp.route('/generate_teams')
@@ -222,58 +235,98 @@ def generate_teams():
 
     players = load_players()
     available_players = [p for p in players if p.available]
-    if len(available_players) < 2:
+    if len(available_players) < max(2, match.num_teams):
         flash("Not enough available players to generate teams.", "warning")
         return redirect(url_for('home_bp.index'))
 
-    team1, team2 = generate_balanced_teams(available_players)
-    return render_template('team_generator.html', team1=team1, team2=team2)
+    # Seconds of search allowed for squads too big to split exhaustively
+    time_budget = float(get_config_value('team_balance_time_budget', DEFAULT_TIME_BUDGET))
+    # Matches averaged when someone has to cover a position they don't play
+    fallback_window = int(get_config_value('team_fallback_window', FALLBACK_WINDOW))
+    balance = balance_teams_for_match(available_players, match, time_budget=time_budget,
+                                      fallback_window=fallback_window)
+    # Win/draw/loss odds from the players' own past performances; seeded so a reload shows the same odds
+    simulation = simulate_match(balance.teams,
+                                simulations=int(get_config_value('match_simulations', DEFAULT_SIMULATIONS)),
+                                seed=get_config_value('match_simulation_seed', 0))
+    return render_template('team_generator.html', match=match, teams=balance.teams, balance=balance,
+                           simulation=simulation)
+
+@admin_bp.route('/what_if/<match_id>', methods=['POST'])
+@admin_required
+def what_if_lineups(match_id):
+    """Top-K balanced lineups for a match under constraints. JSON body (all optional):
+    {"k": 10, "pinned": {"<player_id>": <team number from 1>}, "apart": [["<id>", "<id>"]],
+     "excluded": ["<id>"], "captains": ["<id>"], "seed": 1}
+    Captains default to the match's own."""
+    match = get_match_by_id(match_id)
+    if not match:
+        return jsonify({"error": "Match not found"}), 404
+
+    body = request.get_json(silent=True) or {}
+    try:
+        pinned = {player_id: int(team) - 1 for player_id, team in (body.get('pinned') or {}).items()}
+        search = top_lineups_for_match(
+            load_players(), match,
+            k=int(body.get('k', DEFAULT_TOP_K)),
+            pinned=pinned,
+            apart=[tuple(pair) for pair in body.get('apart') or []],
+            excluded=body.get('excluded') or [],
+            captains=body.get('captains'),
+            seed=body.get('seed'),
+            time_budget=float(get_config_value('team_balance_time_budget', DEFAULT_TIME_BUDGET)),
+            fallback_window=int(get_config_value('team_fallback_window', FALLBACK_WINDOW)),
+        )
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = search.to_dict()
+    result.update({"match_id": match.match_id, "num_teams": match.num_teams,
+                   "players_per_team": match.players_per_team})
+    return jsonify(result)
 
 # ----- Create Draft -----
 @admin_bp.route('/create_draft/<match_id>', methods=['POST'])
 @admin_required
 def create_draft(match_id):
-    matches = load_matches()
-    match = get_match_by_id(match_id)
-    if not match:
-        flash("Match not found.", "danger")
-        return redirect(url_for('home_bp.index'))
-    
-    if match.draft_created:
-        flash("Draft has already been created for this match.", "danger")
+    with store.transaction() as tx:
+        match = tx.match(match_id)
+        if not match:
+            flash("Match not found.", "danger")
+            return redirect(url_for('home_bp.index'))
+
+        if match.draft_created:
+            flash("Draft has already been created for this match.", "danger")
+            return redirect(url_for('home_bp.index'))
+
+        num_captains = max(2, match.num_teams or 2)
+        if len(match.captains) != num_captains:
+            flash(f"exactly {num_captains} captains must be assigned before creating the draft.", "warning")
+            return redirect(url_for('admin.assign_captains', match_id=match_id))
+
+
+        all_players = tx.players
+        remaining = [p.id for p in all_players if p.available and p.id not in match.captains]
+
+        try:
+            state = new_draft_state(
+                match.captains, remaining, **draft_settings(),
+                match_id=match.match_id,
+                # Picks notify players of the match from here, without reloading the matches
+                match={"match_id": match.match_id, "date": match.date,
+                       "start_time": match.start_time, "location": match.location},
+            )
+        except DraftError as e:
+            flash(str(e), "danger")
+            return redirect(url_for('home_bp.index'))
+        tx.draft_state = state
+
+        # Mark draft as created
+        match.draft_created = True
+        announce_start(tx, state)
+
+        flash("Draft created successfully. Captains can now begin picking teams.", "success")
         return redirect(url_for('home_bp.index'))
-    
-    if len(match.captains) != 2:
-        flash("exactly 2 captains must be assigned before creating the draft.", "warning")
-        return redirect(url_for('admin.assign_captains', match_id=match_id))
-    
-    
-    all_players = load_players()
-    remaining = [p.id for p in all_players if p.available and p.id not in match.captains]
-    
-    draft_state = {
-        "match_id": match.match_id,
-        "captain1_id": match.captains[0],
-        "captain2_id": match.captains[1],
-        "team1_ids": [],
-        "team2_ids": [],
-        "remaining_ids": remaining,
-        "turn": match.captains[0],
-        "complete": False
-    }
-    
-    save_draft_state(draft_state)
-    
-    # Mark draft as created
-    match.draft_created = True
-    for i, m in enumerate(matches):
-        if m.match_id == match.match_id:
-            matches[i] = match
-            break
-    save_matches(matches)
-    
-    flash("Draft created successfully. Captains can now begin picking teams.", "success")
-    return redirect(url_for('home_bp.index'))
 
 # --- Ratings Management ---
 @admin_bp.route('/ratings')
@@ -290,7 +343,8 @@ def admin_view_ratings(): # Renamed function slightly
 
         # Players' Player Ratings Received
         for entry in player.players_player_ratings:
-             rater = next((p.name for p in players if p.id == entry.get('from')), 'Unknown Rater')
+             rater_player = players.get(entry.get('from'))
+             rater = rater_player.name if rater_player else 'Unknown Rater'
              all_players_player_ratings.append({
                  'rated_player_name': player.name,
                  'rated_player_id': player.id,
@@ -314,71 +368,65 @@ def admin_view_ratings(): # Renamed function slightly
 @admin_bp.route('/create_match', methods=['GET', 'POST'])
 @admin_required
 def create_match():
-    players = load_players()
-    available_players = [p for p in players if p.available]
-
-    if request.method == 'POST':
-        if len(available_players) < 4:
-            flash("At least 4 players must be marked as available to create a match.", "warning")
-            return render_template('create_match.html')
-
-        date = request.form.get('date')
-        start_time = request.form.get('start_time')
-        duration_str = request.form.get('duration')
-        location = request.form.get('location')
-        num_teams = request.form.get('num_teams')
-        players_per_team = request.form.get('players_per_team')
-        selection_method = request.form.get('selection_method')  # 'draft' or 'auto'
-
-        # Validation
-        if not date or not start_time or not duration_str or not location or not num_teams or not players_per_team:
-            flash("All fields are required.", "warning")
-            return render_template('create_match.html')
-
-        try:
-            duration = int(duration_str)
-            if duration < 10:
-                raise ValueError("Duration must be at least 10 minutes.")
-            num_teams = int(num_teams)
-            players_per_team = int(players_per_team)
-        except ValueError as e:
-            flash(f"Invalid input: {e}", "danger")
-            return render_template('create_match.html')
-        
-        # New: Check total player availability
-        available_players = [p for p in load_players() if p.available]
-        required_players = num_teams * players_per_team
-        if len(available_players) < required_players:
-            flash(f"Not enough available players. Required: {required_players}, Available: {len(available_players)}", "warning")
-            return render_template('create_match.html')
-
-
-        match = Match(
-            date=date,
-            start_time=start_time,
-            duration_minutes=duration,
-            location=location,
-            num_teams=num_teams,
-            players_per_team=players_per_team,
-            team_selection_method=selection_method,
-            players=[],  # Players assigned after draft or auto-generation
-            is_completed=False
-        )
-
-        matches = load_matches()
-        matches.append(match)
-        save_matches(matches)
-
-        flash("Match created successfully!", "success")
-        flash(f"Match scheduled for {date} at {start_time} created successfully!", "success")
-
-        if selection_method == "draft":
-            return redirect(url_for('admin.assign_captains', match_id=match.match_id))
-        else:
-            return redirect(url_for('admin.generate_teams', match_id=match.match_id))
-
-    # GET
-    return render_template('create_match.html')
+    if request.method != 'POST':
+        return render_template('create_match.html')
 
+    # Validated against the cached roster; only appending the match takes data_lock
+    available_players = [p for p in load_players() if p.available]
+    if len(available_players) < 4:
+        flash("At least 4 players must be marked as available to create a match.", "warning")
+        return render_template('create_match.html')
+
+    date = request.form.get('date')
+    start_time = request.form.get('start_time')
+    duration_str = request.form.get('duration')
+    location = request.form.get('location')
+    num_teams = request.form.get('num_teams')
+    players_per_team = request.form.get('players_per_team')
+    selection_method = request.form.get('selection_method')  # 'draft' or 'auto'
+
+    # Validation
+    if not date or not start_time or not duration_str or not location or not num_teams or not players_per_team:
+        flash("All fields are required.", "warning")
+        return render_template('create_match.html')
+
+    try:
+        duration = int(duration_str)
+        if duration < 10:
+            raise ValueError("Duration must be at least 10 minutes.")
+        num_teams = int(num_teams)
+        players_per_team = int(players_per_team)
+    except ValueError as e:
+        flash(f"Invalid input: {e}", "danger")
+        return render_template('create_match.html')
+
+    # New: Check total player availability
+    required_players = num_teams * players_per_team
+    if len(available_players) < required_players:
+        flash(f"Not enough available players. Required: {required_players}, Available: {len(available_players)}", "warning")
+        return render_template('create_match.html')
+
+    match = Match(
+        date=date,
+        start_time=start_time,
+        duration_minutes=duration,
+        location=location,
+        num_teams=num_teams,
+        players_per_team=players_per_team,
+        team_selection_method=selection_method,
+        players=[],  # Players assigned after draft or auto-generation
+        is_completed=False
+    )
+
+    with store.transaction() as tx:
+        tx.matches.append(match)
+
+    flash("Match created successfully!", "success")
+    flash(f"Match scheduled for {date} at {start_time} created successfully!", "success")
+
+    if selection_method == "draft":
+        return redirect(url_for('admin.assign_captains', match_id=match.match_id))
+    else:
+        return redirect(url_for('admin.generate_teams', match_id=match.match_id))
 
 # Removed admin/view_players - Consolidated into home_bp.view_players
\ No newline at end of file
@@ -1,20 +1,38 @@
-from flask import Blueprint, jsonify, request
-from backend.utils.data_manager import load_players, save_players, get_player
+import os
+import threading
+from flask import Blueprint, jsonify, request, session, Response, stream_with_context
+from backend.utils.data_manager import load_players, player_repository, get_notification_store, event_feed, get_config_value
+from backend.utils.match_manager import get_match_by_id
+from backend.utils.team_generator import balance_teams_for_match, DEFAULT_TIME_BUDGET, FALLBACK_WINDOW
+from backend.utils.event_feed import format_sse
+from backend.utils.player_listing import encode_cursor, decode_cursor, AVAILABILITY_FILTERS
+from backend.utils.name_search import DEFAULT_LIMIT
+from backend.utils.store import store
+from backend.models.player import recompute_counts
 
 api_bp = Blueprint('api_bp', __name__, url_prefix='/api')
 
+MAX_PAGE_SIZE = 100
+MAX_SEARCH_RESULTS = 50
+
 @api_bp.route('/players')
 def get_players():
-    players = load_players()
-    players.sort(key=lambda x: x.skill_rating, reverse=True)
-    
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 14))
-    
-    start = (page - 1) * per_page
-    end = start + per_page
-    sliced = players[start:end]
-    
+    """One page of players, best rated first, optionally filtered by ?position= and
+    ?availability=available|unavailable. Pass the previous page's next_cursor as
+    ?after= (keyset pagination); the older ?page= offsets still work."""
+    listing = player_repository.listing() # Sorted and bitmapped once per roster version
+
+    per_page = max(1, min(request.args.get('per_page', 14, type=int), MAX_PAGE_SIZE))
+    try:
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    offset = 0 if after else (max(1, request.args.get('page', 1, type=int)) - 1) * per_page
+    availability = request.args.get('availability', '')
+    sliced, has_more = listing.page(per_page, after=after, offset=offset,
+                                    position=request.args.get('position', ''),
+                                    availability=availability if availability in AVAILABILITY_FILTERS else None)
+
     return jsonify({
         "players": [{
             "id": p.id,
@@ -22,41 +40,155 @@ def get_players():
             "position": p.position,
             "skill_rating": p.skill_rating,
             "is_captain": p.is_captain,
-            "access_code": p.access_code,
             "available": p.available
         } for p in sliced],
-        "has_more": end < len(players)
+        "has_more": has_more,
+        "next_cursor": encode_cursor(sliced[-1]) if has_more else None
     })
-    
+
+@api_bp.route('/players/search')
+def search_players():
+    """Typeahead: ?q=<text>[&limit=<n>][&fuzzy=1]. Ranked matches from the name index;
+    `match` is 0 for the whole name, 1 name prefix, 2 word prefix, 3 substring, 4 fuzzy."""
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_SEARCH_RESULTS))
+    fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+    results = player_repository.name_search().search(request.args.get('q', ''), limit=limit, fuzzy=fuzzy)
+    return jsonify({
+        "players": [{
+            "id": p.id,
+            "name": p.name,
+            "position": p.position,
+            "skill_rating": p.skill_rating,
+            "match": tier
+        } for p, tier in results]
+    })
+
+# Each stream ends after this long and the browser reconnects (resuming via Last-Event-ID).
+# Every open stream occupies a gunicorn thread (render.yaml runs gthread workers), so
+# pages only open one while they need live updates: the draft pages and an open inbox.
+SSE_MAX_SECONDS = int(os.getenv('SSE_MAX_SECONDS', 25))
+# Open notification streams per logged-in viewer (per worker), so one session can't
+# tie up the thread pool; a couple of tabs is plenty
+MAX_STREAMS_PER_SESSION = int(os.getenv('MAX_STREAMS_PER_SESSION', 2))
+
+_open_streams = {} # viewer -> notification streams open in this worker
+_open_streams_lock = threading.Lock()
+
+def _page_args():
+    """Cursor arguments: ?before=<timestamp>&before_seq=<n>&limit=<n> (newest first)."""
+    limit = request.args.get('limit', 20, type=int)
+    return {
+        "before": request.args.get('before') or None,
+        "before_seq": request.args.get('before_seq', type=int),
+        "limit": max(1, min(limit, MAX_PAGE_SIZE)),
+    }
+
 @api_bp.route('/inbox/<player_id>')
 def get_inbox(player_id):
-        player = get_player(load_players(), player_id)
-        if not player:
+        if not player_repository.exists(player_id):
             return jsonify({"error": "Player not found"}), 404
-        
-        return jsonify({
-            "inbox": sorted(player.inbox, key=lambda x: x.get('timestamp', ''), reverse=True)
-        })
+
+        # Reads only this page of the player's log, already in timestamp order
+        inbox, next_cursor = get_notification_store().page(player_id, 'inbox', **_page_args())
+        return jsonify({"inbox": inbox, "next_cursor": next_cursor})
         
 @api_bp.route('/notifications/<player_id>')
 def get_notifications(player_id):
-    player = get_player(load_players(), player_id)
-    if not player:
+    """Unread notifications by default; ?all=1 includes ones already read."""
+    if not player_repository.exists(player_id):
         return jsonify({"error": "Player not found"}), 404
-    
-    return jsonify({
-        "notifications": [n for n in player.notifications if not n.get('read', False)]
-    })
+
+    box = 'notifications' if request.args.get('all') else 'unread'
+    notifications, next_cursor = get_notification_store().page(player_id, box, **_page_args())
+    return jsonify({"notifications": notifications, "next_cursor": next_cursor})
+
+@api_bp.route('/notifications/<player_id>/unread_count')
+def get_unread_count(player_id):
+    """Answered from the log's cursors; no messages are loaded."""
+    if not player_repository.exists(player_id):
+        return jsonify({"error": "Player not found"}), 404
+
+    return jsonify(get_notification_store().counts(player_id))
     
 @api_bp.route('/notifications/<player_id>/read', methods=['POST'])
 def mark_all_notifications_read(player_id):
-    player = get_player(load_players(), player_id)
-    if not player:
-        return jsonify({"error": "Player not found"}), 404
-    
-    for n in player.notifications:
-        n['read'] = True
-        
-    save_players(load_players()) 
+    with store.transaction() as tx:
+        player = tx.player(player_id)
+        if not player:
+            return jsonify({"error": "Player not found"}), 404
+
+        player.mark_notifications_read()
+
     return jsonify({"message": "Marked as read"})
 
+@api_bp.route('/matches/<match_id>/teams')
+def generate_match_teams(match_id):
+    """Balanced teams for the match's num_teams / players_per_team. ?seed= makes the
+    local search for large squads repeatable."""
+    match = get_match_by_id(match_id)
+    if not match:
+        return jsonify({"error": "Match not found"}), 404
+
+    available_players = [p for p in load_players() if p.available]
+    if len(available_players) < max(2, match.num_teams):
+        return jsonify({"error": "Not enough available players to generate teams."}), 400
+
+    time_budget = float(get_config_value('team_balance_time_budget', DEFAULT_TIME_BUDGET))
+    fallback_window = int(get_config_value('team_fallback_window', FALLBACK_WINDOW))
+    balance = balance_teams_for_match(available_players, match, time_budget=time_budget,
+                                      seed=request.args.get('seed', type=int), fallback_window=fallback_window)
+    result = balance.to_dict()
+    result.update({"match_id": match.match_id, "num_teams": match.num_teams,
+                   "players_per_team": match.players_per_team})
+    return jsonify(result)
+
+@api_bp.route('/cache/players')
+def player_cache_stats():
+    """Hit/miss counters for this worker's player cache, and how often cached
+    ratings (form, skill update, rating diff) had to be recomputed. Admins only."""
+    if not session.get('is_admin'):
+        return jsonify({"error": "Admin access required"}), 403
+    stats = player_repository.stats()
+    stats['recomputes'] = dict(recompute_counts)
+    return jsonify(stats)
+
+# --- Live updates (Server-Sent Events) ---
+def _event_stream(channels):
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    def generate():
+        yield "retry: 1000\n\n"
+        for event_id, event in event_feed.follow(channels, last_event_id, max_duration=SSE_MAX_SECONDS):
+            yield format_sse(event_id, event)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@api_bp.route('/draft/stream')
+def draft_stream():
+    """Pick, turn, start, complete and reset events for the draft pages."""
+    return _event_stream(['draft'])
+
+def _release_stream(viewer):
+    with _open_streams_lock:
+        _open_streams[viewer] -= 1
+        if not _open_streams[viewer]:
+            del _open_streams[viewer]
+
+@api_bp.route('/notifications/<player_id>/stream')
+def notification_stream(player_id):
+    """New notifications for one player as they are sent. Only that player (or an
+    admin) may listen, with at most MAX_STREAMS_PER_SESSION streams open at once."""
+    viewer = 'admin' if session.get('is_admin') else session.get('player_id')
+    if viewer != 'admin' and viewer != player_id:
+        return jsonify({"error": "Not authorised"}), 403
+    if not player_repository.exists(player_id):
+        return jsonify({"error": "Player not found"}), 404
+
+    with _open_streams_lock:
+        if _open_streams.get(viewer, 0) >= MAX_STREAMS_PER_SESSION:
+            return jsonify({"error": "Too many open streams"}), 429
+        _open_streams[viewer] = _open_streams.get(viewer, 0) + 1
+    response = _event_stream([f"player:{player_id}"])
+    response.call_on_close(lambda: _release_stream(viewer)) # Also runs if the client goes away
+    return response
@@ -2,7 +2,7 @@
 
 import os
 from flask import Blueprint, render_template, request, redirect, url_for, session
-from backend.utils.data_manager import load_players
+from backend.utils.data_manager import login_index
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -31,17 +31,15 @@ def admin_logout():
 # Player Login
 @auth_bp.route('/player_login', methods=['GET', 'POST'])
 def player_login():
-     players = load_players()
      if request.method == 'POST':
-        name = request.form['name'].strip().lower()
-        access_code = request.form['access_code'].strip()
-        player = next((p for p in players if p.name.strip().lower() == name and p.access_code == access_code), None)
+        # One index lookup; no Player is loaded until the portal page
+        player_id = login_index.lookup(request.form['name'], request.form['access_code'])
 
-        if player:
+        if player_id:
             session.clear()
-            session['player_id'] = player.id
+            session['player_id'] = player_id
             session['is_admin'] = False
-            return redirect(url_for('player_bp.player_page', player_id=player.id))
+            return redirect(url_for('player_bp.player_page', player_id=player_id))
         else:
             return render_template('player_login.html', error='Invalid name or access code.')
 
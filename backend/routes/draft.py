@@ -3,20 +3,16 @@
 
 from flask import Blueprint, render_template, redirect, url_for, request, session, flash
 from datetime import datetime, timedelta
-from backend.utils.data_manager import (
-    load_players, save_players, load_draft_state, save_draft_state, load_matches_data
-)
+from backend.utils.data_manager import load_players, load_draft_state, save_draft_state, event_feed, get_config_value, draft_engine
+from backend.utils.draft_engine import DraftError, new_draft_state, state_captains, team_key
+from backend.utils.draft_helpers import announce_pick, announce_start, draft_match, draft_settings, draft_teams
+from backend.utils.store import store
 from backend.utils.draft_timer import get_draft_window # Use shared function
 from backend.models.player import Player # Import Player model
-from backend.utils.match_manager import get_current_draft_match
+from backend.utils.match_simulator import simulate_match, DEFAULT_SIMULATIONS
 
 draft_bp = Blueprint('draft_bp', __name__)
 
-# --- Helper Function ---
-def get_player(players, player_id):
-    """Safely get a player by ID from a list."""
-    return next((p for p in players if p.id == player_id), None)
-
 # --- Admin Draft Control ---
 @draft_bp.route('/draft/start', methods=['POST'])
 def start_draft():
@@ -32,53 +28,40 @@ def start_draft():
     #     flash(f"Draft can only be started between {start_dt.strftime('%a %H:%M')} and {end_dt.strftime('%a %H:%M')}", "warning")
     #     return redirect(url_for('home_bp.index'))
 
-    # Clear previous state from session and file
-    session.pop('draft_state', None)
-    save_draft_state({}) # Clear file state
-
-    players = load_players()
-    captains = [p for p in players if p.is_captain]
+    with store.transaction() as tx:
+        # Clear previous state from session and file
+        session.pop('draft_state', None)
+        tx.draft_state = {} # Clear file state
 
-    if len(captains) != 2:
-        flash("Exactly 2 captains must be assigned before starting the draft.", "warning")
-        return redirect(url_for('home_bp.index')) # Redirect back to player list/dashboard
+        players = tx.players
+        captains = [p for p in players if p.is_captain]
 
-    # Sort captains (e.g., by skill, could be random or other criteria)
-    captains.sort(key=lambda p: p.skill_rating, reverse=True)
-    captain1, captain2 = captains
+        if len(captains) < 2:
+            flash("At least 2 captains must be assigned before starting the draft.", "warning")
+            return redirect(url_for('home_bp.index')) # Redirect back to player list/dashboard
 
-    # Get available, non-captain players for the draft pool
-    draft_pool = [p for p in players if p.available and not p.is_captain]
-    if not draft_pool:
-        flash("No available players (non-captains) to draft.", "warning")
-        return redirect(url_for('home_bp.index'))
+        # Sort captains (e.g., by skill, could be random or other criteria)
+        captains.sort(key=lambda p: p.skill_rating, reverse=True)
 
+        # Get available, non-captain players for the draft pool
+        draft_pool = [p for p in players if p.available and not p.is_captain]
+        if not draft_pool:
+            flash("No available players (non-captains) to draft.", "warning")
+            return redirect(url_for('home_bp.index'))
 
-    # Initialize draft state
-    state = {
-        'captain1_id': captain1.id,
-        'captain2_id': captain2.id,
-        'team1_ids': [], # Store IDs
-        'team2_ids': [], # Store IDs
-        'remaining_ids': [p.id for p in draft_pool],
-        'turn': captain1.id, # Highest rated captain starts
-        'complete': False,
-        'start_time': datetime.now().isoformat() # Record start time
-    }
 
-    save_draft_state(state)
-    # Optionally store in session for quick access, but file is source of truth
-    # session['draft_state'] = state
+        # Initialize draft state; the highest rated captain starts
+        try:
+            state = new_draft_state([c.id for c in captains], [p.id for p in draft_pool], **draft_settings())
+        except DraftError as e:
+            flash(str(e), "danger")
+            return redirect(url_for('home_bp.index'))
+        tx.draft_state = state
+        # Optionally store in session for quick access, but file is source of truth
+        # session['draft_state'] = state
 
-    flash("Draft started successfully!", "success")
-    # Notify captains
-    cap1_notify = get_player(players, captain1.id)
-    cap2_notify = get_player(players, captain2.id)
-    if cap1_notify:
-         cap1_notify.add_notification({"type": "draft_start", "message": "The draft has started! It's your turn to pick."})
-    if cap2_notify:
-         cap2_notify.add_notification({"type": "draft_start", "message": "The draft has started! Waiting for the first pick."})
-    save_players(players)
+        flash("Draft started successfully!", "success")
+        announce_start(tx, state)
 
 
     # Redirect admin to an observer view or dashboard
@@ -95,33 +78,35 @@ def draft_observer_view():
 
     players = load_players() # Load players to resolve IDs to names/objects
 
-    captain1 = get_player(players, state['captain1_id'])
-    captain2 = get_player(players, state['captain2_id'])
-    turn_player = get_player(players, state.get('turn')) # Use get for turn, might be None if complete
+    teams = draft_teams(state, players.get)
+    turn_player = players.get(state.get('turn')) # Use get for turn, might be None if complete
 
     # Check if captains exist (could have been deleted)
-    if not captain1 or not captain2:
-         flash("Error: One or both captains associated with the draft no longer exist.", "danger")
+    if not all(team['captain'] for team in teams):
+         flash("Error: One or more captains associated with the draft no longer exist.", "danger")
          # Consider resetting draft state or handling differently
          save_draft_state({}) # Simple reset for now
          return redirect(url_for('home_bp.index'))
 
 
     context = {
-        'captain1': captain1,
-        'captain2': captain2,
-        'team1': [p for pid in state.get('team1_ids', []) if (p := get_player(players, pid))],
-        'team2': [p for pid in state.get('team2_ids', []) if (p := get_player(players, pid))],
-        'remaining': [p for pid in state.get('remaining_ids', []) if (p := get_player(players, pid))],
+        'teams': teams, # [{'number', 'captain', 'players'}], one per captain
+        'captain1': teams[0]['captain'],
+        'captain2': teams[1]['captain'],
+        'team1': teams[0]['players'],
+        'team2': teams[1]['players'],
+        'remaining': [p for pid in state.get('remaining_ids', []) if (p := players.get(pid))],
         'turn': turn_player,
+        'deadline': state.get('deadline'), # Set when picks are timed
         'is_complete': state.get('complete', False),
-        'state': state # Pass full state if needed by template
+        'state': state, # Pass full state if needed by template
+        'event_position': event_feed.position() # draft_live.js resumes the draft stream from here
     }
 
     # Pass admin/player status for navbar/template logic
     context['is_admin'] = session.get('is_admin', False)
     context['player_id'] = session.get('player_id')
-    current_player = get_player(players, context['player_id'])
+    current_player = players.get(context['player_id'])
     context['player'] = current_player
 
 
@@ -144,111 +129,46 @@ def draft_pick():
         flash("You must be logged in as a player (captain) to make a pick.", "warning")
         return redirect(url_for('auth.player_login'))
 
-    # Load current state and players
-    state = load_draft_state()
-    players = load_players()
-    captain = get_player(players, captain_id_session)
-
-    # --- Validations ---
-    if not state or state.get('complete'):
-        flash("Draft is not active or already completed.", "warning")
-        return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
-
-    if not captain or not captain.is_captain:
-         flash("Only designated captains can make picks.", "danger")
-         return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
-
-    # Check if it's this captain's turn
-    if state.get('turn') != captain_id_session:
-        flash("It's not your turn to pick.", "warning")
-        return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
-
-    # Check if the selected player is valid and available in the pool
-    picked_player = get_player(players, player_id)
-    if not picked_player or player_id not in state.get('remaining_ids', []):
-        flash("Invalid player selected or player already picked.", "danger")
-        return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
-
-    # --- Perform Pick ---
-    current_turn_captain_id = state['turn']
-    next_turn_captain_id = None
-
-    if current_turn_captain_id == state['captain1_id']:
-        state['team1_ids'].append(player_id)
-        next_turn_captain_id = state['captain2_id']
-    elif current_turn_captain_id == state['captain2_id']:
-        state['team2_ids'].append(player_id)
-        next_turn_captain_id = state['captain1_id']
-        
-    match = get_current_draft_match()
-        
-    if match:
-        picked_player.add_notification({
-            "type": "draft_pick",
-            "message": (
-                f"Congratulations! You have been chosen by Captain {captain.name} " 
-                f"for the match on {match.date} at {match.location}. "
-                f"Please arrive at least 15 minutes before the {match.start_time} kick-off!"
-            ),
-            "timestamp": datetime.now().isoformat()
-        })
-            
-        picked_player.upcoming_match = {
-            "match_id": match.match_id,
-            "date": match.date,
-            "start_time": match.start_time,
-            "location": match.location
-            }
-        
-    else:
-        # Should not happen if validation is correct
-        flash("Internal error: Invalid turn state.", "danger")
-        return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
-
-    # Remove player from remaining pool
-    state['remaining_ids'].remove(player_id)
-
-    # --- Update State and Notify ---
-    if not state['remaining_ids']:
-        # Draft Complete
-        state['complete'] = True
-        state['turn'] = None
-        state['end_time'] = datetime.now().isoformat()
-        flash("Draft pick successful! Draft is now complete.", "success")
-
-        # Notify both captains
-        cap1 = get_player(players, state['captain1_id'])
-        cap2 = get_player(players, state['captain2_id'])
-        completion_message = {
-            "type": "draft_complete",
-            "message": "✅ Draft is complete! Check the final teams.",
-            "timestamp": state['end_time']
-        }
-        if cap1: cap1.add_notification(completion_message)
-        if cap2: cap2.add_notification(completion_message)
-        save_players(players) # Save updated notifications
-
-    else:
-        # Draft Continues
-        state['turn'] = next_turn_captain_id
-        flash(f"Successfully picked {picked_player.name}.", "success")
-        # Notify the *next* captain it's their turn
-        next_captain = get_player(players, next_turn_captain_id)
-        if next_captain:
-             turn_message = {
-                "type": "draft_turn",
-                "message": "It's your turn to pick in the draft!",
-                "timestamp": datetime.now().isoformat()
-             }
-             next_captain.add_notification(turn_message)
-             save_players(players)
-
-
-    # Save the updated draft state
-    save_draft_state(state)
-    # Optionally update session state if using it for quick access
-    # session['draft_state'] = state
-
+    with store.transaction() as tx:
+        captain = tx.player(captain_id_session)
+
+        # --- Validations ---
+        if not draft_engine.get('captain1_id') or draft_engine.get('complete'):
+            flash("Draft is not active or already completed.", "warning")
+            return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
+
+        if not captain or not captain.is_captain:
+             flash("Only designated captains can make picks.", "danger")
+             return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
+
+        picked_player = tx.player(player_id)
+        if not picked_player:
+            flash("Invalid player selected or player already picked.", "danger")
+            return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
+
+        # Turn and pool checks are O(1) against the engine's indexes
+        try:
+            pick = tx.draft_pick(captain_id_session, player_id)
+        except DraftError as e:
+            flash(str(e), "warning")
+            return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
+
+        # --- Perform Pick ---
+        match = draft_match(tx)
+        if not match:
+            # Should not happen if validation is correct
+            tx.rollback() # Don't persist the half-made pick
+            flash("Internal error: Invalid turn state.", "danger")
+            return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
+
+        # --- Notify ---
+        announce_pick(tx, pick, captain, picked_player, match)
+        if pick.complete:
+            flash("Draft pick successful! Draft is now complete.", "success")
+        else:
+            flash(f"Successfully picked {picked_player.name}.", "success")
+
+        # The pick is appended to the draft log and notified players are saved when the transaction commits
 
     # Redirect the captain back to their portal to see the updated state
     return redirect(url_for('player_bp.player_page', player_id=captain_id_session))
@@ -261,7 +181,7 @@ def draft_pick():
 def draft_final_view(viewing_player_id):
     state = load_draft_state()
     players = load_players()
-    viewer = get_player(players, viewing_player_id)
+    viewer = players.get(viewing_player_id)
 
     # Validation
     if not state or not state.get('complete'):
@@ -278,20 +198,25 @@ def draft_final_view(viewing_player_id):
     #     flash("Only captains from this draft can view this page.", "warning")
     #     return redirect(url_for('home_bp.index'))
 
-    captain1 = get_player(players, state['captain1_id'])
-    captain2 = get_player(players, state['captain2_id'])
-
-    if not captain1 or not captain2:
+    teams = draft_teams(state, players.get)
+    if len(teams) < 2 or not all(team['captain'] for team in teams):
          flash("Error retrieving captain data for the completed draft.", "danger")
          return redirect(url_for('home_bp.index'))
 
+    simulation = None
+    if all(team['players'] for team in teams):
+        simulation = simulate_match([team['players'] for team in teams],
+                                    simulations=int(get_config_value('match_simulations', DEFAULT_SIMULATIONS)),
+                                    seed=get_config_value('match_simulation_seed', 0))
 
     context = {
         'viewer': viewer, # Pass the viewing player
-        'captain1': captain1,
-        'captain2': captain2,
-        'team1': [p for pid in state.get('team1_ids', []) if (p := get_player(players, pid))],
-        'team2': [p for pid in state.get('team2_ids', []) if (p := get_player(players, pid))],
+        'teams': teams, # [{'number', 'captain', 'players'}], one per captain
+        'captain1': teams[0]['captain'],
+        'captain2': teams[1]['captain'],
+        'team1': teams[0]['players'],
+        'team2': teams[1]['players'],
+        'simulation': simulation, # Win/draw/loss odds for the drafted sides
         'is_admin': session.get('is_admin', False), # For navbar/template logic
         'player_id': viewing_player_id, # For navbar
         'player': viewer # Pass player object for navbar
@@ -301,6 +226,21 @@ def draft_final_view(viewing_player_id):
 
 
 # --- Captain Messaging Team ---
+def _captain_team(captain, draft_state, lookup):
+    """The teammates `captain` drafted in the last completed draft, or a flash message
+    saying why there are none."""
+    if not captain or not captain.is_captain:
+        return None, "Only captains can message their team."
+    if not draft_state or not draft_state.get('complete'):
+        return None, "Draft is not complete. Cannot message team yet."
+    captain_ids = state_captains(draft_state)
+    if captain.id not in captain_ids:
+        # This captain might not have been part of the last draft
+        return None, "You were not a captain in the last completed draft."
+    # Include the captain themself in the team list? Decide based on requirements.
+    team_ids = draft_state.get(team_key(captain_ids.index(captain.id) + 1), [])
+    return [p for pid in team_ids if (p := lookup(pid))], None
+
 @draft_bp.route('/message_team/<captain_id>', methods=['GET', 'POST'])
 def message_team(captain_id):
     # --- Authorization & Data Loading ---
@@ -309,39 +249,30 @@ def message_team(captain_id):
         flash("Unauthorized access.", "danger")
         return redirect(url_for('home_bp.index'))
 
+    # The form and validation read the cached roster; only sending takes data_lock
     players = load_players()
-    captain = get_player(players, captain_id)
-    if not captain or not captain.is_captain:
-        flash("Only captains can message their team.", "warning")
-        return redirect(url_for('player_bp.player_page', player_id=captain_id))
-
-    # Determine the captain's team from the latest completed draft state
-    draft_state = load_draft_state()
-    if not draft_state or not draft_state.get('complete'):
-        flash("Draft is not complete. Cannot message team yet.", "info")
+    captain = players.get(captain_id)
+    team_players, problem = _captain_team(captain, load_draft_state(), players.get)
+    if problem:
+        flash(problem, "warning")
         return redirect(url_for('player_bp.player_page', player_id=captain_id))
 
-    team_ids = []
-    if draft_state.get('captain1_id') == captain_id:
-        team_ids = draft_state.get('team1_ids', [])
-    elif draft_state.get('captain2_id') == captain_id:
-        team_ids = draft_state.get('team2_ids', [])
-    else:
-        # This captain might not have been part of the last draft
-        flash("You were not a captain in the last completed draft.", "warning")
-        return redirect(url_for('player_bp.player_page', player_id=captain_id))
-
-    # Include the captain themself in the team list? Decide based on requirements.
-    # team_ids.append(captain_id) # Uncomment to include captain
-
-    team_players = [p for p in players if p.id in team_ids] # Get player objects for teammates
+    # --- Handle GET Request (Show Form) ---
+    if request.method != 'POST':
+        return render_template('message_team.html', captain=captain, teammates=team_players)
 
     # --- Handle POST Request (Sending Message) ---
-    if request.method == 'POST':
-        message_content = request.form.get('message', '').strip()
-        if not message_content:
-            flash("Message cannot be empty.", "warning")
-            return render_template('message_team.html', captain=captain, teammates=team_players)
+    message_content = request.form.get('message', '').strip()
+    if not message_content:
+        flash("Message cannot be empty.", "warning")
+        return render_template('message_team.html', captain=captain, teammates=team_players)
+
+    with store.transaction() as tx:
+        captain = tx.player(captain_id)
+        team_players, problem = _captain_team(captain, tx.draft_state, tx.player)
+        if problem: # Changed since the form was read
+            flash(problem, "warning")
+            return redirect(url_for('player_bp.player_page', player_id=captain_id))
 
         timestamp = datetime.now().isoformat()
         message_data = {
@@ -355,10 +286,6 @@ def message_team(captain_id):
         for teammate in team_players:
             teammate.add_notification(message_data.copy()) # Use helper
 
-        save_players(players)
-        flash("Message sent to your team successfully!", "success")
-        # Redirect back to player portal after sending
-        return redirect(url_for('player_bp.player_page', player_id=captain_id))
-
-    # --- Handle GET Request (Show Form) ---
-    return render_template('message_team.html', captain=captain, teammates=team_players)
+    flash("Message sent to your team successfully!", "success")
+    # Redirect back to player portal after sending
+    return redirect(url_for('player_bp.player_page', player_id=captain_id))
@@ -1,6 +1,7 @@
 # backend/routes/home.py
 from flask import Blueprint, render_template, session, request, redirect, url_for, flash
-from backend.utils.data_manager import load_players, load_draft_state, get_player, is_public_visibility_enabled, load_config  # Import helper
+from backend.utils.data_manager import load_players, load_player, player_repository, load_draft_state, get_player, is_public_visibility_enabled, load_config  # Import helper
+from backend.utils.player_listing import AVAILABILITY_FILTERS
 from backend.utils.draft_timer import get_draft_window, is_draft_window_open
 from backend.models.player import Player # Import Player model
 from backend.utils.match_manager import load_matches
@@ -69,7 +70,6 @@ def index():
 @home_bp.route('/players')  # Changed route to '/players' for clarity
 def view_players():
     """Displays a filterable list of all players."""
-    players = load_players()
     is_admin = session.get('is_admin', False)
     player_id = session.get('player_id')
     user_role = session.get('role')
@@ -81,30 +81,24 @@ def view_players():
             return redirect(url_for('home_bp.index'))
 
     # Get current player object for navbar/context
-    current_player = get_player(players, player_id) if player_id else None
-
-    # If public view is enabled but individual player consent is required (future-proof)
-    if not is_admin and not current_player and is_public_visibility_enabled():
-        players = [p for p in players if getattr(p, 'has_consented_public_view', False)]
+    current_player = load_player(player_id) if player_id else None
 
     # --- Filtering Logic ---
     search = request.args.get('search', '').strip().lower()
     position = request.args.get('position', '').upper()
     availability = request.args.get('availability', '')  # 'available', 'unavailable', ''
 
-    filtered_players = players  # Start with all players
+    # Position and availability come from the listing's bitmaps, already in rating order
+    filtered_players = player_repository.listing().filter(
+        position=position, availability=availability if availability in AVAILABILITY_FILTERS else None)
+
+    # If public view is enabled but individual player consent is required (future-proof)
+    if not is_admin and not current_player and is_public_visibility_enabled():
+        filtered_players = [p for p in filtered_players if getattr(p, 'has_consented_public_view', False)]
 
     if search:
-        filtered_players = [p for p in filtered_players if search in p.name.lower()]
-    if position:
-        filtered_players = [p for p in filtered_players if p.position == position]
-    if availability == 'available':
-        filtered_players = [p for p in filtered_players if p.available]
-    elif availability == 'unavailable':
-        filtered_players = [p for p in filtered_players if not p.available]
-
-    # Sort final list
-    filtered_players.sort(key=lambda p: p.skill_rating, reverse=True)
+        matching = player_repository.name_search().matching_ids(search) # Gram index, no scan of every name
+        filtered_players = [p for p in filtered_players if p.id in matching]
 
     # --- Render Template ---
     return render_template(
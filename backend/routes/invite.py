@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from backend.utils.invite_manager import validate_invite, increment_invite_use
-from backend.utils.data_manager import load_players, save_players, generate_unique_code
+from backend.utils.data_manager import generate_unique_code
+from backend.utils.store import store
 from backend.models.player import Player
 
 invite_bp = Blueprint('invite_bp', __name__)
@@ -23,26 +24,24 @@ def join_team(code):
             flash("Name and position are required.", "warning")
             return redirect(request.url)
         
-        players = load_players()
-        existing_codes = {p.access_code for p in players if p.access_code}
-        access_code = generate_unique_code(existing_codes)
-        
-        player = Player(
-            name=name,
-            position=position,
-            skill_rating=5.0,
-            preferred_foot=preferred_foot,
-            preferred_days=preferred_days,
-            preferred_times=preferred_times,
-            preferred_locations=preferred_locations,
-            access_code=access_code   
-        )
-        
-        players = load_players()
-        players.append(player)
-        save_players(players)
+        with store.transaction() as tx:
+            access_code = generate_unique_code()
+
+            player = Player(
+                name=name,
+                position=position,
+                skill_rating=5.0,
+                preferred_foot=preferred_foot,
+                preferred_days=preferred_days,
+                preferred_times=preferred_times,
+                preferred_locations=preferred_locations,
+                access_code=access_code   
+            )
+
+            tx.add_player(player)
+
         increment_invite_use(code)
-        
+
         flash(f"Welcome to the team! Your access code is: {access_code}.", "success")
         return redirect(url_for('auth.player_login'))
     
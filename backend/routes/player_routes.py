@@ -1,31 +1,43 @@
-from flask import Blueprint, render_template, redirect, url_for, session, request, flash
+from flask import Blueprint, render_template, redirect, url_for, session, request, flash, g
 from datetime import datetime
-from backend.utils.match_manager import load_matches, save_matches, get_match_by_id
-from backend.utils.data_manager import load_players, save_players, generate_unique_code, load_draft_state, get_player # Import helper
+from backend.utils.match_manager import load_matches, get_match_by_id
+from backend.utils.data_manager import load_players, load_player, player_exists, generate_unique_code, load_draft_state, get_notification_store, event_feed # Import helper
+from backend.utils.store import store
 from backend.models.player import Player, PerformanceLog # Import models
 from backend.utils.draft_timer import get_draft_window, is_draft_window_open # Import timer utils
-#from backend.utils.draft_helpers import get_draft_context_for_player
+from backend.utils.draft_helpers import draft_teams, upcoming_match
+from backend.utils.draft_engine import state_captains
 
 player_bp = Blueprint('player_bp', __name__)
 
+INBOX_PAGE_SIZE = 20
+
 # --- Decorator for Player Login Check ---
 from functools import wraps
 
 def login_required(f):
+    """Validates the session against the login index (no Player is loaded) and leaves
+    the id in g.player_id; current_player() loads the Player itself when needed."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'player_id' not in session:
             flash("Please log in to access this page.", "warning")
             return redirect(url_for('auth.player_login'))
-        # Optional: Check if player_id still exists in data
-        player = get_player(load_players(), session['player_id'])
-        if not player:
+        if not player_exists(session['player_id']):
              flash("Your session is invalid. Please log in again.", "warning")
              session.pop('player_id', None)
              return redirect(url_for('auth.player_login'))
+        g.player_id = session['player_id']
         return f(*args, **kwargs)
     return decorated_function
 
+def current_player():
+    """The logged-in Player (a read-only copy), loaded at most once per request and
+    kept in g.player. Handlers that change the player use tx.player() instead."""
+    if 'player' not in g:
+        g.player = load_player(g.player_id)
+    return g.player
+
 
 # --- Player Portal/Dashboard ---
 @player_bp.route('/player/<player_id>')
@@ -43,8 +55,7 @@ def player_page(player_id):
              session.pop('player_id', None)
              return redirect(url_for('auth.player_login'))
 
-    players = load_players()
-    player = get_player(players, player_id)
+    player = current_player()
 
     if not player:
         flash("Player data not found. Please contact admin.", "danger")
@@ -66,28 +77,30 @@ def player_page(player_id):
     latest_match = player_matches[0] if player_matches else None
 
     if player.is_captain and draft_state and 'captain1_id' in draft_state:
-        draft_match = get_match_by_id(draft_state['match_id'])
+        draft_match = get_match_by_id(draft_state['match_id'], matches)
         draft_belongs_to_latest_match = draft_match and draft_match.match_id == draft_state['match_id']
-        is_participant_captain = player_id in [draft_state.get('captain1_id'), draft_state.get('captain2_id')]
+        is_participant_captain = player_id in state_captains(draft_state)
 
         if is_participant_captain and draft_belongs_to_latest_match:
-            captain1 = get_player(players, draft_state['captain1_id'])
-            captain2 = get_player(players, draft_state['captain2_id'])
-            turn_player = get_player(players, draft_state.get('turn'))
+            players = load_players() # Only captains mid-draft need the rest of the roster
+            teams = draft_teams(draft_state, players.get)
+            turn_player = players.get(draft_state.get('turn'))
 
-            if not captain1 or not captain2:
+            if not all(team['captain'] for team in teams):
                 flash("Error loading draft captain data.", "warning")
                 draft_context = {"error": True}
             else:
                 draft_context = {
                     'captain_id': player_id,
                     'this_captain': player,
-                    'captain1': captain1,
-                    'captain2': captain2,
-                    'team1': [p for pid in draft_state.get('team1_ids', []) if (p := get_player(players, pid))],
-                    'team2': [p for pid in draft_state.get('team2_ids', []) if (p := get_player(players, pid))],
-                    'remaining': [p for pid in draft_state.get('remaining_ids', []) if (p := get_player(players, pid))],
+                    'teams': teams, # [{'number', 'captain', 'players'}], one per captain
+                    'captain1': teams[0]['captain'],
+                    'captain2': teams[1]['captain'],
+                    'team1': teams[0]['players'],
+                    'team2': teams[1]['players'],
+                    'remaining': [p for pid in draft_state.get('remaining_ids', []) if (p := players.get(pid))],
                     'turn': turn_player,
+                    'deadline': draft_state.get('deadline'), # Set when picks are timed
                     'is_my_turn': draft_state.get('turn') == player_id,
                     'is_complete': draft_state.get('complete', False),
                     'error': False
@@ -98,7 +111,7 @@ def player_page(player_id):
 
     # --- Other Data for Portal ---
     # Get recent ratings for chart/display
-    ratings_history = [log.rating for log in player.match_history if hasattr(log, 'rating')]
+    ratings_history = list(player.match_history.ratings)
 
     draft_start_dt, draft_end_dt = get_draft_window()
 
@@ -109,9 +122,11 @@ def player_page(player_id):
         show_draft_panel=show_draft_panel,
         draft_context=draft_context, # Context for the draft panel section
         draft_state=draft_state, # Pass raw state if needed elsewhere
+        upcoming_match=upcoming_match(draft_state, player_id, matches), # The match they were drafted for
         # Pass draft window times as ISO strings for JS countdown
         draft_start=draft_start_dt.isoformat(),
         draft_end=draft_end_dt.isoformat(),
+        event_position=event_feed.position(), # draft_live.js resumes the draft stream from here
         is_admin=False # Player view is never admin
     )
 
@@ -129,9 +144,8 @@ def player_profile(target_id):
         # Redirect to own portal? Or allow viewing static profile?
         # return redirect(url_for('player_bp.player_page', player_id=viewer_id))
 
-    players = load_players()
-    target_player = get_player(players, target_id)
-    viewer = get_player(players, viewer_id) # Should always exist due to @login_required
+    viewer = current_player() # Validated by @login_required
+    target_player = viewer if target_id == viewer_id else load_player(target_id)
 
     if not target_player or not viewer:
         flash("Player not found.", "danger")
@@ -179,53 +193,59 @@ def player_profile(target_id):
 
 
 # --- Log Performance ---
-@player_bp.route('/log_performance', methods=['GET', 'POST']) # Removed player_id from URL, use session
-@login_required
-def log_performance():
-    player_id = session['player_id']
-    players = load_players()
-    player = get_player(players, player_id)
-
-    if not player: # Should not happen if @login_required works
-        flash("Player data not found.", "danger")
-        return redirect(url_for('auth.player_login'))
-
-    # Find the most recent match the player was assigned to (could be upcoming or just finished)
-    matches = load_matches()
+def _match_to_log(player, matches):
+    """The player's most recent match they haven't logged a performance for, or None."""
     player_matches = sorted(
-        [m for m in matches if player_id in m.players],
+        [m for m in matches if player.id in m.players],
         key=lambda m: (m.date, m.start_time),
         reverse=True
     )
-
-    # Find the latest match for which performance hasn't been logged yet
     logged_match_ids = {log.match_id for log in player.match_history if log.match_id}
-    match_to_log = None
-    for match in player_matches:
-        if match.match_id not in logged_match_ids:
-             # Check if match is reasonably recent (e.g., started in last 24 hours)? Optional.
-             # end_time = match.end_time()
-             # if datetime.now() > end_time and datetime.now() - end_time < timedelta(days=1):
-            match_to_log = match
-            break # Log performance for the most recent unlogged match
-
-    if not match_to_log:
-        flash("No recent, unlogged match found for you to submit performance.", "info")
-        return redirect(url_for('player_bp.player_page', player_id=player_id))
+    # Check if match is reasonably recent (e.g., started in last 24 hours)? Optional.
+    return next((m for m in player_matches if m.match_id not in logged_match_ids), None)
+
+@player_bp.route('/log_performance', methods=['GET', 'POST']) # Removed player_id from URL, use session
+@login_required
+def log_performance():
+    player_id = session['player_id']
+
+    # --- Handle GET Request: a plain read, no transaction ---
+    if request.method != 'POST':
+        player = current_player()
+        if not player: # Should not happen if @login_required works
+            flash("Player data not found.", "danger")
+            return redirect(url_for('auth.player_login'))
+        match_to_log = _match_to_log(player, load_matches())
+        if not match_to_log:
+            flash("No recent, unlogged match found for you to submit performance.", "info")
+            return redirect(url_for('player_bp.player_page', player_id=player_id))
+        return render_template('log_performance.html', player=player, match=match_to_log)
 
     # --- Handle POST Request ---
-    if request.method == 'POST':
-        try:
-            goals = int(request.form['goals'])
-            assists = int(request.form['assists'])
-            tackles = int(request.form['tackles'])
-            saves = int(request.form['saves'])
-            # Add validation (e.g., non-negative)
-            if any(x < 0 for x in [goals, assists, tackles, saves]):
-                raise ValueError("Stats cannot be negative.")
-        except (ValueError, KeyError):
-            flash("Invalid input. Please enter whole numbers for stats.", "danger")
-            return render_template('log_performance.html', player=player, match=match_to_log)
+    try:
+        goals = int(request.form['goals'])
+        assists = int(request.form['assists'])
+        tackles = int(request.form['tackles'])
+        saves = int(request.form['saves'])
+        # Add validation (e.g., non-negative)
+        if any(x < 0 for x in [goals, assists, tackles, saves]):
+            raise ValueError("Stats cannot be negative.")
+    except (ValueError, KeyError):
+        flash("Invalid input. Please enter whole numbers for stats.", "danger")
+        return redirect(url_for('player_bp.log_performance'))
+
+    with store.transaction() as tx:
+        player = tx.player(player_id)
+
+        if not player: # Should not happen if @login_required works
+            flash("Player data not found.", "danger")
+            return redirect(url_for('auth.player_login'))
+
+        # Re-checked under the lock: the match may have been logged from another tab
+        match_to_log = _match_to_log(player, tx.matches)
+        if not match_to_log:
+            flash("No recent, unlogged match found for you to submit performance.", "info")
+            return redirect(url_for('player_bp.player_page', player_id=player_id))
 
         # Calculate rating based on submitted stats
         # This formula can be adjusted
@@ -242,23 +262,19 @@ def log_performance():
 
         player.update_performance(log)
         player.update_skill_rating() # Update skill based on history
-        save_players(players)
 
         rating_diff = round(player.skill_rating - previous_rating, 2)
 
-        # Redirect to a 'thanks' page showing the update
-        flash("Performance logged successfully!", "success")
-        return render_template('thanks.html',
-                               player=player,
-                               current_rating=player.skill_rating,
-                               rating_diff=rating_diff,
-                               message="Stats submitted!",
-                               # Provide a clear link back
-                               next_url=url_for('player_bp.player_page', player_id=player.id)
-                               )
-
-    # --- Handle GET Request ---
-    return render_template('log_performance.html', player=player, match=match_to_log)
+    # Rendered after the commit, outside data_lock
+    flash("Performance logged successfully!", "success")
+    return render_template('thanks.html',
+                           player=player,
+                           current_rating=player.skill_rating,
+                           rating_diff=rating_diff,
+                           message="Stats submitted!",
+                           # Provide a clear link back
+                           next_url=url_for('player_bp.player_page', player_id=player.id)
+                           )
 
 
 # --- Regenerate Access Code ---
@@ -266,19 +282,18 @@ def log_performance():
 @login_required
 def regenerate_code():
     player_id = session['player_id']
-    players = load_players()
-    player = get_player(players, player_id)
+    with store.transaction() as tx:
+        player = tx.player(player_id)
 
-    if not player: # Should not happen
-        flash("Player not found.", "danger")
-        return redirect(url_for('auth.player_login'))
+        if not player: # Should not happen
+            flash("Player not found.", "danger")
+            return redirect(url_for('auth.player_login'))
 
-    existing_codes = {p.access_code for p in players if p.access_code and p.id != player_id}
-    player.access_code = generate_unique_code(existing_codes)
-    save_players(players)
-    flash(f"New access code generated: {player.access_code}", "success")
+        access_code = generate_unique_code()
+        player.set_access_code(access_code)
+        flash(f"New access code generated: {access_code}. Note it down; it won't be shown again.", "success")
 
-    return redirect(url_for('player_bp.player_page', player_id=player_id))
+        return redirect(url_for('player_bp.player_page', player_id=player_id))
 
 
 # --- Toggle Availability ---
@@ -286,24 +301,23 @@ def regenerate_code():
 @login_required # Only logged-in players can toggle their own
 def toggle_availability():
     player_id = session['player_id']
-    players = load_players()
-    player = get_player(players, player_id)
+    with store.transaction() as tx:
+        player = tx.player(player_id)
 
-    if not player:
-        flash("Player not found.", "danger")
-        return redirect(url_for('auth.player_login'))
+        if not player:
+            flash("Player not found.", "danger")
+            return redirect(url_for('auth.player_login'))
 
-    player.available = not player.available
-    save_players(players)
-    status = "Available" if player.available else "Unavailable"
-    flash(f"Your availability has been set to: {status}", "success")
+        player.available = not player.available
+        status = "Available" if player.available else "Unavailable"
+        flash(f"Your availability has been set to: {status}", "success")
 
-    # Admin toggle might need a separate route in admin.py if different logic/redirect needed
-    # Or check role here:
-    # if session.get('is_admin'):
-    #    return redirect(url_for('home_bp.index')) # Or admin player list
-    # else:
-    return redirect(url_for('player_bp.player_page', player_id=player_id))
+        # Admin toggle might need a separate route in admin.py if different logic/redirect needed
+        # Or check role here:
+        # if session.get('is_admin'):
+        #    return redirect(url_for('home_bp.index')) # Or admin player list
+        # else:
+        return redirect(url_for('player_bp.player_page', player_id=player_id))
 
 
 # --- Player Inbox ---
@@ -311,34 +325,32 @@ def toggle_availability():
 @login_required
 def player_inbox():
     player_id = session['player_id']
-    players = load_players()
-    player = get_player(players, player_id)
+    player = current_player()
 
     if not player:
         flash("Player not found.", "danger")
         return redirect(url_for('auth.player_login'))
 
-    # Inbox items are assumed to be persistent, sort by timestamp descending
-    inbox_items = sorted(player.inbox, key=lambda x: x.get('timestamp', ''), reverse=True)
+    # First page only, newest first; inbox.js fetches older pages as you scroll
+    inbox_items, next_cursor = get_notification_store().page(player_id, 'inbox', limit=INBOX_PAGE_SIZE)
 
-    return render_template('player_inbox.html', player=player, inbox=inbox_items)
+    return render_template('player_inbox.html', player=player, inbox=inbox_items, next_cursor=next_cursor)
 
 # --- Clear Notifications (keeps Inbox) ---
 @player_bp.route('/clear_notifications', methods=['POST']) # Use POST, removed player_id
 @login_required
 def clear_notifications():
     player_id = session['player_id']
-    players = load_players()
-    player = get_player(players, player_id)
+    with store.transaction() as tx:
+        player = tx.player(player_id)
 
-    if player:
-        player.clear_notifications() # Use the model method
-        save_players(players)
-        flash("Notifications cleared.", "info")
-    else:
-        flash("Player not found.", "danger") # Should not happen
+        if player:
+            player.clear_notifications() # Use the model method
+            flash("Notifications cleared.", "info")
+        else:
+            flash("Player not found.", "danger") # Should not happen
 
-    return redirect(url_for('player_bp.player_page', player_id=player_id))
+        return redirect(url_for('player_bp.player_page', player_id=player_id))
 
 
 # --- Submit Players' Player Rating ---
@@ -346,80 +358,77 @@ def clear_notifications():
 @login_required
 def players_player_rating():
     rater_id = session['player_id']
-    players = load_players()
-    matches = load_matches()
-    rater = get_player(players, rater_id)
+    with store.transaction() as tx:
+        rater = tx.player(rater_id)
 
-    if not rater: # Should not happen
-        flash("Rater data not found.", "danger")
-        return redirect(url_for('home_bp.index'))
+        if not rater: # Should not happen
+            flash("Rater data not found.", "danger")
+            return redirect(url_for('home_bp.index'))
 
-    # --- Get Form Data ---
-    target_id = request.form.get('target_id')
-    match_id = request.form.get('match_id') # Get match_id from the form
-    comment = request.form.get('comment', '').strip()
-    try:
-        rating = int(request.form.get('rating', 0))
-        if not (1 <= rating <= 5):
-             raise ValueError("Rating must be between 1 and 5.")
-    except ValueError as e:
-        flash(f"Invalid rating: {e}", "danger")
-        # Redirect back to the profile page where the form was
-        return redirect(request.referrer or url_for('home_bp.view_players'))
-
-
-    # --- Validations ---
-    if target_id == rater_id:
-        flash("❌ You cannot rate yourself.", "warning")
-        return redirect(request.referrer or url_for('home_bp.view_players'))
-
-    target_player = get_player(players, target_id)
-    if not target_player:
-        flash("Target player not found.", "danger")
-        return redirect(request.referrer or url_for('home_bp.view_players'))
-
-    match = get_match_by_id(match_id) # Use helper to find match
-    if not match:
-        flash("Match context not found for rating.", "danger")
-        return redirect(request.referrer or url_for('home_bp.view_players'))
-
-    # Check participation
-    if rater_id not in match.players or target_id not in match.players:
-        flash("❌ You and the target player must have participated in the same match to rate.", "warning")
-        return redirect(request.referrer or url_for('home_bp.view_players'))
-
-    # Check if already rated *for this specific match*
-    already_rated = any(
-        r.get('from') == rater_id and r.get('match_id') == match_id
-        for r in target_player.players_player_ratings
-    )
-    if already_rated:
-        flash(f"⚠️ You have already submitted a Players' Player rating for {target_player.name} for this match.", "warning")
-        return redirect(request.referrer or url_for('home_bp.view_players'))
-
-    # --- Save Rating and Notify ---
-    rating_data = {
-        "from": rater_id,
-        "match_id": match_id,
-        "rating": rating,
-        "comment": comment,
-        "timestamp": datetime.now().isoformat() # Add timestamp to rating itself
-    }
-    target_player.players_player_ratings.append(rating_data)
-
-    # Add notification for the rated player
-    notification_data = {
-        "type": "players_player_rating", # Specific type
-        "from": rater.name, # Send rater's name
-        "rating": rating,
-        "comment": comment,
-        "match_id": match_id,
-        "timestamp": rating_data["timestamp"] # Use same timestamp
-    }
-    target_player.add_notification(notification_data) # Use helper
-
-    save_players(players)
-
-    flash(f"✅ You rated {target_player.name} {rating}/5 for Players' Player.", "success")
-    # Redirect back to the general player list after rating
-    return redirect(url_for('home_bp.view_players'))
\ No newline at end of file
+        # --- Get Form Data ---
+        target_id = request.form.get('target_id')
+        match_id = request.form.get('match_id') # Get match_id from the form
+        comment = request.form.get('comment', '').strip()
+        try:
+            rating = int(request.form.get('rating', 0))
+            if not (1 <= rating <= 5):
+                 raise ValueError("Rating must be between 1 and 5.")
+        except ValueError as e:
+            flash(f"Invalid rating: {e}", "danger")
+            # Redirect back to the profile page where the form was
+            return redirect(request.referrer or url_for('home_bp.view_players'))
+
+
+        # --- Validations ---
+        if target_id == rater_id:
+            flash("❌ You cannot rate yourself.", "warning")
+            return redirect(request.referrer or url_for('home_bp.view_players'))
+
+        target_player = tx.player(target_id)
+        if not target_player:
+            flash("Target player not found.", "danger")
+            return redirect(request.referrer or url_for('home_bp.view_players'))
+
+        match = tx.match(match_id)
+        if not match:
+            flash("Match context not found for rating.", "danger")
+            return redirect(request.referrer or url_for('home_bp.view_players'))
+
+        # Check participation
+        if rater_id not in match.players or target_id not in match.players:
+            flash("❌ You and the target player must have participated in the same match to rate.", "warning")
+            return redirect(request.referrer or url_for('home_bp.view_players'))
+
+        # Check if already rated *for this specific match*
+        already_rated = any(
+            r.get('from') == rater_id and r.get('match_id') == match_id
+            for r in target_player.players_player_ratings
+        )
+        if already_rated:
+            flash(f"⚠️ You have already submitted a Players' Player rating for {target_player.name} for this match.", "warning")
+            return redirect(request.referrer or url_for('home_bp.view_players'))
+
+        # --- Save Rating and Notify ---
+        rating_data = {
+            "from": rater_id,
+            "match_id": match_id,
+            "rating": rating,
+            "comment": comment,
+            "timestamp": datetime.now().isoformat() # Add timestamp to rating itself
+        }
+        target_player.players_player_ratings.append(rating_data)
+
+        # Add notification for the rated player
+        notification_data = {
+            "type": "players_player_rating", # Specific type
+            "from": rater.name, # Send rater's name
+            "rating": rating,
+            "comment": comment,
+            "match_id": match_id,
+            "timestamp": rating_data["timestamp"] # Use same timestamp
+        }
+        target_player.add_notification(notification_data) # Use helper
+
+        flash(f"✅ You rated {target_player.name} {rating}/5 for Players' Player.", "success")
+        # Redirect back to the general player list after rating
+        return redirect(url_for('home_bp.view_players'))
@@ -0,0 +1,156 @@
+# backend/utils/compact_format.py
+# Compact on-disk format for players.json / matches.json.
+#
+# Layout:  b'7ASC' | version (1 byte) | header length (uint32 LE) | header | columns
+#
+# The header is key-compact JSON. For player lists, every "simple" performance log
+# (exactly goals/assists/tackles/saves as ints, rating as float, match_id as str or
+# None) is moved out of the header into little-endian columns: int64 for the counts,
+# float64 for the rating and an int32 index into a de-duplicated match id table.
+# That player's 'match_history' is then replaced by the number of logs. Any other
+# history is left in the header untouched, so a round trip is always lossless.
+import json
+import struct
+import sys
+from array import array
+
+MAGIC = b'7ASC'
+VERSION = 1
+_HEADER_LEN = struct.Struct('<I')
+
+INT_COLUMNS = ('goals', 'assists', 'tackles', 'saves')
+SIMPLE_LOG_KEYS = frozenset(INT_COLUMNS + ('rating', 'match_id'))
+
+
+def is_compact(payload):
+    return payload[:len(MAGIC)] == MAGIC
+
+
+def _is_simple_log(log):
+    if not isinstance(log, dict) or log.keys() != SIMPLE_LOG_KEYS:
+        return False
+    for key in INT_COLUMNS:
+        value = log[key]
+        if type(value) is not int or not -2**63 <= value < 2**63:
+            return False
+    match_id = log['match_id']
+    return type(log['rating']) is float and (match_id is None or type(match_id) is str)
+
+
+def _column_bytes(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _column_from_bytes(typecode, payload):
+    values = array(typecode)
+    values.frombytes(payload)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def dumps(data):
+    """Encodes a JSON-compatible value. Lists of player dicts get columnar histories."""
+    header = {'data': data}
+    blobs = []
+
+    if isinstance(data, list) and any(isinstance(p, dict) and 'match_history' in p for p in data):
+        columns = {key: array('q') for key in INT_COLUMNS}
+        ratings = array('d')
+        match_refs = array('i')
+        match_ids = {}
+        encoded = []
+        for p in data:
+            history = p.get('match_history') if isinstance(p, dict) else None
+            if not isinstance(history, list) or not history or not all(_is_simple_log(log) for log in history):
+                encoded.append(p)
+                continue
+            for log in history:
+                for key in INT_COLUMNS:
+                    columns[key].append(log[key])
+                ratings.append(log['rating'])
+                match_id = log['match_id']
+                match_refs.append(-1 if match_id is None else match_ids.setdefault(match_id, len(match_ids)))
+            p = dict(p)
+            p['match_history'] = len(history)
+            encoded.append(p)
+
+        header = {'data': encoded, 'match_ids': list(match_ids), 'columns': []}
+        for name, values in list(columns.items()) + [('rating', ratings), ('match_id', match_refs)]:
+            blob = _column_bytes(values)
+            header['columns'].append([name, values.typecode, len(blob)])
+            blobs.append(blob)
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    return b''.join([MAGIC, bytes([VERSION]), _HEADER_LEN.pack(len(header_bytes)), header_bytes] + blobs)
+
+
+def loads(payload):
+    """Decodes bytes produced by dumps() back to the original JSON value."""
+    if not is_compact(payload):
+        raise ValueError("Not a compact data file.")
+    if payload[len(MAGIC)] != VERSION:
+        raise ValueError(f"Unsupported compact format version {payload[len(MAGIC)]}.")
+    offset = len(MAGIC) + 1
+    (header_len,) = _HEADER_LEN.unpack_from(payload, offset)
+    offset += _HEADER_LEN.size
+    header = json.loads(payload[offset:offset + header_len].decode('utf-8'))
+    offset += header_len
+
+    data = header['data']
+    if not header.get('columns'):
+        return data
+
+    cols = {}
+    for name, typecode, length in header['columns']:
+        cols[name] = _column_from_bytes(typecode, payload[offset:offset + length])
+        offset += length
+    goals, assists, tackles, saves = (cols[key] for key in INT_COLUMNS)
+    ratings, match_refs = cols['rating'], cols['match_id']
+    match_ids = header['match_ids']
+
+    row = 0
+    for p in data:
+        count = p.get('match_history') if isinstance(p, dict) else None
+        if type(count) is not int:
+            continue
+        history = []
+        for i in range(row, row + count):
+            ref = match_refs[i]
+            history.append({
+                'goals': goals[i], 'assists': assists[i], 'tackles': tackles[i], 'saves': saves[i],
+                'rating': ratings[i], 'match_id': match_ids[ref] if ref >= 0 else None,
+            })
+        p['match_history'] = history
+        row += count
+    return data
+
+
+def convert_file(filepath, target):
+    """Rewrites a data file in place as 'json' or 'compact'. Returns the new size in bytes."""
+    import os
+    from backend.utils.file_io import atomic_write_bytes
+    with open(filepath, 'rb') as f:
+        payload = f.read()
+    data = loads(payload) if is_compact(payload) else json.loads(payload.decode('utf-8'))
+    if target == 'compact':
+        out = dumps(data)
+    elif target == 'json':
+        out = json.dumps(data, indent=4).encode('utf-8')
+    else:
+        raise ValueError("target must be 'json' or 'compact'")
+    atomic_write_bytes(filepath, out)
+    return os.path.getsize(filepath)
+
+
+if __name__ == '__main__':
+    # python -m backend.utils.compact_format json|compact <file> [<file> ...]
+    if len(sys.argv) < 3 or sys.argv[1] not in ('json', 'compact'):
+        print("usage: python -m backend.utils.compact_format json|compact <file> [<file> ...]")
+        sys.exit(2)
+    for path in sys.argv[2:]:
+        size = convert_file(path, sys.argv[1])
+        print(f"{path}: converted to {sys.argv[1]} ({size} bytes)")
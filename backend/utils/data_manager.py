@@ -1,67 +1,112 @@
 # backend/utils/data_manager.py
-import uuid
-import json
 import os
+from functools import wraps
 from backend.models.player import Player # Corrected import path if needed
+from backend.models.roster import Roster
+from backend.models.access_code import new_access_code, hash_access_code
+from backend.utils.storage import JsonStorage, SqliteStorage
+from backend.utils.notification_store import JsonlNotificationStore, SqliteNotificationStore, embedded_to_log
+from backend.utils.player_repository import PlayerRepository
+from backend.utils.event_feed import EventFeed
+from backend.utils.draft_engine import DraftEngine
+from backend.utils.login_index import LoginIndex
+from backend.utils.file_io import file_lock
 
 
 # Define paths relative to this file's directory or use absolute paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # backend directory
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(BASE_DIR, 'data'))
 PLAYER_FILE = os.path.join(DATA_DIR, 'players.json')
 DRAFT_FILE = os.path.join(DATA_DIR, 'draft_state.json')
 CONFIG_FILE = os.path.join(os.path.dirname(BASE_DIR), 'config.json') # config.json at project root
 MATCH_FILE = os.path.join(DATA_DIR, 'matches.json') # Moved match file path definition here
+SQLITE_FILE = os.getenv('SQLITE_PATH', os.path.join(DATA_DIR, 'app.db'))
+LOCK_FILE = os.path.join(DATA_DIR, '.data.lock')
+NOTIFICATION_LOG_FILE = os.path.join(DATA_DIR, 'notifications.jsonl')
+EVENT_FEED_FILE = os.path.join(DATA_DIR, 'events.jsonl')
+DRAFT_LOG_FILE = os.path.join(DATA_DIR, 'draft_picks.jsonl')
+LOGIN_INDEX_FILE = os.path.join(DATA_DIR, 'login_index.json')
+
+_storage = None
+_notification_store = None
+event_feed = EventFeed(EVENT_FEED_FILE)
+# Live draft state; the storage backend's draft_state is its start/completion snapshot
+draft_engine = DraftEngine(DRAFT_LOG_FILE,
+                           load_snapshot=lambda: get_storage().load_draft_state() or {},
+                           save_snapshot=lambda state: get_storage().save_draft_state(state))
+# (name, access-code hash) -> player id; see auth.player_login
+login_index = LoginIndex(LOGIN_INDEX_FILE,
+                         load_records=lambda: get_storage().load_players(),
+                         signature=lambda: get_storage().players_signature(),
+                         write_lock=lambda: data_lock())
 
 
 def ensure_data_dir_exists():
     """Creates the data directory if it doesn't exist."""
     os.makedirs(DATA_DIR, exist_ok=True)
 
-def _load_json(filepath, default=None):
-    """Helper function to load JSON data from a file."""
-    ensure_data_dir_exists()
-    if not os.path.exists(filepath):
-        return default
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        # Log error or handle appropriately
-        print(f"Error reading or decoding JSON from {filepath}")
-        return default
-
-def _save_json(filepath, data):
-    """Helper function to save data to a JSON file."""
-    ensure_data_dir_exists()
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4) # Use indent 4 for consistency
-    except IOError:
-        # Log error or handle appropriately
-        print(f"Error writing JSON to {filepath}")
+def get_storage():
+    """Returns the process-wide storage backend chosen by STORAGE_BACKEND ('json' or 'sqlite')."""
+    global _storage
+    if _storage is None:
+        backend = os.getenv('STORAGE_BACKEND', 'json').lower()
+        if backend == 'sqlite':
+            _storage = SqliteStorage(SQLITE_FILE)
+        else:
+            _storage = JsonStorage(DATA_DIR, PLAYER_FILE, MATCH_FILE, DRAFT_FILE, CONFIG_FILE)
+    return _storage
+
+def get_notification_store():
+    """Returns the append-only notification store matching the storage backend."""
+    global _notification_store
+    if _notification_store is None:
+        storage = get_storage()
+        if storage.name == 'sqlite':
+            _notification_store = SqliteNotificationStore(storage)
+        else:
+            _notification_store = JsonlNotificationStore(NOTIFICATION_LOG_FILE)
+    return _notification_store
+
+
+# --- Locking ---
+def data_lock():
+    """Exclusive inter-process lock over all stores. Hold it across a whole
+    load -> mutate -> save sequence so concurrent workers can't lose updates."""
+    return file_lock(LOCK_FILE)
+
+def with_data_lock(f):
+    """Route decorator: runs the whole handler under data_lock()."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with data_lock():
+            return f(*args, **kwargs)
+    return decorated_function
 
 
 # --- Draft State ---
 def load_draft_state():
-    return _load_json(DRAFT_FILE, default={}) # Return empty dict if file missing/invalid
+    return draft_engine.state() # Empty dict if no draft has been started
 
 def save_draft_state(state):
-    _save_json(DRAFT_FILE, state)
+    """Starts (or clears, with {}) a draft. Picks go through Transaction.draft_pick()."""
+    with data_lock():
+        draft_engine.start(state)
 
 # --- Config ---
 def load_config():
-    return _load_json(CONFIG_FILE, default={"ratings_enabled": True})
+    return get_storage().load_config(default={"ratings_enabled": True})
 
 def save_config(config):
-    _save_json(CONFIG_FILE, config)
+    with data_lock():
+        get_storage().save_config(config)
 
 # --- Players ---
-def load_players():
-    players_data = _load_json(PLAYER_FILE, default=[])
+def _read_players():
+    """Parses the stored roster into Player objects. Only PlayerRepository should call this."""
+    players_data = get_storage().load_players()
     # Ensure data is a list
     if not isinstance(players_data, list):
-        print(f"Warning: {PLAYER_FILE} does not contain a valid list. Returning empty list.")
+        print(f"Warning: player store does not contain a valid list. Returning empty list.")
         return []
     players = []
     for p_data in players_data:
@@ -74,40 +119,152 @@ def load_players():
         else:
             print(f"Skipping invalid player data entry: {p_data}")
 
-    # Recalculate rating differences after loading
-    for player in players:
-        player._calculate_rating_diff()
+    # rating_diff and form are computed on first use and cached on each player
     return players
 
+def migrate_legacy_players():
+    """Upgrades rosters saved by older versions. Called once from create_app, before
+    any request, so the player cache never has to take data_lock() while loading."""
+    players_data = get_storage().load_players()
+    if not isinstance(players_data, list):
+        return
+    if any(isinstance(p, dict) and (p.get('notifications') or p.get('inbox')) for p in players_data):
+        players_data = _migrate_embedded_notifications()
+    if any(isinstance(p, dict) and p.get('access_code') for p in players_data):
+        _migrate_plain_access_codes()
+
+def _migrate_embedded_notifications():
+    """Moves the notifications/inbox lists older versions kept inside each player record
+    into the notification store, then rewrites the roster without them. Runs once."""
+    with data_lock():
+        players_data = get_storage().load_players()
+        notification_store = get_notification_store()
+        migrated = 0
+        for p_data in players_data:
+            if not isinstance(p_data, dict) or 'id' not in p_data:
+                continue
+            notifications, inbox = p_data.pop('notifications', None), p_data.pop('inbox', None)
+            # A log that already exists means an earlier run got this far before stopping
+            if (notifications or inbox) and not notification_store.inbox(p_data['id']):
+                notification_store.import_player(p_data['id'], *embedded_to_log(notifications, inbox))
+                migrated += 1
+        get_storage().save_players(players_data)
+    print(f"Moved notifications for {migrated} players into the notification store.")
+    return players_data
+
+def _migrate_plain_access_codes():
+    """Replaces the plain access codes older versions stored with their hashes. Runs once;
+    players keep logging in with the codes they already have."""
+    with data_lock():
+        players_data = get_storage().load_players()
+        migrated = 0
+        for p_data in players_data:
+            if isinstance(p_data, dict) and p_data.get('access_code'):
+                code = p_data.pop('access_code')
+                p_data.setdefault('access_code_hash', hash_access_code(code))
+                migrated += 1
+        if migrated:
+            get_storage().save_players(players_data)
+            login_index.replace(players_data)
+    print(f"Hashed the access codes of {migrated} players.")
+    return players_data
+
+player_repository = PlayerRepository(_read_players, lambda: get_storage().players_signature())
+
+def load_players():
+    """Returns private copies of the cached roster as a Roster (indexed by id, access
+    code, name and position); the file is only parsed when it changes."""
+    return Roster(player_repository.snapshot())
+
+def load_player(player_id):
+    """Returns a copy of a single player without copying the rest of the roster."""
+    return player_repository.get(player_id)
+
+def player_exists(player_id):
+    """Cheap existence check against the login index; no Player is loaded. Removing a
+    player drops them from the index, so their sessions stop validating."""
+    return bool(player_id) and login_index.has(player_id)
+
 def save_players(players):
     if not isinstance(players, list) or not all(isinstance(p, Player) for p in players):
          raise ValueError("save_players expects a list of Player objects.")
-    _save_json(PLAYER_FILE, [p.to_dict() for p in players])
+    with data_lock():
+        players_data = [p.to_dict() for p in players]
+        get_storage().save_players(players_data)
+        login_index.replace(players_data)
+        flush_notifications(players)
+        player_repository.invalidate()
+
+def update_players(players):
+    """Persists only the given players. Row-level on SQLite, one file rewrite on JSON."""
+    if not all(isinstance(p, Player) for p in players):
+        raise ValueError("update_players expects Player objects.")
+    if players:
+        with data_lock():
+            players_data = [p.to_dict() for p in players]
+            before = get_storage().players_signature()
+            get_storage().update_players(players_data)
+            login_index.apply(before, changed=players_data)
+            flush_notifications(players)
+            player_repository.invalidate()
+
+def save_player(player):
+    """Persists a single player."""
+    update_players([player])
+
+def delete_player(player_id):
+    """Removes a player from storage. Returns True if a record was deleted."""
+    with data_lock():
+        before = get_storage().players_signature()
+        deleted = get_storage().delete_player(player_id)
+        if deleted:
+            login_index.apply(before, removed=[player_id])
+            get_notification_store().apply([(player_id, 'drop', None)])
+        player_repository.invalidate()
+    return deleted
+
+def flush_notifications(players):
+    """Appends the notification changes queued on these players. Nothing else is rewritten."""
+    ops = [(p.id, op, data) for p in players for op, data in p.take_notification_ops()]
+    if ops:
+        with data_lock():
+            get_notification_store().apply(ops)
+        # Live update for the recipients' open pages (see /api/notifications/<id>/stream)
+        event_feed.publish([(f"player:{player_id}", 'notification', data)
+                            for player_id, op, data in ops if op == 'add'])
 
 # --- Matches (Moved from match_manager.py for consistency) ---
 def load_matches_data():
-    """Loads raw match data from JSON."""
-    return _load_json(MATCH_FILE, default=[])
+    """Loads raw match data from storage."""
+    return get_storage().load_matches() or []
 
 def save_matches_data(matches_data):
-    """Saves raw match data to JSON."""
-    _save_json(MATCH_FILE, matches_data)
+    """Saves raw match data to storage."""
+    with data_lock():
+        get_storage().save_matches(matches_data)
 
 
 # --- Utility ---
-def generate_unique_code(existing_codes):
-    """Generate a short unique uppercase code not in existing_codes set."""
+def generate_unique_code(existing_codes=None):
+    """Generate a short uppercase access code no player holds (checked against the
+    login index), or that isn't in `existing_codes` if a set is given."""
     while True:
-        new_code = str(uuid.uuid4())[:6].upper() # Make codes uppercase
-        if new_code not in existing_codes:
+        new_code = new_access_code()
+        taken = new_code in existing_codes if existing_codes is not None else login_index.code_in_use(new_code)
+        if not taken:
             return new_code
         
 # --- Lookup ---
 def get_player(players, player_id):
-    """Safely retrieves a Player object by ID from a list of Player instances."""
-    for p in players:
-        if isinstance(p, Player) and p.id == player_id:
-            return p
+    """Safely retrieves a Player object by ID: an index lookup on a Roster, a scan of any other list."""
+    if isinstance(players, Roster):
+        player = players.get(player_id)
+        if player is not None:
+            return player
+    else:
+        for p in players:
+            if isinstance(p, Player) and p.id == player_id:
+                return p
     print(f"[DEBUG] get_player: Player ID '{player_id}' not found in list.")
     return None
 
@@ -122,8 +279,9 @@ def get_config_value(key, default=None):
 
 def set_config_value(key, value):
     #sets and saves a single config key/value.
-    config = load_config()
-    config[key] = value
-    save_config(config)
+    with data_lock():
+        config = load_config()
+        config[key] = value
+        save_config(config)
     
     
\ No newline at end of file
@@ -0,0 +1,292 @@
+# backend/utils/draft_engine.py
+# The live draft, held in memory and persisted as an append-only pick log.
+#
+# Starting (or resetting) a draft writes a fresh log whose first line is the whole
+# initial state; every pick after that is one short line:
+#
+#     {"start": {"captain1_id": ..., "remaining_ids": [...], "turn": ..., ...}}
+#     {"pick": "<player id>", "by": "<captain id>", "at": "<iso time>"}
+#
+# The engine replays the log at startup and then tails it, so picks made by other
+# workers show up without rereading anything else. Remaining and picked players are
+# kept in dicts, so validating a pick and removing the player are O(1). The full
+# state is written to the draft_state store only when a draft starts or completes,
+# which keeps that snapshot readable by older tooling and the SQLite backend.
+#
+# A draft has any number of captains (captain1_id, captain2_id, captain3_id, ...;
+# team1_ids, team2_ids, ... alongside). Whose turn it is follows from how many
+# picks have been made and the draft's 'order' (see DRAFT_ORDERS). With
+# 'pick_seconds' set, every turn gets a 'deadline'; draft_scheduler auto-picks for
+# a captain who lets it pass.
+import json
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from backend.utils.file_io import file_lock
+
+
+class DraftError(ValueError):
+    """A pick (or draft) the current draft state doesn't allow."""
+
+
+def captain_key(team):
+    return f'captain{team}_id'
+
+def team_key(team):
+    return f'team{team}_ids'
+
+def state_captains(state):
+    """Captain ids of a draft state dict, in team order."""
+    captains = []
+    while captain_key(len(captains) + 1) in state:
+        captains.append(state[captain_key(len(captains) + 1)])
+    return captains
+
+
+def alternating_order(pick_number, num_teams):
+    """1, 2, 3, 1, 2, 3, ..."""
+    return pick_number % num_teams
+
+def snake_order(pick_number, num_teams):
+    """1, 2, 3, 3, 2, 1, 1, 2, ...: whoever picks last in a round picks first in the next."""
+    round_number, slot = divmod(pick_number, num_teams)
+    return slot if round_number % 2 == 0 else num_teams - 1 - slot
+
+# Draft order name -> function(picks made so far, number of teams) -> index of the team to pick
+DRAFT_ORDERS = {
+    'alternating': alternating_order,
+    'snake': snake_order,
+}
+DEFAULT_ORDER = 'alternating'
+
+# What a pick does: `team` counts from 1, `next_turn` is None once the draft is complete
+Pick = namedtuple('Pick', 'player_id captain_id team next_turn remaining complete at auto deadline',
+                  defaults=(False, None))
+
+
+def new_draft_state(captain_ids, remaining_ids, order=DEFAULT_ORDER, pick_seconds=None, **extra):
+    """The initial state of a draft between `captain_ids` (first picks first),
+    ready for DraftEngine.start(). `extra` keys (match_id, match, ...) are kept as is."""
+    if len(captain_ids) < 2:
+        raise DraftError("A draft needs at least two captains.")
+    if order not in DRAFT_ORDERS:
+        raise DraftError(f"Unknown draft order: {order}")
+    now = datetime.now()
+    state = dict(extra)
+    for team, captain_id in enumerate(captain_ids, 1):
+        state[captain_key(team)] = captain_id
+        state[team_key(team)] = []
+    state.update({
+        'remaining_ids': list(remaining_ids),
+        'order': order,
+        'turn': captain_ids[DRAFT_ORDERS[order](0, len(captain_ids))],
+        'complete': False,
+        'start_time': now.isoformat(),
+    })
+    if pick_seconds:
+        state['pick_seconds'] = pick_seconds
+        state['deadline'] = (now + timedelta(seconds=pick_seconds)).isoformat()
+    return state
+
+
+class DraftEngine:
+    def __init__(self, log_path, load_snapshot, save_snapshot):
+        self.log_path = log_path
+        self.lock_path = log_path + '.lock'
+        self._load_snapshot = load_snapshot
+        self._save_snapshot = save_snapshot
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._indexed_bytes = 0
+        self._inode = None
+        self._loaded = False
+        self._set_state({})
+
+    def _set_state(self, state):
+        state = state or {}
+        self._captains = state_captains(state)
+        num_teams = max(2, len(self._captains))
+        self._team_keys = {team_key(t) for t in range(1, num_teams + 1)}
+        self._base = {k: v for k, v in state.items() if k not in self._team_keys and k != 'remaining_ids'}
+        self._remaining = dict.fromkeys(state.get('remaining_ids', [])) # Ordered set
+        self._teams = [list(state.get(team_key(t), [])) for t in range(1, num_teams + 1)]
+        self._team_of = {pid: t for t, team in enumerate(self._teams) for pid in team}
+        self._picks_made = sum(len(team) for team in self._teams)
+
+    def _catch_up(self):
+        """Applies any complete log lines written since the last call. Caller holds self._lock."""
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            # No log yet (fresh install, or a draft saved before the log existed)
+            if not self._loaded or self._inode is not None:
+                self._reset()
+                self._set_state(self._load_snapshot())
+                self._loaded = True
+            return
+        if st.st_ino != self._inode or st.st_size < self._indexed_bytes:
+            self._reset() # A new draft replaced the log
+            self._inode = st.st_ino
+            self._loaded = True
+        if st.st_size == self._indexed_bytes:
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._indexed_bytes)
+            offset = self._indexed_bytes
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break # Partial trailing line; a writer is mid-append
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, KeyError, TypeError):
+                    print(f"Skipping unreadable draft record at byte {offset} of {self.log_path}")
+                offset += len(line)
+            self._indexed_bytes = offset
+
+    def _apply(self, record):
+        if 'start' in record:
+            self._set_state(record['start'])
+        elif 'pick' in record:
+            self._apply_pick(self._plan(record['by'], record['pick'], record.get('at'),
+                                        auto=record.get('auto', False), validate=False))
+
+    def _plan(self, captain_id, player_id, at, auto=False, validate=True):
+        if validate:
+            if not self._base or self._base.get('complete'):
+                raise DraftError("Draft is not active or already completed.")
+            if self._base.get('turn') != captain_id:
+                raise DraftError("It's not your turn to pick.")
+            if player_id not in self._remaining:
+                raise DraftError("Invalid player selected or player already picked.")
+        if captain_id not in self._captains:
+            raise DraftError("Internal error: Invalid turn state.")
+        at = at or datetime.now().isoformat()
+        team = self._captains.index(captain_id)
+        remaining = len(self._remaining) - (player_id in self._remaining)
+        next_turn = deadline = None
+        if remaining:
+            order = DRAFT_ORDERS.get(self._base.get('order'), DRAFT_ORDERS[DEFAULT_ORDER])
+            next_turn = self._captains[order(self._picks_made + 1, len(self._captains))]
+            if self._base.get('pick_seconds'):
+                deadline = (datetime.fromisoformat(at) + timedelta(seconds=self._base['pick_seconds'])).isoformat()
+        return Pick(player_id, captain_id, team + 1, next_turn, remaining, not remaining, at, auto, deadline)
+
+    def _apply_pick(self, pick):
+        self._remaining.pop(pick.player_id, None)
+        self._teams[pick.team - 1].append(pick.player_id)
+        self._team_of[pick.player_id] = pick.team - 1
+        self._picks_made += 1
+        self._base['turn'] = pick.next_turn
+        if 'pick_seconds' in self._base:
+            self._base['deadline'] = pick.deadline
+        if pick.complete:
+            self._base['complete'] = True
+            self._base['end_time'] = pick.at
+
+    # --- Reads ---
+    def state(self):
+        """The draft as the classic draft_state dict (a copy; changing it does nothing)."""
+        with self._lock:
+            self._catch_up()
+            if not self._base:
+                return {}
+            state = dict(self._base)
+            for number, team in enumerate(self._teams, 1):
+                state[team_key(number)] = list(team)
+            state['remaining_ids'] = list(self._remaining)
+            return state
+
+    def get(self, key, default=None):
+        """One top-level field (captain ids, turn, match, ...) without copying the pools."""
+        with self._lock:
+            self._catch_up()
+            return self._base.get(key, default)
+
+    def is_remaining(self, player_id):
+        with self._lock:
+            self._catch_up()
+            return player_id in self._remaining
+
+    def captains(self):
+        """Captain ids in team order."""
+        with self._lock:
+            self._catch_up()
+            return list(self._captains)
+
+    def overdue(self, now=None):
+        """The captain whose pick deadline has passed, or None."""
+        with self._lock:
+            self._catch_up()
+            deadline = self._base.get('deadline')
+            if not deadline or self._base.get('complete') or not self._base.get('turn'):
+                return None
+            if datetime.fromisoformat(deadline) > (now or datetime.now()):
+                return None
+            return self._base['turn']
+
+    def team_of(self, player_id):
+        """The team number (from 1) of a picked player, else None."""
+        with self._lock:
+            self._catch_up()
+            team = self._team_of.get(player_id)
+            return None if team is None else team + 1
+
+    # --- Writes (callers hold data_lock) ---
+    def plan_pick(self, captain_id, player_id, auto=False):
+        """Validates a pick against the current state and returns what it would do,
+        without applying it. Raises DraftError if it isn't allowed; an `auto` pick is
+        only allowed once the captain's deadline has passed."""
+        with self._lock:
+            self._catch_up()
+            if auto and self.overdue() != captain_id:
+                raise DraftError("The captain's pick deadline hasn't passed.")
+            return self._plan(captain_id, player_id, None, auto=auto)
+
+    def record(self, picks):
+        """Appends planned picks to the log in one write and applies them. A pick that
+        completes the draft also refreshes the snapshot."""
+        if not picks:
+            return
+        lines = ''.join(json.dumps(_pick_record(p), separators=(',', ':')) + '\n' for p in picks)
+        with file_lock(self.lock_path), self._lock:
+            self._catch_up()
+            if not self._loaded or self._inode is None:
+                # Draft came from a snapshot only: give it a log to append to
+                self._write_log(self.state())
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines.encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._catch_up()
+            if self._base.get('complete'):
+                self._save_snapshot(self.state())
+
+    def start(self, state):
+        """Replaces the draft (an empty dict clears it): a new log and a fresh snapshot."""
+        state = state or {}
+        with file_lock(self.lock_path), self._lock:
+            self._write_log(state)
+            self._save_snapshot(state)
+            self._catch_up()
+
+    def _write_log(self, state):
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        tmp_path = self.log_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'start': state}, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.log_path) # New inode: other workers replay from the top
+
+
+def _pick_record(pick):
+    record = {'pick': pick.player_id, 'by': pick.captain_id, 'at': pick.at}
+    if pick.auto:
+        record['auto'] = True
+    return record
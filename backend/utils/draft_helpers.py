@@ -0,0 +1,128 @@
+# backend/utils/draft_helpers.py
+# What happens around a draft pick, shared by captains' picks (routes/draft.py)
+# and the scheduler's auto-picks (draft_scheduler.py).
+from datetime import datetime
+
+from backend.utils.data_manager import draft_engine, get_config_value
+from backend.utils.draft_engine import team_key, state_captains, DEFAULT_ORDER
+from backend.utils.match_manager import get_current_draft_match
+
+
+def draft_settings():
+    """Order and per-pick time limit for new drafts, from config: 'draft_order'
+    ('alternating' or 'snake') and 'draft_pick_seconds' (0 or unset: no limit)."""
+    pick_seconds = get_config_value('draft_pick_seconds', 0)
+    return {
+        'order': get_config_value('draft_order', DEFAULT_ORDER),
+        'pick_seconds': int(pick_seconds) if pick_seconds else None,
+    }
+
+
+def announce_start(tx, state):
+    """Publishes a new draft and tells each captain whether they pick first."""
+    captain_ids = state_captains(state)
+    tx.publish('draft', 'start', {"captain_ids": captain_ids, "turn_id": state['turn'],
+                                  "deadline": state.get('deadline')})
+    for captain_id in captain_ids:
+        captain = tx.player(captain_id)
+        if not captain:
+            continue
+        if captain_id == state['turn']:
+            captain.add_notification({"type": "draft_start", "message": "The draft has started! It's your turn to pick."})
+        else:
+            captain.add_notification({"type": "draft_start", "message": "The draft has started! Waiting for the first pick."})
+
+
+def _match_details(match, matches):
+    """`match` (a draft's stored match details) or, failing that, the next scheduled match's."""
+    if not match:
+        upcoming = get_current_draft_match(matches)
+        match = upcoming and {"match_id": upcoming.match_id, "date": upcoming.date,
+                              "start_time": upcoming.start_time, "location": upcoming.location}
+    return match
+
+
+def draft_match(tx):
+    """Date, time and place of the match being drafted for, or None. Drafts created for
+    a match carry its details; otherwise the next scheduled match is used."""
+    return _match_details(draft_engine.get('match'), tx.matches)
+
+
+def upcoming_match(state, player_id, matches):
+    """The match `player_id` has been drafted for or captains, like draft_match(), or
+    None if they aren't on a team in `state`. Derived from the draft and match records
+    on read, so picks don't have to rewrite the picked player."""
+    captain_ids = state_captains(state or {})
+    if player_id not in captain_ids and not any(player_id in state.get(team_key(number), [])
+                                                for number in range(1, len(captain_ids) + 1)):
+        return None
+    return _match_details(state.get('match'), matches)
+
+
+def draft_teams(state, lookup):
+    """[{'number', 'captain', 'players'}] for every team in a draft state dict;
+    `lookup(player_id)` resolves ids to Players (missing ones are skipped)."""
+    return [{
+        'number': number,
+        'captain': lookup(captain_id),
+        'players': [p for pid in state.get(team_key(number), []) if (p := lookup(pid))],
+    } for number, captain_id in enumerate(state_captains(state), 1)]
+
+
+def announce_complete(tx, at):
+    """Tells every captain the draft is over and publishes its completion."""
+    completion_message = {
+        "type": "draft_complete",
+        "message": "✅ Draft is complete! Check the final teams.",
+        "timestamp": at
+    }
+    for captain_id in draft_engine.captains():
+        if (cap := tx.player(captain_id)):
+            cap.add_notification(completion_message)
+    tx.publish('draft', 'complete')
+
+
+def announce_pick(tx, pick, captain, picked_player, match):
+    """Notifies the picked player (when there's a match to tell them about), publishes
+    the pick, then either the draft's completion or the next turn."""
+    if match and captain:
+        picked_player.add_notification({
+            "type": "draft_pick",
+            "message": (
+                f"Congratulations! You have been chosen by Captain {captain.name} "
+                f"for the match on {match['date']} at {match['location']}. "
+                f"Please arrive at least 15 minutes before the {match['start_time']} kick-off!"
+            ),
+            "timestamp": pick.at
+        })
+
+    tx.publish('draft', 'pick', {
+        "player": {"id": picked_player.id, "name": picked_player.name,
+                   "position": picked_player.position, "skill_rating": picked_player.skill_rating},
+        "team": pick.team,
+        "captain_id": pick.captain_id,
+        "remaining": pick.remaining,
+        "auto": pick.auto
+    })
+
+    if pick.complete:
+        announce_complete(tx, pick.at)
+    else:
+        # Notify the *next* captain it's their turn
+        next_captain = tx.player(pick.next_turn)
+        tx.publish('draft', 'turn', {"turn_id": pick.next_turn,
+                                     "turn_name": next_captain.name if next_captain else None,
+                                     "deadline": pick.deadline})
+        if next_captain:
+            next_captain.add_notification({
+                "type": "draft_turn",
+                "message": "It's your turn to pick in the draft!",
+                "timestamp": datetime.now().isoformat()
+            })
+
+    if pick.auto and captain:
+        captain.add_notification({
+            "type": "draft_auto_pick",
+            "message": f"Your pick time ran out, so {picked_player.name} was picked for you.",
+            "timestamp": pick.at
+        })
@@ -0,0 +1,85 @@
+# backend/utils/draft_scheduler.py
+# Background thread that keeps timed drafts moving: when the captain on the clock
+# lets their pick deadline pass, it picks for them (team_generator.best_pick: the
+# best remaining player for their team's weakest position).
+#
+# Every worker process runs one. The deadline is re-checked under data_lock() and
+# the pick goes through the same pick log as a captain's, so only one worker's
+# auto-pick lands.
+import threading
+from datetime import datetime
+
+from backend.utils.data_manager import draft_engine, get_config_value
+from backend.utils.draft_engine import DraftError, captain_key, team_key
+from backend.utils.draft_helpers import announce_complete, announce_pick, draft_match
+from backend.utils.store import store
+from backend.utils.team_generator import best_pick, FALLBACK_WINDOW
+
+POLL_INTERVAL = 2 # Seconds between deadline checks
+
+
+class DraftScheduler:
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Starts the polling thread (once per process)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='draft-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Draft scheduler error: {e}")
+
+    def run_once(self):
+        """Makes the overdue captain's pick, if there is one. Returns the Pick or None."""
+        if not draft_engine.overdue(): # Cheap check outside the lock
+            return None
+        with store.transaction() as tx:
+            captain_id = draft_engine.overdue() # Another worker may have picked meanwhile
+            if not captain_id:
+                return None
+            state = draft_engine.state()
+            number = next(n for n, c in enumerate(draft_engine.captains(), 1) if c == captain_id)
+            team = [p for pid in [state[captain_key(number)]] + state[team_key(number)] if (p := tx.player(pid))]
+            remaining = [p for pid in state['remaining_ids'] if (p := tx.player(pid))]
+            if len(remaining) < len(state['remaining_ids']):
+                self._prune_pool(tx, state, remaining)
+                return None # Picks from the pruned pool on the next tick
+            player, _ = best_pick(team, remaining,
+                                  int(get_config_value('team_fallback_window', FALLBACK_WINDOW)))
+            if player is None:
+                return None
+            try:
+                pick = tx.draft_pick(captain_id, player.id, auto=True)
+            except DraftError as e:
+                print(f"Draft scheduler skipped an auto-pick: {e}")
+                return None
+            announce_pick(tx, pick, tx.player(captain_id), player, draft_match(tx))
+        return pick
+
+    @staticmethod
+    def _prune_pool(tx, state, remaining):
+        """Drops players deleted mid-draft from its pool, which would otherwise leave the
+        captain on the clock nobody to pick. An emptied pool completes the draft."""
+        state['remaining_ids'] = [p.id for p in remaining]
+        if not remaining:
+            at = datetime.now().isoformat()
+            state.update(complete=True, turn=None, end_time=at)
+            state.pop('deadline', None)
+            announce_complete(tx, at)
+        tx.draft_state = state
+
+
+draft_scheduler = DraftScheduler()
@@ -0,0 +1,137 @@
+# backend/utils/event_feed.py
+# Cross-worker change feed for live updates (Server-Sent Events).
+#
+# Publishers append one JSON line per event to a shared file; every streaming
+# request tails that file, so an event written by any gunicorn worker reaches
+# subscribers in all of them without a broker. An event id is "<inode>:<offset>"
+# (the byte just past its line), which lets a reconnecting client resume exactly
+# where it stopped via Last-Event-ID.
+import json
+import os
+import time
+
+from backend.utils.file_io import file_lock
+
+
+class EventFeed:
+    def __init__(self, path, max_bytes=1_000_000):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.max_bytes = max_bytes
+
+    def publish(self, events):
+        """Appends (channel, type, data) events in one write."""
+        if not events:
+            return
+        now = time.time()
+        payload = ''.join(
+            json.dumps({'channel': channel, 'type': event_type, 'data': data, 'time': now}, separators=(',', ':')) + '\n'
+            for channel, event_type, data in events
+        ).encode('utf-8')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with file_lock(self.lock_path):
+            try:
+                if os.path.getsize(self.path) > self.max_bytes:
+                    # Followers notice the new inode and finish the old file first
+                    os.replace(self.path, self.path + '.1')
+            except OSError:
+                pass
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload)
+            finally:
+                os.close(fd)
+
+    def follow(self, channels, last_event_id=None, poll_interval=0.5, heartbeat=10, max_duration=25):
+        """Yields (event_id, event) for events on `channels`, or (None, None) as a
+        keep-alive every `heartbeat` seconds, until `max_duration` seconds have passed.
+
+        Without a last_event_id only events published from now on are delivered;
+        pass position() taken when a page was rendered to not miss any in between.
+        """
+        channels = set(channels)
+        f, inode = self._open()
+        if f is not None:
+            resume_inode, resume_offset = _parse_event_id(last_event_id)
+            if resume_inode == inode and resume_offset <= os.fstat(f.fileno()).st_size:
+                f.seek(resume_offset)
+            elif resume_inode is None:
+                f.seek(0, os.SEEK_END)
+            # Otherwise the feed was rotated since; replay the current file from the start
+
+        deadline = time.monotonic() + max_duration
+        last_sent = time.monotonic()
+        buffered = b''
+        try:
+            while time.monotonic() < deadline:
+                if f is None:
+                    f, inode = self._open()
+                delivered = False
+                if f is not None:
+                    chunk = f.read()
+                    if chunk:
+                        buffered += chunk
+                        *lines, buffered = buffered.split(b'\n')
+                        offset = f.tell() - len(buffered)
+                        # Walk back from the end to give each line its end offset
+                        ends = []
+                        for line in reversed(lines):
+                            ends.append(offset)
+                            offset -= len(line) + 1
+                        for line, end in zip(lines, reversed(ends)):
+                            try:
+                                event = json.loads(line)
+                            except ValueError:
+                                continue
+                            if event.get('channel') in channels:
+                                yield f"{inode}:{end}", event
+                                delivered = True
+                    elif not buffered and self._rotated(inode):
+                        f.close()
+                        f, inode = self._open()
+                        continue
+                if delivered:
+                    last_sent = time.monotonic()
+                elif time.monotonic() - last_sent >= heartbeat:
+                    yield None, None
+                    last_sent = time.monotonic()
+                time.sleep(poll_interval)
+        finally:
+            if f is not None:
+                f.close()
+
+    def position(self):
+        """Event id of the current end of the feed."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return "0:0" # Matches no file, so follow() replays whatever gets created
+        return f"{st.st_ino}:{st.st_size}"
+
+    def _open(self):
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return None, None
+        return f, os.fstat(f.fileno()).st_ino
+
+    def _rotated(self, inode):
+        try:
+            return os.stat(self.path).st_ino != inode
+        except OSError:
+            return False
+
+
+def _parse_event_id(event_id):
+    try:
+        inode, offset = str(event_id).split(':')
+        return int(inode), int(offset)
+    except (TypeError, ValueError):
+        return None, 0
+
+
+def format_sse(event_id, event):
+    """Serialises a follow() item as a text/event-stream frame (a comment for keep-alives)."""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,70 @@
+# backend/utils/file_io.py
+# Crash-safe file writes and advisory inter-process locks shared by every JSON store.
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+
+def atomic_write_json(filepath, data, indent=4):
+    """Writes JSON to a temp file in the same directory, fsyncs it and renames it over
+    `filepath`. Readers see either the old file or the new one, never a partial write."""
+    _atomic_write(filepath, 'w', lambda f: json.dump(data, f, indent=indent))
+
+def atomic_write_bytes(filepath, payload):
+    """Same guarantees as atomic_write_json, for binary payloads."""
+    _atomic_write(filepath, 'wb', lambda f: f.write(payload))
+
+def _atomic_write(filepath, mode, write):
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(filepath) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+_held_locks = threading.local()
+
+@contextmanager
+def file_lock(lock_path):
+    """Exclusive advisory lock on `lock_path` (flock), held across processes and threads.
+
+    Re-entrant within a thread, so a locked route can call helpers that lock again.
+    """
+    depths = getattr(_held_locks, 'depths', None)
+    if depths is None:
+        depths = _held_locks.depths = {}
+    if depths.get(lock_path):
+        depths[lock_path] += 1
+        try:
+            yield
+        finally:
+            depths[lock_path] -= 1
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(lock_path)), exist_ok=True)
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        depths[lock_path] = 1
+        try:
+            yield
+        finally:
+            depths[lock_path] = 0
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
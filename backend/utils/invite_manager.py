@@ -2,11 +2,14 @@ import os
 import json
 import uuid
 from datetime import datetime, timedelta
+from backend.utils.file_io import atomic_write_json, file_lock
+from backend.utils.storage import StorageError
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(BASE_DIR, 'data'))
 INVITE_FILE = os.path.join(DATA_DIR, 'invite_links.json')
+INVITE_LOCK_FILE = INVITE_FILE + '.lock'
 
 def ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -16,16 +19,21 @@ def _load_json():
     ensure_data_dir()
     if not os.path.exists(INVITE_FILE):
         return []
-    with open(INVITE_FILE, 'r', encoding='utf-8') as f:
-        try:
+    try:
+        with open(INVITE_FILE, 'r', encoding='utf-8') as f:
             return json.load(f)
-        except json.JSONDecodeError:
-            return []
+    except (ValueError, IOError) as e:
+        # Treating a damaged file as empty would let the next save wipe every invite
+        print(f"Error reading or decoding JSON from {INVITE_FILE}")
+        raise StorageError(f"Could not read {INVITE_FILE}: {e}") from e
 
 def _save_json(data):
     ensure_data_dir()
-    with open(INVITE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4)
+    atomic_write_json(INVITE_FILE, data, indent=4)
+
+def _invite_lock():
+    """Held across each load -> mutate -> save of the invite list."""
+    return file_lock(INVITE_LOCK_FILE)
 
 # ---- Invite Generation ----
 def generate_invite_code():
@@ -43,9 +51,10 @@ def generate_invite_link(created_by='admin', max_uses=5, days_valid=7):
         'max_uses': max_uses,
         'uses': 0
     }
-    invites = _load_json()
-    invites.append(invite)
-    _save_json(invites)
+    with _invite_lock():
+        invites = _load_json()
+        invites.append(invite)
+        _save_json(invites)
     return code
 
 # ---- Validation & Usage ----
@@ -61,12 +70,13 @@ def validate_invite(code):
     return False
 
 def increment_invite_use(code):
-    invites = _load_json()
-    for invite in invites:
-        if invite['code'] == code:
-            invite['uses'] += 1
-            break
-    _save_json(invites)
+    with _invite_lock():
+        invites = _load_json()
+        for invite in invites:
+            if invite['code'] == code:
+                invite['uses'] += 1
+                break
+        _save_json(invites)
 
 def get_invite_data(code):
     invites = _load_json()
@@ -77,12 +87,13 @@ def get_invite_data(code):
 
 def revoke_invite(code):
     """Revoke invite by setting uses = max_uses"""
-    invites = _load_json()
-    for invite in invites:
-        if invite['code'] == code:
-            invite['uses'] = invite['max_uses']
-            break
-    _save_json(invites)
+    with _invite_lock():
+        invites = _load_json()
+        for invite in invites:
+            if invite['code'] == code:
+                invite['uses'] = invite['max_uses']
+                break
+        _save_json(invites)
 
 def get_all_invites():
     return _load_json()
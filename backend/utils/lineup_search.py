@@ -0,0 +1,350 @@
+# backend/utils/lineup_search.py
+# "What if" team generation: the K most balanced lineups for a match under admin
+# constraints (pinned players, players kept apart, exclusions, captains) rather
+# than the single split balance_teams() settles on.
+#
+# The squad is picked as usual, with pinned players and captains first. Each group
+# (a position quota, or the flex players) then gets the list of ways it can be
+# shared between the teams, each with its per-team strength vector precomputed, so
+# scoring a lineup is adding one vector per group. If the groups combine into few
+# enough lineups they are all scored (split across worker processes for large
+# pools) and the ranking is exact; otherwise a constrained swap search, run in the
+# request's own thread for time_budget seconds, collects the best distinct lineups
+# it passes through.
+#
+# The worker processes are one long-lived pool per web worker, started with
+# "spawn": forking a threaded gunicorn worker could copy a lock another thread
+# holds into every child.
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.models.ratings import form_by_id
+from backend.utils.team_generator import (
+    TeamBalance, DEFAULT_TIME_BUDGET, FALLBACK_WINDOW, TEAM_SIZE,
+    select_squad, squad_layout, _group_capacities,
+)
+
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 100
+ENUMERATION_LIMIT = 400_000 # Lineups scored exhaustively (an exact top K)
+POOL_THRESHOLD = 50_000 # Above this, scoring is split across worker processes
+APART_PENALTY = 1e6 # Cost of each kept-apart pair sharing a team during the swap search
+
+
+class LineupSearch:
+    """The best lineups found, most balanced first."""
+
+    def __init__(self, lineups, exhaustive, candidates, elapsed):
+        self.lineups = lineups # TeamBalance per lineup
+        self.exhaustive = exhaustive # True when every lineup was scored
+        self.candidates = candidates
+        self.elapsed = elapsed
+
+    def to_dict(self):
+        return {
+            "lineups": [dict(balance.to_dict(), rank=rank) for rank, balance in enumerate(self.lineups, 1)],
+            "exhaustive": self.exhaustive,
+            "candidates_evaluated": self.candidates,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+        }
+
+
+def top_lineups(players, k=DEFAULT_TOP_K, num_teams=2, team_size=None, pinned=None, apart=(), excluded=(),
+                captains=(), fallback_window=FALLBACK_WINDOW, time_budget=DEFAULT_TIME_BUDGET, seed=None,
+                workers=None):
+    """Returns a LineupSearch with the `k` lineups of least imbalance (then least sum of
+    squared team strengths) that satisfy the constraints:
+
+    pinned     {player_id: team index (0-based)}
+    apart      pairs of player ids that must be on different teams
+    excluded   player ids left out entirely
+    captains   player ids that each lead a different team (pinned to one if not already)
+
+    Raises ValueError when the constraints contradict each other or the squad.
+    """
+    started = time.perf_counter()
+    k = max(1, min(int(k), MAX_TOP_K))
+    num_teams = max(2, int(num_teams))
+    excluded = set(excluded)
+    available = [p for p in players if p.available and p.id not in excluded]
+    by_id = {p.id: p for p in available}
+
+    pinned = dict(pinned or {})
+    captains = list(dict.fromkeys(captains))
+    if len(captains) > num_teams:
+        raise ValueError(f"{len(captains)} captains but only {num_teams} teams.")
+    for captain_id in captains:
+        if captain_id not in pinned:
+            led = {pinned.get(c) for c in captains}
+            pinned[captain_id] = next((t for t in range(num_teams) if t not in led), 0)
+    apart = [tuple(pair) for pair in apart] + list(itertools.combinations(captains, 2))
+
+    for player_id, team in pinned.items():
+        if player_id not in by_id:
+            raise ValueError(f"Pinned player {player_id} is not available.")
+        if not isinstance(team, int) or not 0 <= team < num_teams:
+            raise ValueError(f"Team {team} for player {player_id} is out of range.")
+    for pair in apart:
+        if len(pair) != 2 or pair[0] == pair[1]:
+            raise ValueError(f"Invalid keep-apart pair {list(pair)}.")
+        if pair[0] in pinned and pinned[pair[0]] == pinned.get(pair[1]):
+            raise ValueError(f"Players {pair[0]} and {pair[1]} are pinned to the same team but must be kept apart.")
+
+    if len(available) < num_teams:
+        raise ValueError("Not enough available players to generate teams.")
+    for p in available:
+        p.position = p.position.upper()
+    form = form_by_id(available)
+    groups, flex = select_squad(available, form, team_size or TEAM_SIZE, num_teams, fallback_window,
+                                required_ids=set(pinned))
+    squad, group_of, group_sizes = squad_layout(groups, flex)
+    index = {p.id: i for i, p in enumerate(squad)}
+    if any(player_id not in index for player_id in pinned):
+        raise ValueError("More pinned players and captains than places in the squad.")
+
+    values = [form[p.id] for p in squad]
+    pins = {index[player_id]: team for player_id, team in pinned.items()}
+    apart_idx = [(index[a], index[b]) for a, b in apart if a in index and b in index]
+    capacities = _group_capacities(group_sizes, num_teams)
+    group_members = [[i for i in range(len(squad)) if group_of[i] == g] for g in range(len(group_sizes))]
+    for g, members in enumerate(group_members):
+        for t in range(num_teams):
+            if sum(1 for i in members if pins.get(i) == t) > capacities[g][t]:
+                raise ValueError(f"Too many players of one position pinned to team {t + 1}.")
+
+    # Without pins, lineups that only swap team labels are the same lineup
+    symmetric = not pins
+    keep = k * (math.factorial(num_teams) if symmetric else 1)
+    workers = workers or min(4, os.cpu_count() or 1)
+
+    options = [_group_options(members, capacities[g], values, pins, apart_idx, num_teams)
+               for g, members in enumerate(group_members)]
+    total = math.prod(len(o) for o in options)
+    if total == 0:
+        raise ValueError("No lineup satisfies these constraints.")
+
+    if total <= ENUMERATION_LIMIT:
+        exhaustive, candidates = True, total
+        step = workers if total > POOL_THRESHOLD and workers > 1 else 1
+        jobs = [(options, group_members, apart_idx, num_teams, keep, start, step) for start in range(step)]
+        found = _run(_score_all, jobs, workers)
+    else:
+        # Bounded by time_budget, so it gains nothing from more processes per request
+        exhaustive = False
+        candidates, entries = _swap_search(values, group_members, capacities, pins, apart_idx, num_teams, keep,
+                                           time_budget, seed if seed is not None else random.randrange(1 << 30))
+        found = [entries]
+
+    ranked, seen = [], set()
+    for spread, cost, team_of in sorted(entry for entries in found for entry in entries):
+        teams = tuple(tuple(i for i in range(len(squad)) if team_of[i] == t) for t in range(num_teams))
+        key = tuple(sorted(teams)) if symmetric else teams
+        if key in seen:
+            continue
+        seen.add(key)
+        ranked.append(teams)
+        if len(ranked) == k:
+            break
+
+    elapsed = time.perf_counter() - started
+    lineups = []
+    for rank, teams in enumerate(ranked):
+        strengths = [sum(values[i] for i in members) for members in teams]
+        lineups.append(TeamBalance([[squad[i] for i in members] for members in teams], strengths,
+                                   'exact' if exhaustive else 'local_search', exhaustive and rank == 0, elapsed))
+    return LineupSearch(lineups, exhaustive, candidates, elapsed)
+
+
+def top_lineups_for_match(players, match, captains=None, **constraints):
+    """top_lineups() with the match's team settings; its captains unless others are given."""
+    return top_lineups(players, num_teams=match.num_teams or 2, team_size=match.players_per_team or TEAM_SIZE,
+                       captains=match.captains if captains is None else captains, **constraints)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _worker_pool(workers):
+    """The process pool shared by every request in this process, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _run(fn, jobs, workers):
+    """Runs fn(*job) for every job, in the worker pool when there is more than one."""
+    if len(jobs) == 1:
+        return [fn(*jobs[0])]
+    return list(_worker_pool(workers).map(fn, *zip(*jobs)))
+
+
+def _group_options(members, capacity, values, pins, apart_idx, num_teams):
+    """Every way to share one group between the teams (capacity[t] players to team t,
+    pins respected, kept-apart pairs within the group split), as
+    (strength vector, team per member)."""
+    position = {i: n for n, i in enumerate(members)}
+    inside = [(position[a], position[b]) for a, b in apart_idx if a in position and b in position]
+    options = []
+
+    def place(t, left, team_of):
+        if t == num_teams - 1:
+            chosen = [left]
+        else:
+            free = [n for n in left if pins.get(members[n], t) == t]
+            forced = [n for n in free if members[n] in pins]
+            rest = [n for n in free if members[n] not in pins]
+            if len(forced) > capacity[t]:
+                return
+            chosen = [tuple(sorted(forced + list(c))) for c in itertools.combinations(rest, capacity[t] - len(forced))]
+        for picked in chosen:
+            if t == num_teams - 1 and (len(picked) != capacity[t]
+                                       or any(members[n] in pins and pins[members[n]] != t for n in picked)):
+                continue
+            for n in picked:
+                team_of[n] = t
+            if t == num_teams - 1:
+                if all(team_of[a] != team_of[b] for a, b in inside):
+                    vector = [0.0] * num_teams
+                    for n, team in enumerate(team_of):
+                        vector[team] += values[members[n]]
+                    options.append((tuple(vector), tuple(team_of)))
+            else:
+                picked_set = set(picked)
+                place(t + 1, tuple(n for n in left if n not in picked_set), team_of)
+
+    place(0, tuple(range(len(members))), [0] * len(members))
+    return options
+
+
+def _spread_and_cost(vector):
+    return max(vector) - min(vector), sum(s * s for s in vector)
+
+
+def _score_all(options, group_members, apart_idx, num_teams, keep, start=0, step=1):
+    """Scores every combination of group options (the `start`-th of every `step` prefix)
+    and returns the best `keep` as (spread, cost, team_of)."""
+    slot = {} # squad index -> (group, position in group)
+    for g, members in enumerate(group_members):
+        for n, i in enumerate(members):
+            slot[i] = (g, n)
+    cross = [(slot[a], slot[b]) for a, b in apart_idx if slot[a][0] != slot[b][0]]
+    last_g = len(options) - 1
+    last = options[last_g]
+    last_vectors = [vector for vector, _ in last]
+
+    heap = [] # (-spread, -cost, tiebreak, choice), worst kept lineup on top
+    worst = float('inf')
+    counter = itertools.count()
+    for p, prefix in enumerate(itertools.product(*(range(len(o)) for o in options[:-1]))):
+        if p % step != start:
+            continue
+        base = [0.0] * num_teams
+        for g, choice in enumerate(prefix):
+            for t, s in enumerate(options[g][choice][0]):
+                base[t] += s
+        if num_teams == 2:
+            gap = base[0] - base[1]
+            spreads = [abs(gap + v[0] - v[1]) for v in last_vectors]
+        else:
+            spreads = [max(s) - min(s) for s in ([a + b for a, b in zip(base, v)] for v in last_vectors)]
+        for j, spread in enumerate(spreads):
+            if spread > worst:
+                continue
+            choice = prefix + (j,)
+            if cross and any(options[ga][choice[ga]][1][na] == options[gb][choice[gb]][1][nb]
+                             for (ga, na), (gb, nb) in cross):
+                continue
+            vector = [a + b for a, b in zip(base, last_vectors[j])]
+            spread, cost = _spread_and_cost(vector)
+            entry = (-spread, -cost, next(counter), choice)
+            if len(heap) < keep:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            if len(heap) == keep:
+                worst = -heap[0][0]
+
+    results = []
+    for neg_spread, neg_cost, _, choice in heap:
+        team_of = [0] * sum(len(m) for m in group_members)
+        for g, c in enumerate(choice):
+            for n, team in enumerate(options[g][c][1]):
+                team_of[group_members[g][n]] = team
+        results.append((-neg_spread, -neg_cost, tuple(team_of)))
+    return results
+
+
+def _swap_search(values, group_members, capacities, pins, apart_idx, num_teams, keep, time_budget, seed):
+    """Random restarts of swap hill climbing on the squared team strengths (plus a
+    penalty per kept-apart pair on one team); swaps stay within a group and never move
+    pinned players. Returns (states visited, best `keep` distinct feasible lineups)."""
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + time_budget
+    n = len(values)
+    partners = [[] for _ in range(n)]
+    for a, b in apart_idx:
+        partners[a].append(b)
+        partners[b].append(a)
+    movable = [[i for i in members if i not in pins] for members in group_members]
+
+    best = {} # team_of -> (spread, cost)
+    visited = 0
+    while time.perf_counter() < deadline:
+        team_of = [0] * n
+        for g, members in enumerate(group_members):
+            room = list(capacities[g])
+            for i in members:
+                if i in pins:
+                    team_of[i] = pins[i]
+                    room[pins[i]] -= 1
+            free = list(movable[g])
+            rng.shuffle(free)
+            slots = [t for t in range(num_teams) for _ in range(room[t])]
+            for i, t in zip(free, slots):
+                team_of[i] = t
+        strengths = [0.0] * num_teams
+        for i, t in enumerate(team_of):
+            strengths[t] += values[i]
+        clashes = sum(1 for a, b in apart_idx if team_of[a] == team_of[b])
+
+        while True:
+            visited += 1
+            if not clashes:
+                spread, cost = _spread_and_cost(strengths)
+                best[tuple(team_of)] = (spread, cost)
+            move, move_delta = None, -1e-12
+            for free in movable:
+                for x, i in enumerate(free):
+                    for j in free[x + 1:]:
+                        a, b = team_of[i], team_of[j]
+                        if a == b:
+                            continue
+                        d = values[j] - values[i]
+                        clash_delta = 0
+                        if partners[i] or partners[j]:
+                            clash_delta = (sum(team_of[p] == b for p in partners[i] if p != j)
+                                           - sum(team_of[p] == a for p in partners[i] if p != j)
+                                           + sum(team_of[p] == a for p in partners[j] if p != i)
+                                           - sum(team_of[p] == b for p in partners[j] if p != i))
+                        delta = 2 * d * (strengths[a] - strengths[b]) + 2 * d * d + APART_PENALTY * clash_delta
+                        if delta < move_delta:
+                            move, move_delta = (i, a, j, b, d, clash_delta), delta
+            if move is None or time.perf_counter() >= deadline:
+                break
+            i, a, j, b, d, clash_delta = move
+            clashes += clash_delta
+            team_of[i], team_of[j] = b, a
+            strengths[a] += d
+            strengths[b] -= d
+
+    ranked = heapq.nsmallest(keep, ((spread, cost, team_of) for team_of, (spread, cost) in best.items()))
+    return visited, ranked
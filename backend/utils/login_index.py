@@ -0,0 +1,169 @@
+# backend/utils/login_index.py
+# (normalised name, access-code hash) -> player id, kept in a small JSON file next
+# to the roster so a login is one dict lookup instead of parsing every player:
+#
+#     {"source": <players_signature the index matches>,
+#      "entries": {"<player id>": ["<normalised name>", "<code hash>"], ...}}
+#
+# data_manager updates it under data_lock() whenever it writes players, passing the
+# roster signature from before its write: if the index matched that, the changed
+# entries are patched in; otherwise (or if the roster changed behind our back) it
+# is rebuilt from the stored records. Readers reload it when the file changes; one
+# that finds it stale rebuilds it under data_lock() too, re-checking first in case
+# another worker already has, so concurrent logins never write it at once.
+import hmac
+import json
+import os
+import threading
+from collections import Counter
+
+from backend.models.access_code import hash_access_code
+from backend.models.roster import normalise_name
+from backend.utils.file_io import atomic_write_json
+
+
+def _jsonable(signature):
+    return list(signature) if isinstance(signature, tuple) else signature
+
+def _entry(record):
+    """(name, code hash) of a stored player record; older records may hold the plain code."""
+    code_hash = record.get('access_code_hash')
+    if not code_hash and record.get('access_code'):
+        code_hash = hash_access_code(record['access_code'])
+    return normalise_name(record.get('name')), code_hash
+
+
+class LoginIndex:
+    def __init__(self, path, load_records, signature, write_lock):
+        """`load_records` returns the stored player dicts, `signature` the roster's
+        players_signature(); both are only used to (re)build the index. `write_lock()`
+        is the data_lock() every writer of the index holds."""
+        self.path = path
+        self._load_records = load_records
+        self._signature = signature
+        self._write_lock = write_lock
+        self._lock = threading.Lock()
+        self._file_stat = None
+        self._set({}, None, built=False)
+        self.rebuilds = 0
+
+    def _set(self, entries, source, built=True):
+        self._built = built # False until read or built; a missing roster has source None
+        self._source = _jsonable(source)
+        self._by_id = {pid: tuple(entry) for pid, entry in entries.items()}
+        self._by_name = {}
+        for pid, (name, code_hash) in self._by_id.items():
+            self._by_name.setdefault(name, {})[pid] = code_hash
+        self._hashes = Counter(code_hash for _, code_hash in self._by_id.values())
+
+    def _read_file(self):
+        """Loads the file if another process (or this one) replaced it. Caller holds self._lock."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        stat = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stat == self._file_stat:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._set(data.get('entries', {}), data.get('source'))
+        except (OSError, ValueError, TypeError, AttributeError):
+            print(f"Rebuilding unreadable login index {self.path}")
+            self._set({}, None, built=False)
+        self._file_stat = stat
+
+    def _write_file(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        entries = {pid: list(entry) for pid, entry in self._by_id.items()}
+        atomic_write_json(self.path, {'source': self._source, 'entries': entries}, indent=None)
+        st = os.stat(self.path)
+        self._file_stat = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _rebuild(self, source):
+        records = self._load_records() or []
+        self._set({r['id']: _entry(r) for r in records if isinstance(r, dict) and 'id' in r}, source)
+        self._write_file()
+        self.rebuilds += 1
+
+    def _current(self):
+        """Brings the index up to date with the stored roster. Lock-free (bar self._lock)
+        while it is; a stale index is rebuilt under write_lock()."""
+        with self._lock:
+            self._read_file()
+            if self._built and self._source == _jsonable(self._signature()):
+                return
+        # Same order as the writers: data_lock() first, then self._lock
+        with self._write_lock(), self._lock:
+            self._read_file() # Another worker may have rebuilt it while we waited
+            source = self._signature() # Read before the records, so a racing write only costs another rebuild
+            if not self._built or self._source != _jsonable(source):
+                self._rebuild(source)
+
+    # --- Reads ---
+    def lookup(self, name, code):
+        """The id of the player with this name and code, or None.
+
+        Every player sharing the name is checked with a constant-time comparison,
+        so the time taken doesn't depend on how much of a code was right."""
+        name, code_hash = normalise_name(name), hash_access_code(code)
+        self._current()
+        with self._lock:
+            candidates = list(self._by_name.get(name, {}).items())
+        match = None
+        for player_id, stored_hash in candidates:
+            if hmac.compare_digest(stored_hash or '', code_hash) and match is None:
+                match = player_id
+        return match
+
+    def has(self, player_id):
+        """Whether a stored player has this id, without loading any player."""
+        self._current()
+        with self._lock:
+            return player_id in self._by_id
+
+    def code_in_use(self, code):
+        code_hash = hash_access_code(code)
+        self._current()
+        with self._lock:
+            return self._hashes[code_hash] > 0
+
+    # --- Writes (callers hold data_lock, after writing the roster) ---
+    def apply(self, before, changed=(), removed=()):
+        """Patches in the changed player records and drops removed ids. `before` is
+        the roster signature from just before the write."""
+        with self._lock:
+            self._read_file()
+            source = self._signature()
+            if not self._built or self._source != _jsonable(before):
+                self._rebuild(source)
+                return
+            for player_id in removed:
+                self._drop(player_id)
+            for record in changed:
+                self._drop(record['id'])
+                name, code_hash = self._by_id[record['id']] = _entry(record)
+                self._by_name.setdefault(name, {})[record['id']] = code_hash
+                self._hashes[code_hash] += 1
+            self._source = _jsonable(source)
+            self._write_file()
+
+    def replace(self, records):
+        """The whole roster was rewritten."""
+        with self._lock:
+            self._set({r['id']: _entry(r) for r in records}, self._signature())
+            self._write_file()
+
+    def _drop(self, player_id):
+        entry = self._by_id.pop(player_id, None)
+        if entry is None:
+            return
+        name, code_hash = entry
+        same_name = self._by_name.get(name, {})
+        same_name.pop(player_id, None)
+        if not same_name:
+            self._by_name.pop(name, None)
+        self._hashes[code_hash] -= 1
+        if self._hashes[code_hash] <= 0:
+            del self._hashes[code_hash]
@@ -29,10 +29,10 @@ def save_matches(matches):
     save_matches_data([m.to_dict() for m in matches])
 
 # Function to get a specific match (optional helper)
-def get_match_by_id(match_id):
-    
-    
-    matches = load_matches()
+def get_match_by_id(match_id, matches=None):
+    # Pass `matches` (e.g. tx.matches) to avoid re-reading the store
+    if matches is None:
+        matches = load_matches()
     return next((m for m in matches if m.match_id == match_id), None)
     
     
@@ -42,8 +42,9 @@ def get_match_by_id(match_id):
    # This can be used to associate a draft with the next scheduled match.
    
     
-def get_current_draft_match():
-    matches = load_matches()
+def get_current_draft_match(matches=None):
+    if matches is None:
+        matches = load_matches()
     now = datetime.now()
     
     future_matches = []
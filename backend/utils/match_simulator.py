@@ -0,0 +1,165 @@
+# backend/utils/match_simulator.py
+# Monte-Carlo estimate of how a proposed split would actually play out: every
+# simulated match, each player turns in one of their own recent performances
+# (goals, assists, tackles, saves, rating drawn together from one PerformanceLog),
+# and each side's goals are Poisson around what that performance produces.
+#
+# A side's expected goals for one match:
+#   attack  = goals + ASSIST_WEIGHT * assists + RATING_GOALS * rating   (summed over the side)
+#   defence = tackles + saves                                           (summed over the side)
+#   xG(A)   = attack(A) * (1 + mean defence of the two sides) / (1 + defence(B))
+# so ratings alone give a realistic score line, and an opponent's defending only
+# counts relative to the other side's.
+#
+# Sampling is done a player at a time over a whole chunk of simulations (one
+# list of indices per player, added column-wise), and the chunks are seeded
+# from (seed, chunk number), so a seeded run gives the same answer whether the
+# chunks run in this process or across a ProcessPoolExecutor.
+import itertools
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HISTORY_WINDOW = 20 # Recent matches a player's performances are drawn from
+DEFAULT_SIMULATIONS = 10_000
+MAX_SIMULATIONS = 1_000_000
+CHUNK_SIZE = 2_000 # Simulations per seeded chunk
+POOL_THRESHOLD = 50_000 # Above this, chunks are fanned out to worker processes
+ASSIST_WEIGHT = 0.5
+RATING_GOALS = 0.05 # Goals per rating point, e.g. seven players rated 6 ~ 2.1 goals
+MAX_EXPECTED_GOALS = 30.0
+
+
+class MatchSimulation:
+    """Estimated outcome probabilities for every pairing of the simulated teams."""
+
+    def __init__(self, pairings, expected_goals, simulations, seed, elapsed):
+        self.pairings = pairings # [{"teams": (i, j), "win": p, "draw": p, "loss": p}], from team i's side
+        self.expected_goals = [round(g, 2) for g in expected_goals] # Mean goals per team
+        self.simulations = simulations
+        self.seed = seed
+        self.elapsed = elapsed
+
+    # Two-team accessors, from team 1's side
+    @property
+    def win(self):
+        return self.pairings[0]["win"] if self.pairings else 0.0
+
+    @property
+    def draw(self):
+        return self.pairings[0]["draw"] if self.pairings else 0.0
+
+    @property
+    def loss(self):
+        return self.pairings[0]["loss"] if self.pairings else 0.0
+
+    def to_dict(self):
+        return {
+            "pairings": [dict(p, teams=list(p["teams"])) for p in self.pairings],
+            "expected_goals": self.expected_goals,
+            "simulations": self.simulations,
+            "seed": self.seed,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+        }
+
+
+def performance_samples(player, window=HISTORY_WINDOW):
+    """(attack, defence) per match over the player's last `window` matches, read
+    straight from the history's columns. A player with no history plays to their
+    skill rating."""
+    history = player.match_history
+    if not history:
+        return [RATING_GOALS * (player.skill_rating or 0)], [0]
+    goals, assists, ratings = history.goals[-window:], history.assists[-window:], history.ratings[-window:]
+    tackles, saves = history.tackles[-window:], history.saves[-window:]
+    attack = [(g or 0) + ASSIST_WEIGHT * (a or 0) + RATING_GOALS * (r or 0) for g, a, r in zip(goals, assists, ratings)]
+    defence = [(t or 0) + (s or 0) for t, s in zip(tackles, saves)]
+    return attack, defence
+
+
+def simulate_match(teams, simulations=DEFAULT_SIMULATIONS, seed=None, window=HISTORY_WINDOW, workers=None):
+    """Plays `teams` (lists of Players) against each other `simulations` times.
+
+    Returns a MatchSimulation; runs with the same seed, teams and settings give the
+    same probabilities. An empty team scores nothing and defends nothing.
+    """
+    started = time.perf_counter()
+    simulations = max(1, min(int(simulations), MAX_SIMULATIONS))
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    samples = [[performance_samples(p, window) for p in team] for team in teams]
+
+    chunks = [(samples, seed, c, min(CHUNK_SIZE, simulations - start))
+              for c, start in enumerate(range(0, simulations, CHUNK_SIZE))]
+    workers = workers or 4
+    if simulations > POOL_THRESHOLD and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*chunks)))
+    else:
+        results = [_simulate_chunk(*chunk) for chunk in chunks]
+
+    pairs = list(itertools.combinations(range(len(teams)), 2))
+    totals = {pair: [0, 0, 0] for pair in pairs}
+    goals = [0] * len(teams)
+    for counts, team_goals in results:
+        for pair in pairs:
+            totals[pair] = [a + b for a, b in zip(totals[pair], counts[pair])]
+        goals = [a + b for a, b in zip(goals, team_goals)]
+
+    pairings = [{"teams": pair, "win": round(w / simulations, 4), "draw": round(d / simulations, 4),
+                 "loss": round(l / simulations, 4)} for pair, (w, d, l) in totals.items()]
+    return MatchSimulation(pairings, [g / simulations for g in goals], simulations, seed,
+                           time.perf_counter() - started)
+
+
+def _simulate_chunk(samples, seed, chunk, size):
+    """One seeded chunk: ({(i, j): [wins, draws, losses] for team i}, total goals per team)."""
+    rng = random.Random(seed * 1_000_003 + chunk)
+    attack, defence = [], []
+    for team in samples:
+        team_attack, team_defence = [0.0] * size, [0.0] * size
+        for player_attack, player_defence in team:
+            if len(player_attack) == 1:
+                a, d = player_attack[0], player_defence[0]
+                team_attack = [x + a for x in team_attack]
+                team_defence = [x + d for x in team_defence]
+                continue
+            picks = rng.choices(range(len(player_attack)), k=size) # One performance per simulated match
+            team_attack = [x + player_attack[i] for x, i in zip(team_attack, picks)]
+            team_defence = [x + player_defence[i] for x, i in zip(team_defence, picks)]
+        attack.append(team_attack)
+        defence.append(team_defence)
+
+    counts = {}
+    team_goals = [0] * len(samples)
+    for i, j in itertools.combinations(range(len(samples)), 2):
+        wins = draws = losses = 0
+        for a_i, a_j, d_i, d_j in zip(attack[i], attack[j], defence[i], defence[j]):
+            mean_defence = (d_i + d_j) / 2
+            goals_i = _poisson(rng, a_i * (1 + mean_defence) / (1 + d_j))
+            goals_j = _poisson(rng, a_j * (1 + mean_defence) / (1 + d_i))
+            team_goals[i] += goals_i
+            team_goals[j] += goals_j
+            if goals_i > goals_j:
+                wins += 1
+            elif goals_i == goals_j:
+                draws += 1
+            else:
+                losses += 1
+        counts[(i, j)] = [wins, draws, losses]
+    # Each team's goals averaged over the pairings it played in
+    pairings_per_team = max(1, len(samples) - 1)
+    return counts, [g / pairings_per_team for g in team_goals]
+
+
+def _poisson(rng, mean):
+    """Knuth's multiplication method; fine for the handful of goals in a match."""
+    if mean <= 0:
+        return 0
+    limit = math.exp(-min(mean, MAX_EXPECTED_GOALS))
+    goals, product = 0, rng.random()
+    while product > limit:
+        goals += 1
+        product *= rng.random()
+    return goals
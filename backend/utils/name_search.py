@@ -0,0 +1,144 @@
+# backend/utils/name_search.py
+# In-memory search over player names, built by PlayerRepository once per stored
+# roster version (so adding, removing or renaming a player is picked up with the
+# next write). Matches are ranked in tiers:
+#
+#   0  the whole name            "ann smith" for "Ann Smith"
+#   1  a prefix of the name      "ann s"
+#   2  a prefix of a later word  "smi"
+#   3  anywhere else in the name "mit"
+#   4  fuzzy (opt-in)            "smiht": most of its trigrams are in "smith"
+#
+# Tiers 0-2 come from sorted arrays with bisect, so the best matches cost
+# O(log n + limit) however many players share a prefix. Tier 3 intersects the
+# postings of every 1-3 character gram of the query, shortest first, and only
+# runs when the earlier tiers haven't filled the page. Within a tier, names sort
+# alphabetically.
+import bisect
+import heapq
+import math
+from collections import Counter
+
+from backend.models.roster import normalise_name
+
+GRAM_SIZE = 3
+FUZZY_THRESHOLD = 0.5 # Share of the query's trigrams a fuzzy match must contain
+DEFAULT_LIMIT = 10
+
+
+def search_key(name):
+    """Lower-cased with runs of whitespace collapsed."""
+    return ' '.join(normalise_name(name).split())
+
+def _grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def _padded_trigrams(text):
+    """Trigrams of each word padded on its own, so word starts weigh most."""
+    return {gram for word in text.split() for gram in _grams(f"  {word} ", GRAM_SIZE)}
+
+
+class NameSearch:
+    def __init__(self, players):
+        self.players = list(players) # Shared, read-only Player objects
+        self._keys = [search_key(p.name) for p in self.players]
+        self._full = sorted((key, i) for i, key in enumerate(self._keys))
+        self._words = sorted((word, i) for i, key in enumerate(self._keys) for word in key.split()[1:])
+        self._grams = {} # 1-3 character gram -> indexes of the names containing it
+        self._trigrams = {} # Padded trigram -> indexes, for fuzzy matching
+        for i, key in enumerate(self._keys):
+            for size in range(1, GRAM_SIZE + 1):
+                for gram in _grams(key, size):
+                    self._grams.setdefault(gram, []).append(i)
+            for gram in _padded_trigrams(key):
+                self._trigrams.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.players)
+
+    def _prefixed(self, array, query):
+        """Indexes whose entry in `array` starts with `query`, in alphabetical order."""
+        for k in range(bisect.bisect_left(array, (query,)), len(array)):
+            entry, i = array[k]
+            if not entry.startswith(query):
+                return
+            yield i
+
+    def _containing(self, query):
+        """Indexes of every name containing `query`."""
+        if len(query) <= GRAM_SIZE:
+            return set(self._grams.get(query, ()))
+        postings = sorted((self._grams.get(gram, ()) for gram in _grams(query, GRAM_SIZE)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        found = set(postings[0])
+        for posting in postings[1:]:
+            found.intersection_update(posting)
+            if not found:
+                return found
+        return {i for i in found if query in self._keys[i]} # Shared grams don't guarantee order
+
+    def _similar(self, query, exclude):
+        """(share of the query's trigrams found, index) for names above FUZZY_THRESHOLD."""
+        query_grams = _padded_trigrams(query)
+        # A match contains at least `needed` of the query's trigrams, so it contains one of
+        # the (len - needed + 1) rarest: only their postings produce candidates, and the
+        # commonest few are just membership tests
+        needed = max(1, math.ceil(FUZZY_THRESHOLD * len(query_grams)))
+        postings = sorted((self._trigrams.get(gram, ()) for gram in query_grams), key=len)
+        split = len(postings) - needed + 1
+        shared = Counter(i for posting in postings[:split] for i in posting)
+        common = [set(posting) for posting in postings[split:]]
+        similar = []
+        for i, count in shared.items():
+            if i in exclude:
+                continue
+            score = (count + sum(i in posting for posting in common)) / len(query_grams)
+            if score >= FUZZY_THRESHOLD:
+                similar.append((score, i))
+        return similar
+
+    def search(self, query, limit=DEFAULT_LIMIT, fuzzy=False):
+        """Up to `limit` (player, tier) pairs, best first. An empty query matches nothing."""
+        query = search_key(query)
+        if not query or limit <= 0:
+            return []
+        found, seen = [], set()
+
+        def take(indexes, tier):
+            for i in indexes:
+                if len(found) == limit:
+                    return True
+                if i not in seen:
+                    seen.add(i)
+                    found.append((self.players[i], tier))
+            return len(found) == limit
+
+        full = self._prefixed(self._full, query)
+        exact, prefixed = [], []
+        for i in full: # Whole-name matches sort first among the prefixes
+            if self._keys[i] == query:
+                exact.append(i)
+            else:
+                prefixed.append(i)
+                if len(prefixed) >= limit:
+                    break
+        if take(exact, 0) or take(prefixed, 1):
+            return found
+        if take(self._prefixed(self._words, query), 2):
+            return found
+        rest = self._containing(query) - seen
+        if take(heapq.nsmallest(limit - len(found), rest, key=lambda i: (self._keys[i], i)), 3):
+            return found
+        if fuzzy:
+            ranked = heapq.nsmallest(limit - len(found), self._similar(query, seen),
+                                     key=lambda pair: (-pair[0], len(self._keys[pair[1]]), self._keys[pair[1]], pair[1]))
+            take([i for _, i in ranked], 4)
+        return found
+
+    def matching_ids(self, query):
+        """Ids of every player whose name contains `query`; what the players page filters by."""
+        query = search_key(query)
+        if not query:
+            return {p.id for p in self.players}
+        return {self.players[i].id for i in self._containing(query)}
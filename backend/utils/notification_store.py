@@ -0,0 +1,352 @@
+# backend/utils/notification_store.py
+# Append-only notification log, kept out of players.json.
+#
+# Every message a player receives is one entry in their log; the inbox shows all
+# of them and the notification bell shows the entries after the player's "cleared"
+# cursor. Clearing and marking read only move a cursor, so no operation rewrites
+# existing messages. Changes are applied as batches of ops:
+#
+#     (player_id, 'add', notification_dict)
+#     (player_id, 'clear', None)   # bell starts after the current last entry
+#     (player_id, 'read', None)    # everything up to the current last entry is read
+#     (player_id, 'drop', None)    # player deleted: forget their log
+#
+# Each player's entries are also kept ordered by (timestamp, seq) as they are
+# written, so listing and paging never sort.
+import json
+import os
+import threading
+from bisect import bisect_left, insort
+
+from backend.utils.file_io import file_lock
+
+
+BOXES = ('inbox', 'notifications', 'unread')
+
+
+class NotificationStore:
+    """View logic shared by the backends. Subclasses provide _state(), _entries()
+    (append order) and _timeline() (newest first by timestamp)."""
+
+    def inbox(self, player_id):
+        """Every message the player has received, oldest first."""
+        return [entry for _, _, entry in reversed(self._timeline(player_id, 0))]
+
+    def notifications(self, player_id):
+        """Messages since the last clear, oldest first, with 'read' set from the read cursor."""
+        _, cleared, read = self._state(player_id)
+        entries = []
+        for seq, _, entry in reversed(self._timeline(player_id, cleared)):
+            if seq < read:
+                entry['read'] = True
+            entries.append(entry)
+        return entries
+
+    def page(self, player_id, box='inbox', before=None, before_seq=None, limit=20):
+        """Newest-first page of 'inbox', 'notifications' or 'unread'.
+
+        `before`/`before_seq` come from the previous page's next_cursor; a bare
+        `before` timestamp returns entries strictly older than it. Returns
+        (entries, next_cursor), with next_cursor None on the last page.
+        """
+        if box not in BOXES:
+            raise ValueError(f"Unknown notification box: {box}")
+        _, cleared, read = self._state(player_id)
+        min_seq = {'inbox': 0, 'notifications': cleared, 'unread': max(cleared, read)}[box]
+        if before is not None and before_seq is None:
+            before_seq = -1
+        rows = self._timeline(player_id, min_seq, before, before_seq, limit + 1)
+        more = len(rows) > limit
+        rows = rows[:limit]
+        entries = []
+        for seq, _, entry in rows:
+            if box != 'inbox' and seq < read:
+                entry['read'] = True
+            entries.append(entry)
+        next_cursor = {'before': rows[-1][1], 'before_seq': rows[-1][0]} if more else None
+        return entries, next_cursor
+
+    def counts(self, player_id):
+        """Message counts from the cursors alone; no entries are read."""
+        count, cleared, read = self._state(player_id)
+        return {
+            'inbox': count,
+            'notifications': count - cleared,
+            'unread': count - max(cleared, read),
+        }
+
+    def export(self, player_id):
+        """(entries, cleared, read) for copying a player's log to another store."""
+        _, cleared, read = self._state(player_id)
+        return self._entries(player_id, 0), cleared, read
+
+    def import_player(self, player_id, entries, cleared=0, read=0):
+        """Appends a pre-built log for one player (migrations only). Cursors are
+        relative to `entries`, so this must be called before the player has a log."""
+        ops = [(player_id, 'add', entry) for entry in entries[:cleared]]
+        if cleared:
+            ops.append((player_id, 'clear', None))
+        if read > cleared:
+            ops.extend((player_id, 'add', entry) for entry in entries[cleared:read])
+            ops.append((player_id, 'read', None))
+        ops.extend((player_id, 'add', entry) for entry in entries[max(cleared, read):])
+        self.apply(ops)
+
+
+class JsonlNotificationStore(NotificationStore):
+    """One JSON line per op in a shared log file, plus an in-memory per-player index
+    of byte offsets. Each process tails the file from where it last stopped, so
+    appends by other workers show up without rescanning."""
+
+    name = 'json'
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.lock_path = log_path + '.lock'
+        self._lock = threading.Lock()
+        self._reset_index()
+
+    def _reset_index(self):
+        self._indexed_bytes = 0
+        self._inode = None
+        # player_id -> {'offsets': [...by seq], 'cleared': n, 'read': n,
+        #               'timeline': [(timestamp, seq), ...sorted], every entry (the inbox),
+        #               'since_cleared': the same for seq >= cleared (the bell),
+        #               'unread': and for seq >= max(cleared, read)}
+        # One sorted list per box means a page is a bisect and a slice: no walking
+        # past cleared or read entries, however long the player's log has grown.
+        self._players = {}
+
+    def _catch_up(self):
+        """Indexes any complete lines appended since the last call. Caller holds self._lock."""
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            self._reset_index()
+            return
+        if st.st_ino != self._inode or st.st_size < self._indexed_bytes:
+            self._reset_index() # Log replaced or truncated
+            self._inode = st.st_ino
+        if st.st_size == self._indexed_bytes:
+            return
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._indexed_bytes)
+            offset = self._indexed_bytes
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break # Partial trailing line; a writer is mid-append
+                try:
+                    self._index_record(json.loads(line), offset)
+                except (ValueError, KeyError, TypeError):
+                    print(f"Skipping unreadable notification record at byte {offset} of {self.log_path}")
+                offset += len(line)
+            self._indexed_bytes = offset
+
+    def _index_record(self, record, offset):
+        player_id = record['p']
+        if 'drop' in record:
+            self._players.pop(player_id, None)
+            return
+        state = self._players.get(player_id)
+        if state is None:
+            state = self._players[player_id] = {'offsets': [], 'cleared': 0, 'read': 0,
+                                                'timeline': [], 'since_cleared': [], 'unread': []}
+        if 'add' in record:
+            key = (_timestamp_key(record['add']), len(state['offsets']))
+            for box in ('timeline', 'since_cleared', 'unread'):
+                insort(state[box], key)
+            state['offsets'].append(offset)
+        elif 'clear' in record:
+            # Cursors only move forward in practice; rebuild from the full timeline if not
+            source = state['since_cleared'] if record['clear'] >= state['cleared'] else state['timeline']
+            state['cleared'] = record['clear']
+            state['since_cleared'] = [key for key in source if key[1] >= state['cleared']]
+            state['unread'] = [key for key in state['since_cleared'] if key[1] >= state['read']]
+        elif 'read' in record:
+            state['read'] = record['read']
+            state['unread'] = [key for key in state['since_cleared'] if key[1] >= state['read']]
+
+    def _state(self, player_id):
+        with self._lock:
+            self._catch_up()
+            state = self._players.get(player_id)
+            if not state:
+                return 0, 0, 0
+            return len(state['offsets']), state['cleared'], state['read']
+
+    def _entries(self, player_id, start):
+        with self._lock:
+            self._catch_up()
+            state = self._players.get(player_id)
+            offsets = state['offsets'][start:] if state else []
+        return self._read_at(offsets)
+
+    def _timeline(self, player_id, min_seq, before=None, before_seq=None, limit=None):
+        with self._lock:
+            self._catch_up()
+            state = self._players.get(player_id)
+            if not state:
+                return []
+            if min_seq == 0:
+                timeline = state['timeline']
+            elif min_seq == state['cleared']:
+                timeline = state['since_cleared']
+            elif min_seq == max(state['cleared'], state['read']):
+                timeline = state['unread']
+            else: # A cursor moved since the caller read it
+                timeline = [key for key in state['timeline'] if key[1] >= min_seq]
+            end = bisect_left(timeline, (before, before_seq)) if before is not None else len(timeline)
+            start = 0 if limit is None else max(0, end - limit)
+            rows = [(seq, timestamp, state['offsets'][seq]) for timestamp, seq in reversed(timeline[start:end])]
+        entries = self._read_at([offset for _, _, offset in rows])
+        return [(seq, timestamp, entry) for (seq, timestamp, _), entry in zip(rows, entries)]
+
+    def _read_at(self, offsets):
+        if not offsets:
+            return []
+        entries = []
+        with open(self.log_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                entries.append(json.loads(f.readline())['add'])
+        return entries
+
+    def player_ids(self):
+        with self._lock:
+            self._catch_up()
+            return list(self._players)
+
+    def apply(self, ops):
+        """Appends a batch of ops with a single write."""
+        if not ops:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        with file_lock(self.lock_path), self._lock:
+            self._catch_up()
+            counts = {}
+            lines = []
+            for player_id, op, payload in ops:
+                if player_id not in counts:
+                    state = self._players.get(player_id)
+                    counts[player_id] = len(state['offsets']) if state else 0
+                if op == 'add':
+                    record = {'p': player_id, 'add': payload}
+                    counts[player_id] += 1
+                elif op in ('clear', 'read'):
+                    record = {'p': player_id, op: counts[player_id]}
+                elif op == 'drop':
+                    record = {'p': player_id, 'drop': True}
+                    counts[player_id] = 0
+                else:
+                    raise ValueError(f"Unknown notification op: {op}")
+                lines.append(json.dumps(record, separators=(',', ':')) + '\n')
+
+            fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, ''.join(lines).encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._catch_up()
+
+
+class SqliteNotificationStore(NotificationStore):
+    """notification_log / notification_cursors tables in the SqliteStorage database."""
+
+    name = 'sqlite'
+
+    def __init__(self, sqlite_storage):
+        self.storage = sqlite_storage
+
+    def _state(self, player_id):
+        conn = self.storage.connection()
+        count = conn.execute('SELECT COUNT(*) FROM notification_log WHERE player_id = ?', (player_id,)).fetchone()[0]
+        row = conn.execute('SELECT cleared, read FROM notification_cursors WHERE player_id = ?', (player_id,)).fetchone()
+        return count, (row['cleared'] if row else 0), (row['read'] if row else 0)
+
+    def _entries(self, player_id, start):
+        rows = self.storage.connection().execute(
+            'SELECT data FROM notification_log WHERE player_id = ? AND seq >= ? ORDER BY seq', (player_id, start)
+        )
+        return [json.loads(row['data']) for row in rows]
+
+    def _timeline(self, player_id, min_seq, before=None, before_seq=None, limit=None):
+        # Walks idx_notification_log_timeline backwards; no sort step
+        sql = 'SELECT seq, timestamp, data FROM notification_log WHERE player_id = ? AND seq >= ?'
+        params = [player_id, min_seq]
+        if before is not None:
+            sql += ' AND (timestamp < ? OR (timestamp = ? AND seq < ?))'
+            params += [before, before, before_seq]
+        sql += ' ORDER BY timestamp DESC, seq DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        rows = self.storage.connection().execute(sql, params)
+        return [(row['seq'], row['timestamp'], json.loads(row['data'])) for row in rows]
+
+    def player_ids(self):
+        rows = self.storage.connection().execute(
+            'SELECT player_id FROM notification_log UNION SELECT player_id FROM notification_cursors'
+        )
+        return [row['player_id'] for row in rows]
+
+    def apply(self, ops):
+        if not ops:
+            return
+        conn = self.storage.connection()
+        with conn:
+            counts = {}
+            for player_id, op, payload in ops:
+                if player_id not in counts:
+                    counts[player_id] = conn.execute(
+                        'SELECT COUNT(*) FROM notification_log WHERE player_id = ?', (player_id,)
+                    ).fetchone()[0]
+                if op == 'add':
+                    conn.execute(
+                        'INSERT INTO notification_log (player_id, seq, timestamp, data) VALUES (?, ?, ?, ?)',
+                        (player_id, counts[player_id], _timestamp_key(payload), json.dumps(payload))
+                    )
+                    counts[player_id] += 1
+                elif op in ('clear', 'read'):
+                    conn.execute('INSERT OR IGNORE INTO notification_cursors (player_id) VALUES (?)', (player_id,))
+                    column = 'cleared' if op == 'clear' else 'read'
+                    conn.execute(f'UPDATE notification_cursors SET {column} = ? WHERE player_id = ?',
+                                 (counts[player_id], player_id))
+                elif op == 'drop':
+                    conn.execute('DELETE FROM notification_log WHERE player_id = ?', (player_id,))
+                    conn.execute('DELETE FROM notification_cursors WHERE player_id = ?', (player_id,))
+                    counts[player_id] = 0
+                else:
+                    raise ValueError(f"Unknown notification op: {op}")
+
+
+def _timestamp_key(entry):
+    """Sort key for an entry: its ISO timestamp, or '' (oldest) if it has none."""
+    timestamp = entry.get('timestamp') if isinstance(entry, dict) else None
+    return timestamp if isinstance(timestamp, str) else ''
+
+
+def embedded_to_log(notifications, inbox):
+    """Converts the old per-player 'notifications' + 'inbox' lists into (entries, cleared, read).
+
+    add_notification() used to append to both lists, and clearing only emptied the
+    first, so 'notifications' is normally a suffix of 'inbox'. Anything that doesn't
+    line up is appended after the inbox so no message is lost.
+    """
+    def key(entry):
+        return {k: v for k, v in entry.items() if k != 'read'} if isinstance(entry, dict) else entry
+
+    inbox = [e for e in inbox or [] if isinstance(e, dict)]
+    notifications = [e for e in notifications or [] if isinstance(e, dict)]
+    tail = len(notifications)
+    if tail and tail <= len(inbox) and [key(e) for e in inbox[-tail:]] == [key(e) for e in notifications]:
+        entries = inbox[:-tail] + notifications
+    else:
+        entries = inbox + notifications
+    cleared = len(entries) - tail
+    # Read flags only ever got set on the whole list at once, so a read prefix is the cursor
+    read = cleared
+    while read < len(entries) and entries[read].get('read'):
+        read += 1
+    entries = [{k: v for k, v in e.items() if k != 'read'} for e in entries]
+    return entries, cleared, read
@@ -0,0 +1,86 @@
+# backend/utils/player_listing.py
+# The roster in listing order (skill rating, highest first, ties by id) with a
+# bitmap per position and one for availability. PlayerRepository builds one per
+# stored roster version, so the sort happens once per write instead of on every
+# page request; a filtered page is then an AND of two ints and a walk over the set
+# bits from the cursor, i.e. proportional to the page rather than the roster.
+#
+# Pages are keyset-paginated: the cursor is the (rating, id) of the last player
+# sent, found again with bisect, so players added or removed between two requests
+# don't shift the next page the way an offset would.
+import bisect
+
+AVAILABILITY_FILTERS = ('available', 'unavailable')
+
+
+def sort_key(player):
+    return (-(player.skill_rating or 0), player.id)
+
+def encode_cursor(player):
+    return f"{float(player.skill_rating or 0)!r}:{player.id}"
+
+def decode_cursor(cursor):
+    """The sort key a cursor points at. Raises ValueError if it isn't one of ours."""
+    rating, sep, player_id = cursor.partition(':')
+    if not sep or not player_id:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return (-float(rating), player_id)
+
+
+class PlayerListing:
+    def __init__(self, players):
+        self.players = sorted(players, key=sort_key) # Shared, read-only Player objects
+        self._keys = [sort_key(p) for p in self.players]
+        self._all = (1 << len(self.players)) - 1
+        self._by_position = {}
+        self._available = 0
+        for i, p in enumerate(self.players):
+            bit = 1 << i
+            position = (p.position or '').upper()
+            self._by_position[position] = self._by_position.get(position, 0) | bit
+            if p.available:
+                self._available |= bit
+
+    def __len__(self):
+        return len(self.players)
+
+    def _mask(self, position=None, availability=None):
+        mask = self._all
+        if position:
+            mask &= self._by_position.get(position.upper(), 0)
+        if availability == 'available':
+            mask &= self._available
+        elif availability == 'unavailable':
+            mask &= ~self._available
+        return mask
+
+    def _indexes(self, mask, start=0):
+        """Positions of the set bits of `mask` from `start` on, in order."""
+        mask >>= start
+        i = start
+        while mask:
+            skip = (mask & -mask).bit_length() - 1 # Zero bits before the next match
+            i += skip
+            yield i
+            mask >>= skip + 1
+            i += 1
+
+    def count(self, position=None, availability=None):
+        return bin(self._mask(position, availability)).count('1')
+
+    def filter(self, position=None, availability=None):
+        """Every matching player, in listing order."""
+        return [self.players[i] for i in self._indexes(self._mask(position, availability))]
+
+    def page(self, limit, after=None, offset=0, position=None, availability=None):
+        """Up to `limit` matching players after the sort key `after` (see decode_cursor),
+        or after skipping `offset` matches. Returns (players, has_more)."""
+        start = bisect.bisect_right(self._keys, after) if after is not None else 0
+        found = []
+        for n, i in enumerate(self._indexes(self._mask(position, availability), start)):
+            if n < offset:
+                continue
+            if len(found) == limit:
+                return found, True
+            found.append(self.players[i])
+        return found, False
@@ -0,0 +1,110 @@
+# backend/utils/player_repository.py
+# Process-wide cache of the roster. Every gunicorn worker keeps one of these, so
+# players are only parsed again when the store changes underneath us.
+import os
+import threading
+
+from backend.utils.player_listing import PlayerListing
+from backend.utils.name_search import NameSearch
+
+
+class PlayerRepository:
+    """Caches Player objects keyed by id and hands out private copies.
+
+    `loader` returns the full list of Player objects from storage and
+    `signature` returns a cheap token (file stat, version counter) that changes
+    whenever the stored roster does.
+    """
+
+    def __init__(self, loader, signature):
+        self._loader = loader
+        self._signature = signature
+        self._lock = threading.Lock()
+        self._cache = None # (signature, ordered players, {id: player}), swapped atomically
+        self._listing = None # (ordered players, PlayerListing) for the cached roster
+        self._name_search = None # (ordered players, NameSearch) for the cached roster
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _current(self):
+        """Returns (players, by_id), reloading first if the store has changed."""
+        # Read the signature *before* loading so a concurrent write can only
+        # make us reload once more, never serve stale data.
+        signature = self._signature()
+        with self._lock:
+            cache = self._cache
+            if cache is not None and cache[0] == signature:
+                self.hits += 1
+                return cache[1], cache[2]
+        # Load outside _lock: callers may already hold data_lock(), so taking the two in
+        # the other order here could deadlock. Two threads missing at once both load and
+        # the later swap wins, which is harmless.
+        players = self._loader()
+        by_id = {p.id: p for p in players}
+        with self._lock:
+            self._cache = (signature, players, by_id)
+            self.misses += 1
+        return players, by_id
+
+    def snapshot(self):
+        """Returns copies of every player; callers may mutate them without touching the cache."""
+        players, _ = self._current()
+        return [p.copy() for p in players]
+
+    def checkout(self):
+        """Returns (copies, {id: cached original}) so a caller can diff its edits later.
+        The originals must be treated as read-only."""
+        players, by_id = self._current()
+        return [p.copy() for p in players], dict(by_id)
+
+    def get(self, player_id):
+        """Returns a copy of one player, or None. Only that player is copied."""
+        _, by_id = self._current()
+        player = by_id.get(player_id)
+        return player.copy() if player else None
+
+    def exists(self, player_id):
+        _, by_id = self._current()
+        return player_id in by_id
+
+    def listing(self):
+        """PlayerListing (rating order plus filter bitmaps) over the cached roster, built
+        once per stored version. Its players are the cached originals: read-only."""
+        players, _ = self._current()
+        with self._lock:
+            cached = self._listing
+            if cached is None or cached[0] is not players:
+                cached = (players, PlayerListing(players))
+                self._listing = cached
+        return cached[1]
+
+    def name_search(self):
+        """NameSearch over the cached roster's names, built once per stored version, so
+        added, removed and renamed players are searchable after the write that saved them."""
+        players, _ = self._current()
+        with self._lock:
+            cached = self._name_search
+            if cached is None or cached[0] is not players:
+                cached = (players, NameSearch(players))
+                self._name_search = cached
+        return cached[1]
+
+    def invalidate(self):
+        """Drops the cache; called after this process writes players."""
+        with self._lock:
+            self._cache = None
+            self._listing = None
+            self._name_search = None
+            self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'pid': os.getpid(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'cached_players': len(self._cache[2]) if self._cache else 0,
+        }
@@ -0,0 +1,89 @@
+# backend/utils/stats_check.py
+# Consistency check for the derived stats saved with each player (Player.derived_stats).
+#
+# The stats are maintained incrementally as matches are logged; this recomputes
+# every value from the raw match history with the reference functions in
+# backend.models.performance and reports any drift. With --fix the stored
+# stats are rewritten from the recomputed values.
+#
+#   python -m backend.utils.stats_check          # report only, exit 1 on drift
+#   python -m backend.utils.stats_check --fix
+import sys
+
+from backend.models.performance import PerformanceLog, recent_form, fallback_scores
+from backend.models.ratings import SKILL_WINDOW
+
+TOLERANCE = 1e-9
+
+
+def expected_stats(p_data):
+    """Derived stats for a stored player record, computed from scratch."""
+    logs = [PerformanceLog.from_dict(log) for log in p_data.get('match_history') or [] if isinstance(log, dict)]
+    return {
+        'matches': len(logs),
+        'recent': [log.rating for log in logs[-SKILL_WINDOW:]],
+        'form': recent_form(logs, p_data.get('skill_rating', 5.0)),
+        'rating_diff': round(logs[-1].rating - logs[-2].rating, 2) if len(logs) >= 2 else 0,
+        'fallback': fallback_scores(logs[-1] if logs else None),
+    }
+
+
+def _same(stored, expected):
+    if isinstance(expected, dict):
+        return isinstance(stored, dict) and stored.keys() == expected.keys() and all(
+            _same(stored[k], v) for k, v in expected.items())
+    if isinstance(expected, list):
+        return isinstance(stored, list) and len(stored) == len(expected) and all(
+            _same(a, b) for a, b in zip(stored, expected))
+    try:
+        return abs(stored - expected) <= TOLERANCE
+    except TypeError:
+        return stored == expected
+
+
+def check_players(players_data):
+    """Returns one report per drifted value: {id, name, field, stored, expected}.
+    A player saved before stats existed reports a single 'stats' entry."""
+    drift = []
+    for p_data in players_data:
+        if not isinstance(p_data, dict):
+            continue
+        expected = expected_stats(p_data)
+        stored = p_data.get('stats')
+        if not isinstance(stored, dict):
+            drift.append({'id': p_data.get('id'), 'name': p_data.get('name'), 'field': 'stats',
+                          'stored': stored, 'expected': expected})
+            continue
+        for field, value in expected.items():
+            if not _same(stored.get(field), value):
+                drift.append({'id': p_data.get('id'), 'name': p_data.get('name'), 'field': field,
+                              'stored': stored.get(field), 'expected': value})
+    return drift
+
+
+def fix_players(players_data):
+    """Rewrites the stats of every player in `players_data` (in place). Returns the count changed."""
+    fixed = 0
+    for p_data in players_data:
+        if isinstance(p_data, dict):
+            expected = expected_stats(p_data)
+            if not _same(p_data.get('stats'), expected):
+                p_data['stats'] = expected
+                fixed += 1
+    return fixed
+
+
+if __name__ == '__main__':
+    from backend.utils.data_manager import data_lock, get_storage
+    fix = '--fix' in sys.argv[1:]
+    with data_lock():
+        players_data = get_storage().load_players()
+        drift = check_players(players_data)
+        for entry in drift:
+            print(f"{entry['name']} ({entry['id']}): {entry['field']} stored {entry['stored']!r}, expected {entry['expected']!r}")
+        if drift and fix:
+            fixed = fix_players(players_data)
+            get_storage().save_players(players_data)
+            print(f"Rewrote stats for {fixed} players.")
+    print(f"Checked {len(players_data)} players: {len(drift)} drifted values.")
+    sys.exit(1 if drift and not fix else 0)
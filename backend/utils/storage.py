@@ -0,0 +1,412 @@
+# backend/utils/storage.py
+# Storage backends behind data_manager. Everything above this layer works with
+# plain dicts (Player.to_dict() / Match.to_dict() shapes), so a backend only has
+# to know how to persist those.
+import json
+import os
+import sqlite3
+import threading
+from backend.utils import compact_format
+from backend.utils.file_io import atomic_write_json, atomic_write_bytes
+from backend.utils.notification_store import SqliteNotificationStore, embedded_to_log
+
+
+PLAYER_LIST_FIELDS = ('match_history', 'notifications', 'inbox')
+PERFORMANCE_FIELDS = ('goals', 'assists', 'tackles', 'saves', 'rating')
+LOG_COLUMNS = 'player_id, seq, match_id, goals, assists, tackles, saves, rating, extra' # _log_to_row order
+
+
+class StorageError(Exception):
+    """Raised when a store exists but can't be read; callers must not overwrite it."""
+
+
+class JsonStorage:
+    """Original backend: one pretty-printed JSON file per aggregate.
+
+    players.json and matches.json can instead be written in the compact binary
+    format (config.json: "storage_format": "compact"). Reads detect the format
+    from the file itself, so switching back and forth needs no migration.
+    """
+
+    name = 'json'
+
+    def __init__(self, data_dir, player_file, match_file, draft_file, config_file):
+        self.data_dir = data_dir
+        self.player_file = player_file
+        self.match_file = match_file
+        self.draft_file = draft_file
+        self.config_file = config_file
+
+    def _load_json(self, filepath, default=None):
+        """Helper function to load JSON data from a file."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        if not os.path.exists(filepath):
+            return default
+        try:
+            with open(filepath, 'rb') as f:
+                payload = f.read()
+            if compact_format.is_compact(payload):
+                return compact_format.loads(payload)
+            return json.loads(payload.decode('utf-8'))
+        except (ValueError, IOError) as e:
+            # Treating a damaged file as empty would let the next save wipe it
+            print(f"Error reading or decoding JSON from {filepath}")
+            raise StorageError(f"Could not read {filepath}: {e}") from e
+
+    def _save_json(self, filepath, data, allow_compact=False):
+        """Helper function to save data to a JSON file (atomically)."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        if allow_compact and self.storage_format() == 'compact':
+            atomic_write_bytes(filepath, compact_format.dumps(data))
+        else:
+            atomic_write_json(filepath, data, indent=4) # Use indent 4 for consistency
+
+    def storage_format(self):
+        """'json' (default) or 'compact', read from config.json at write time."""
+        try:
+            config = self.load_config(default={}) or {}
+        except StorageError:
+            return 'json'
+        return 'compact' if config.get('storage_format') == 'compact' else 'json'
+
+    # --- Players ---
+    def players_signature(self):
+        """Changes whenever players.json is replaced or rewritten (by any process)."""
+        try:
+            st = os.stat(self.player_file)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def load_players(self):
+        return self._load_json(self.player_file, default=[])
+
+    def save_players(self, players_data):
+        self._save_json(self.player_file, players_data, allow_compact=True)
+
+    def update_players(self, changed_data):
+        """A flat file can't update single records, so this rewrites the roster once."""
+        players_data = self.load_players()
+        if not isinstance(players_data, list):
+            players_data = []
+        positions = {p.get('id'): i for i, p in enumerate(players_data) if isinstance(p, dict)}
+        for player_data in changed_data:
+            if player_data['id'] in positions:
+                players_data[positions[player_data['id']]] = player_data
+            else:
+                positions[player_data['id']] = len(players_data)
+                players_data.append(player_data)
+        self.save_players(players_data)
+
+    def delete_player(self, player_id):
+        players_data = self.load_players() or []
+        remaining = [p for p in players_data if not (isinstance(p, dict) and p.get('id') == player_id)]
+        if len(remaining) != len(players_data):
+            self.save_players(remaining)
+            return True
+        return False
+
+    # --- Matches ---
+    def load_matches(self):
+        return self._load_json(self.match_file, default=[])
+
+    def save_matches(self, matches_data):
+        self._save_json(self.match_file, matches_data, allow_compact=True)
+
+    # --- Draft State ---
+    def load_draft_state(self):
+        return self._load_json(self.draft_file, default={})
+
+    def save_draft_state(self, state):
+        self._save_json(self.draft_file, state)
+
+    # --- Config ---
+    def load_config(self, default=None):
+        return self._load_json(self.config_file, default=default)
+
+    def save_config(self, config):
+        self._save_json(self.config_file, config)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    id TEXT PRIMARY KEY,
+    sort_order INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    position TEXT,
+    skill_rating REAL,
+    available INTEGER NOT NULL DEFAULT 1,
+    is_captain INTEGER NOT NULL DEFAULT 0,
+    access_code TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_players_sort_order ON players(sort_order);
+CREATE INDEX IF NOT EXISTS idx_players_name_lower ON players(name_lower);
+CREATE INDEX IF NOT EXISTS idx_players_access_code ON players(access_code);
+CREATE INDEX IF NOT EXISTS idx_players_skill_rating ON players(skill_rating);
+CREATE INDEX IF NOT EXISTS idx_players_position ON players(position, available);
+
+CREATE TABLE IF NOT EXISTS performance_logs (
+    player_id TEXT NOT NULL REFERENCES players(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    match_id TEXT,
+    goals,
+    assists,
+    tackles,
+    saves,
+    rating,
+    extra TEXT,
+    PRIMARY KEY (player_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_performance_logs_match ON performance_logs(match_id);
+
+CREATE TABLE IF NOT EXISTS notification_log (
+    player_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (player_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_notification_log_timeline ON notification_log(player_id, timestamp, seq);
+
+CREATE TABLE IF NOT EXISTS notification_cursors (
+    player_id TEXT PRIMARY KEY,
+    cleared INTEGER NOT NULL DEFAULT 0,
+    read INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+    match_id TEXT PRIMARY KEY,
+    sort_order INTEGER NOT NULL,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_date ON matches(date);
+
+CREATE TABLE IF NOT EXISTS draft_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('players_version', 0);
+"""
+
+
+class SqliteStorage:
+    """Embedded SQLite backend (WAL mode) with one row per player, log and message."""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+        self._migrate_notification_boxes()
+
+    def _migrate_notification_boxes(self):
+        """Databases from before the notification log kept each player's notifications
+        and inbox as rows of a `notifications` table. Moves them into notification_log
+        (unless the player already has a log there) and drops the table. Runs once."""
+        conn = self._connect()
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notifications'").fetchone():
+            return
+        boxes = {}
+        for row in conn.execute('SELECT player_id, box, data FROM notifications ORDER BY player_id, box, seq'):
+            boxes.setdefault(row['player_id'], {}).setdefault(row['box'], []).append(json.loads(row['data']))
+        log = SqliteNotificationStore(self)
+        for player_id, player_boxes in boxes.items():
+            if not log.counts(player_id)['inbox']:
+                log.import_player(player_id, *embedded_to_log(player_boxes.get('notifications'), player_boxes.get('inbox')))
+        with conn:
+            conn.execute('DROP TABLE notifications')
+        print(f"Moved notifications for {len(boxes)} players into notification_log.")
+
+    def _connect(self):
+        """One connection per thread (and per process, after a fork); sqlite3 connections can't be shared."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def connection(self):
+        """This thread's connection, for stores that share the database (see notification_store)."""
+        return self._connect()
+
+    # --- Players ---
+    def players_signature(self):
+        """Bumped inside every transaction that writes player rows."""
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'players_version'").fetchone()
+        return row['value'] if row else None
+
+    def _bump_players_version(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'players_version'")
+
+    def load_players(self):
+        conn = self._connect()
+        logs = {}
+        for row in conn.execute('SELECT * FROM performance_logs ORDER BY player_id, seq'):
+            logs.setdefault(row['player_id'], []).append(self._log_from_row(row))
+        players_data = []
+        for row in conn.execute('SELECT id, data FROM players ORDER BY sort_order'):
+            p_data = json.loads(row['data'])
+            p_data['match_history'] = logs.get(row['id'], [])
+            players_data.append(p_data)
+        return players_data
+
+    def save_players(self, players_data):
+        conn = self._connect()
+        with conn:
+            keep_ids = [p['id'] for p in players_data]
+            existing = {row['id'] for row in conn.execute('SELECT id FROM players')}
+            stale = existing.difference(keep_ids)
+            conn.executemany('DELETE FROM players WHERE id = ?', [(pid,) for pid in stale])
+            for order, p_data in enumerate(players_data):
+                self._write_player(conn, p_data, order)
+            self._bump_players_version(conn)
+
+    def update_players(self, changed_data):
+        """Row-level update: only the given players' rows are touched."""
+        conn = self._connect()
+        with conn:
+            for player_data in changed_data:
+                row = conn.execute('SELECT sort_order FROM players WHERE id = ?', (player_data['id'],)).fetchone()
+                if row is not None:
+                    order = row['sort_order']
+                else:
+                    order = conn.execute('SELECT COALESCE(MAX(sort_order) + 1, 0) FROM players').fetchone()[0]
+                self._write_player(conn, player_data, order)
+            self._bump_players_version(conn)
+
+    def delete_player(self, player_id):
+        conn = self._connect()
+        with conn:
+            cur = conn.execute('DELETE FROM players WHERE id = ?', (player_id,))
+            self._bump_players_version(conn)
+        return cur.rowcount > 0
+
+    def _write_player(self, conn, p_data, order):
+        player_id = p_data['id']
+        core = {k: v for k, v in p_data.items() if k not in PLAYER_LIST_FIELDS}
+        conn.execute(
+            """INSERT INTO players (id, sort_order, name, name_lower, position, skill_rating,
+                                    available, is_captain, access_code, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(id) DO UPDATE SET
+                   sort_order = excluded.sort_order, name = excluded.name,
+                   name_lower = excluded.name_lower, position = excluded.position,
+                   skill_rating = excluded.skill_rating, available = excluded.available,
+                   is_captain = excluded.is_captain, access_code = excluded.access_code,
+                   data = excluded.data""",
+            (
+                player_id, order, p_data.get('name', ''), str(p_data.get('name', '')).strip().lower(),
+                p_data.get('position'), p_data.get('skill_rating'),
+                1 if p_data.get('available', True) else 0, 1 if p_data.get('is_captain') else 0,
+                p_data.get('access_code_hash'), json.dumps(core), # Column predates hashing; holds the hash
+            )
+        )
+
+        # Logs are nearly always appended, so only rows past the stored ones are written;
+        # a stored row is rewritten only if that log actually changed
+        history = [log for log in p_data.get('match_history') or [] if isinstance(log, dict)]
+        rows = [self._log_to_row(player_id, seq, log) for seq, log in enumerate(history)]
+        stored = [tuple(row) for row in conn.execute(
+            f'SELECT {LOG_COLUMNS} FROM performance_logs WHERE player_id = ? ORDER BY seq', (player_id,)
+        )]
+        conn.execute('DELETE FROM performance_logs WHERE player_id = ? AND seq >= ?', (player_id, len(rows)))
+        conn.executemany(
+            f'INSERT OR REPLACE INTO performance_logs ({LOG_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [row for row, old in zip(rows, stored) if row != old] + rows[len(stored):]
+        )
+
+    @staticmethod
+    def _log_to_row(player_id, seq, log):
+        extra = {k: v for k, v in log.items() if k not in PERFORMANCE_FIELDS and k != 'match_id'}
+        return (
+            player_id, seq, log.get('match_id'),
+            *(log.get(field, 0) for field in PERFORMANCE_FIELDS),
+            json.dumps(extra) if extra else None,
+        )
+
+    @staticmethod
+    def _log_from_row(row):
+        log = {field: row[field] for field in PERFORMANCE_FIELDS}
+        log['match_id'] = row['match_id']
+        if row['extra']:
+            log.update(json.loads(row['extra']))
+        return log
+
+    # --- Matches ---
+    def load_matches(self):
+        conn = self._connect()
+        return [json.loads(row['data']) for row in conn.execute('SELECT data FROM matches ORDER BY sort_order')]
+
+    def save_matches(self, matches_data):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM matches')
+            conn.executemany(
+                'INSERT OR REPLACE INTO matches (match_id, sort_order, date, data) VALUES (?, ?, ?, ?)',
+                [(m.get('match_id'), order, m.get('date'), json.dumps(m)) for order, m in enumerate(matches_data)]
+            )
+
+    # --- Draft State ---
+    def load_draft_state(self):
+        row = self._connect().execute('SELECT data FROM draft_state WHERE id = 1').fetchone()
+        return json.loads(row['data']) if row else {}
+
+    def save_draft_state(self, state):
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO draft_state (id, data) VALUES (1, ?)', (json.dumps(state),))
+
+    # --- Config ---
+    def load_config(self, default=None):
+        rows = self._connect().execute('SELECT key, value FROM config').fetchall()
+        if not rows:
+            return default
+        return {row['key']: json.loads(row['value']) for row in rows}
+
+    def save_config(self, config):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM config')
+            conn.executemany('INSERT INTO config (key, value) VALUES (?, ?)',
+                             [(key, json.dumps(value)) for key, value in config.items()])
+
+
+def import_json_to_sqlite(json_storage, sqlite_storage):
+    """One-shot copy of every JSON store into a SQLite database. Returns row counts."""
+    players_data = json_storage.load_players() or []
+    players_data = [p for p in players_data if isinstance(p, dict) and 'id' in p and 'name' in p]
+    matches_data = [m for m in json_storage.load_matches() or [] if isinstance(m, dict)]
+
+    sqlite_storage.save_players(players_data)
+    sqlite_storage.save_matches(matches_data)
+    sqlite_storage.save_draft_state(json_storage.load_draft_state() or {})
+    config = json_storage.load_config()
+    if config:
+        sqlite_storage.save_config(config)
+
+    return {
+        'players': len(players_data),
+        'performance_logs': sum(len(p.get('match_history') or []) for p in players_data),
+        'matches': len(matches_data),
+    }
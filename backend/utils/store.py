@@ -0,0 +1,199 @@
+# backend/utils/store.py
+# Unit of work for route handlers:
+#
+#     with store.transaction() as tx:
+#         player = tx.player(player_id)
+#         player.available = False
+#         state = tx.draft_state
+#
+# Each aggregate is loaded at most once per transaction, only the stores that
+# actually changed are written (once) on commit, and nothing is written if the
+# block raises. The whole block runs under data_lock(), so open one only on
+# write paths: GET handlers (and a POST's form validation) read through
+# load_players()/player_repository and the other loaders, then re-check whatever
+# they validated against tx.* once inside the block.
+import copy
+import threading
+from contextlib import contextmanager
+
+from backend.models.match import Match
+from backend.models.roster import Roster
+from backend.utils.draft_engine import DraftError
+from backend.utils.data_manager import (
+    data_lock, player_repository, update_players, delete_player, flush_notifications,
+    load_draft_state, save_draft_state, load_config, save_config,
+    load_matches_data, save_matches_data, event_feed, draft_engine
+)
+
+
+class Transaction:
+    def __init__(self):
+        self._players = None
+        self._originals = {} # id -> cached Player the copy was made from
+        self._removed_ids = set()
+        self._matches = None
+        self._matches_data = None
+        self._draft_state = None
+        self._draft_state_loaded = None
+        self._draft_picks = []
+        self._config = None
+        self._config_loaded = None
+        self._events = []
+        self.rolled_back = False
+
+    # --- Players ---
+    @property
+    def players(self):
+        """The full roster as a Roster, loaded on first access. Mutate the returned Player objects freely."""
+        if self._players is None:
+            players, self._originals = player_repository.checkout()
+            self._players = Roster(players)
+        return self._players
+
+    def player(self, player_id):
+        return self.players.get(player_id)
+
+    def add_player(self, player):
+        self.players.append(player)
+        self._removed_ids.discard(player.id)
+
+    def remove_player(self, player_id):
+        """Removes a player from the roster. Returns False if they didn't exist."""
+        player = self.player(player_id)
+        if not player:
+            return False
+        self._players.remove(player)
+        if player_id in self._originals:
+            self._removed_ids.add(player_id)
+        return True
+
+    def _dirty_players(self):
+        if self._players is None:
+            return []
+        dirty = []
+        for p in self._players:
+            original = self._originals.get(p.id)
+            if original is None or p.has_changes_from(original):
+                dirty.append(p)
+        return dirty
+
+    # --- Matches ---
+    @property
+    def matches(self):
+        if self._matches is None:
+            self._matches_data = load_matches_data()
+            self._matches = []
+            for data in self._matches_data:
+                if isinstance(data, dict):
+                    try:
+                        self._matches.append(Match.from_dict(data))
+                    except Exception as e:
+                        print(f"Error loading match data: {data}. Error: {e}")
+        return self._matches
+
+    def match(self, match_id):
+        return next((m for m in self.matches if m.match_id == match_id), None)
+
+    # --- Draft State ---
+    @property
+    def draft_state(self):
+        if self._draft_state is None:
+            self._draft_state = load_draft_state()
+            self._draft_state_loaded = copy.deepcopy(self._draft_state)
+        return self._draft_state
+
+    @draft_state.setter
+    def draft_state(self, state):
+        self.draft_state # Make sure there's a baseline to diff against
+        self._draft_state = state
+
+    def draft_pick(self, captain_id, player_id, auto=False):
+        """Validates a pick in O(1) and queues it for the pick log. Returns the
+        draft_engine.Pick; raises DraftError if the pick isn't allowed."""
+        if self._draft_picks:
+            raise DraftError("Only one pick per transaction.")
+        pick = draft_engine.plan_pick(captain_id, player_id, auto=auto)
+        self._draft_picks.append(pick)
+        return pick
+
+    # --- Config ---
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = load_config()
+            self._config_loaded = copy.deepcopy(self._config)
+        return self._config
+
+    @config.setter
+    def config(self, config):
+        self.config
+        self._config = config
+
+    # --- Live events ---
+    def publish(self, channel, event_type, data=None):
+        """Queues a live-update event; it is only sent if the transaction commits."""
+        self._events.append((channel, event_type, data or {}))
+
+    # --- Commit ---
+    def rollback(self):
+        """Discards every change made in this transaction; commit() becomes a no-op."""
+        self.rolled_back = True
+
+    def commit(self):
+        """Writes every store that changed, each exactly once."""
+        if self.rolled_back:
+            return
+        dirty_players = self._dirty_players()
+        if dirty_players:
+            update_players(dirty_players)
+        if self._players is not None:
+            # Players whose only change is a new message: an append, no roster rewrite
+            flush_notifications(self._players)
+        for player_id in self._removed_ids:
+            delete_player(player_id)
+
+        if self._matches is not None:
+            matches_data = [m.to_dict() for m in self._matches]
+            if matches_data != self._matches_data:
+                save_matches_data(matches_data)
+
+        if self._draft_picks:
+            draft_engine.record(self._draft_picks) # One appended line per pick
+        if self._draft_state is not None and self._draft_state != self._draft_state_loaded:
+            save_draft_state(self._draft_state)
+
+        if self._config is not None and self._config != self._config_loaded:
+            save_config(self._config)
+
+        # After the writes, so a subscriber that reacts by reloading sees the new state
+        event_feed.publish(self._events)
+
+
+class Store:
+    def __init__(self):
+        self._local = threading.local()
+
+    def current(self):
+        """The transaction open on this thread, if any."""
+        return getattr(self._local, 'tx', None)
+
+    @contextmanager
+    def transaction(self):
+        """Opens a unit of work. Nested calls on the same thread join the outer one."""
+        outer = self.current()
+        if outer is not None:
+            yield outer
+            return
+
+        with data_lock():
+            tx = Transaction()
+            self._local.tx = tx
+            try:
+                yield tx
+                tx.commit()
+            finally:
+                # Rollback is implicit: nothing was written before commit()
+                self._local.tx = None
+
+
+store = Store()
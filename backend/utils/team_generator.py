@@ -1,5 +1,11 @@
+from bisect import bisect_left
 from collections import defaultdict
+import heapq
 import random
+import time
+
+from backend.models.performance import fallback_scores
+from backend.models.ratings import form_by_id
 
 TEAM_SIZE = 7
 POSITION_QUOTA = {
@@ -8,88 +14,371 @@ POSITION_QUOTA = {
     "MID": 1,
     "ATT": 1
 }
+EXACT_SEARCH_LIMIT = 24 # Squads up to this size get a provably optimal split
+DEFAULT_TIME_BUDGET = 0.5 # Seconds of local search for larger squads
+FALLBACK_WINDOW = 1 # Matches averaged when judging a player's fit for another position
 
-def get_best_fallback_player(pos, candidates):
-    if not candidates:
-        return None
-
-    def fallback_score(p):
-        last = p.match_history[-1] if p.match_history else None
-        if not last:
-            return 0
-
-        if pos == "GK":
-            return last.saves + 0.5 * last.rating
-        elif pos == "DEF":
-            return last.tackles + 0.5 * last.rating
-        elif pos == "MID":
-            return last.rating  # general all-rounder
-        elif pos == "ATT":
-            return last.goals + last.assists + 0.5 * last.rating
+def fitness(player, pos, window=FALLBACK_WINDOW):
+    """Fit for `pos`: the fallback score averaged over the last `window` matches."""
+    if window <= 1:
+        return player.fallback_score(pos)
+    logs = player.match_history[-window:]
+    if not logs:
         return 0
+    return sum(fallback_scores(log).get(pos, 0) for log in logs) / len(logs)
+
+
+class FitnessIndex:
+    """Best remaining fallback player per position.
+
+    One max-heap per position, built on first query. Taking a player only adds
+    their id to `removed` (the caller's used-ids set can be passed in directly);
+    stale heap tops are discarded as queries reach them, so a query is O(log n)
+    amortised. Ties go to the player listed first, as with max().
+    """
+
+    def __init__(self, players, window=FALLBACK_WINDOW, removed=None):
+        self.players = list(players)
+        self.window = window
+        self.removed = removed if removed is not None else set()
+        self._heaps = {}
+
+    def _heap(self, pos):
+        heap = self._heaps.get(pos)
+        if heap is None:
+            heap = [(-fitness(p, pos, self.window), order, p) for order, p in enumerate(self.players)]
+            heapq.heapify(heap)
+            self._heaps[pos] = heap
+        return heap
+
+    def best(self, pos):
+        """The highest-scoring player for `pos` not yet removed, or None."""
+        heap = self._heap(pos)
+        while heap and heap[0][2].id in self.removed:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def remove(self, player_id):
+        self.removed.add(player_id)
+
+
+def select_squad(available, form, team_size=None, num_teams=2, fallback_window=FALLBACK_WINDOW, required_ids=()):
+    """Picks who plays: every team's POSITION_QUOTA first (best form in the position,
+    else the best fallback fit over the last fallback_window matches), then the best
+    remaining form up to team_size each. Players in required_ids are picked ahead of
+    everyone else in their position and for the remaining places.
+
+    Returns (groups, flex): groups maps each quota position to the players filling
+    it, flex lists the rest of the squad.
+    """
+    def pick_order(p):
+        return (p.id not in required_ids, -form[p.id])
+
+    by_position = defaultdict(list)
+    for p in available:
+        by_position[p.position].append(p)
+    for group in by_position.values():
+        group.sort(key=pick_order)
 
-    # Return player with best "fit" for that position
-    return max(candidates, key=fallback_score)
+    used_ids = set()
+    fallbacks = FitnessIndex(available, fallback_window, removed=used_ids) # Heaps built only if needed
+    groups = {}
+    for pos, quota in POSITION_QUOTA.items():
+        groups[pos] = []
+        primary = (p for p in by_position.get(pos, []))
+        for _ in range(quota * num_teams):
+            player = next((p for p in primary if p.id not in used_ids), None)
+            if player is None:
+                # No player in this position → fallback logic
+                player = fallbacks.best(pos)
+            if player:
+                groups[pos].append(player)
+                used_ids.add(player.id)
+
+    remaining = sorted((p for p in available if p.id not in used_ids), key=pick_order)
+    open_slots = max(0, (team_size or TEAM_SIZE) * num_teams - len(used_ids))
+    return groups, remaining[:open_slots]
+
+
+class TeamBalance:
+    """Generated teams and how evenly they are matched on total recent form."""
+
+    def __init__(self, teams, strengths, method, optimal, elapsed):
+        self.teams = teams
+        self.strengths = [round(s, 3) for s in strengths]
+        # Gap between the strongest and weakest team
+        self.imbalance = round(max(strengths) - min(strengths), 3) if strengths else 0.0
+        self.method = method # 'exact' or 'local_search'
+        self.optimal = optimal # True when no split of this squad can do better
+        self.elapsed = elapsed
+
+    # Two-team accessors used by the original generator's callers
+    @property
+    def team1(self):
+        return self.teams[0] if self.teams else []
 
+    @property
+    def team2(self):
+        return self.teams[1] if len(self.teams) > 1 else []
 
-def generate_balanced_teams(players):
+    @property
+    def strength1(self):
+        return self.strengths[0] if self.strengths else 0.0
+
+    @property
+    def strength2(self):
+        return self.strengths[1] if len(self.strengths) > 1 else 0.0
+
+    def to_dict(self):
+        return {
+            "teams": [
+                {
+                    "players": [{"id": p.id, "name": p.name, "position": p.position} for p in team],
+                    "strength": strength,
+                }
+                for team, strength in zip(self.teams, self.strengths)
+            ],
+            "imbalance": self.imbalance,
+            "method": self.method,
+            "optimal": self.optimal,
+            "elapsed_ms": round(self.elapsed * 1000, 1),
+        }
+
+
+def balance_teams(players, time_budget=DEFAULT_TIME_BUDGET, seed=None, team_size=None, num_teams=2,
+                  fallback_window=FALLBACK_WINDOW):
+    """Splits the available players into num_teams sides of (at most) team_size
+    (TEAM_SIZE), each with POSITION_QUOTA, minimising the spread in total recent form.
+
+    Two-team squads of up to EXACT_SEARCH_LIMIT players are split by exhaustive
+    meet-in-the-middle search, so the result is optimal; larger squads and three or
+    more teams use swap hill climbing with random restarts for at most `time_budget`
+    seconds.
+    """
+    started = time.perf_counter()
+    num_teams = max(2, int(num_teams))
     available = [p for p in players if p.available]
-    if len(available) < 2:
-        return [], []
+    if len(available) < num_teams:
+        return TeamBalance([[] for _ in range(num_teams)], [0.0] * num_teams, 'exact', True, 0.0)
 
     # Normalize positions
     for p in available:
         p.position = p.position.upper()
+    form = form_by_id(available) # Memoised on each player
 
-    # Group by position
-    position_groups = defaultdict(list)
-    for p in available:
-        position_groups[p.position].append(p)
+    groups, flex = select_squad(available, form, team_size, num_teams, fallback_window)
+    squad, group_of, group_sizes = squad_layout(groups, flex)
+    values = [form[p.id] for p in squad]
 
-    # Sort each group by form
-    for group in position_groups.values():
-        group.sort(key=lambda p: p.recent_form(), reverse=True)
+    if num_teams == 2 and len(squad) <= EXACT_SEARCH_LIMIT:
+        team_of = [0 if first else 1 for first in _exact_split(values, group_of, group_sizes)]
+        method, optimal = 'exact', True
+    else:
+        team_of = _local_search_partition(values, group_of, group_sizes, num_teams, time_budget, random.Random(seed))
+        method, optimal = 'local_search', False
 
-    team1, team2 = [], []
-    score1, score2 = 0, 0
-    used_ids = set()
+    teams = [[] for _ in range(num_teams)]
+    strengths = [0.0] * num_teams
+    for p, value, t in zip(squad, values, team_of):
+        teams[t].append(p)
+        strengths[t] += value
+    if method == 'local_search' and max(strengths) - min(strengths) < 1e-9:
+        optimal = True
+    return TeamBalance(teams, strengths, method, optimal, time.perf_counter() - started)
 
-    # Step 1: Fill each team with required roles
-    for pos, quota in POSITION_QUOTA.items():
-        for _ in range(quota):
-            for team, score in [(team1, score1), (team2, score2)]:
-                # Try primary position first
-                primary_candidates = [p for p in position_groups.get(pos, []) if p.id not in used_ids]
-                if primary_candidates:
-                    player = primary_candidates.pop(0)
-                else:
-                    # No player in this position → fallback logic
-                    fallback_candidates = [p for p in available if p.id not in used_ids]
-                    player = get_best_fallback_player(pos, fallback_candidates)
-
-                if player:
-                    team.append(player)
-                    used_ids.add(player.id)
-                    if team is team1:
-                        score1 += player.recent_form()
-                    else:
-                        score2 += player.recent_form()
-
-    # Step 2: Fill remaining spots
-    remaining = [p for p in available if p.id not in used_ids]
-    remaining.sort(key=lambda p: p.recent_form(), reverse=True)
-
-    for p in remaining:
-        if len(team1) < TEAM_SIZE and (score1 <= score2 or len(team2) >= TEAM_SIZE):
-            team1.append(p)
-            score1 += p.recent_form()
-            used_ids.add(p.id)
-        elif len(team2) < TEAM_SIZE:
-            team2.append(p)
-            score2 += p.recent_form()
-            used_ids.add(p.id)
-
-        if len(team1) >= TEAM_SIZE and len(team2) >= TEAM_SIZE:
+
+def squad_layout(groups, flex):
+    """Flattens select_squad() output: (squad, group index per player, group sizes).
+    The flex players form the last group."""
+    squad, group_of = [], []
+    for index, members in enumerate(list(groups.values()) + [flex]):
+        squad.extend(members)
+        group_of.extend([index] * len(members))
+    group_sizes = [group_of.count(g) for g in range(len(groups) + 1)]
+    return squad, group_of, group_sizes
+
+
+def balance_teams_for_match(players, match, time_budget=DEFAULT_TIME_BUDGET, seed=None,
+                            fallback_window=FALLBACK_WINDOW):
+    """balance_teams() using the match's num_teams and players_per_team."""
+    return balance_teams(players, time_budget=time_budget, seed=seed,
+                         team_size=match.players_per_team or TEAM_SIZE, num_teams=match.num_teams or 2,
+                         fallback_window=fallback_window)
+
+
+def weakest_position(team, form):
+    """The POSITION_QUOTA position `team` most needs: the one furthest below its quota,
+    else the one with the least total form."""
+    counts, strength = defaultdict(int), defaultdict(float)
+    for p in team:
+        counts[p.position.upper()] += 1
+        strength[p.position.upper()] += form[p.id]
+    short = {pos: quota - counts[pos] for pos, quota in POSITION_QUOTA.items() if counts[pos] < quota}
+    if short:
+        return max(short, key=short.get)
+    return min(POSITION_QUOTA, key=lambda pos: strength[pos])
+
+
+def best_pick(team, remaining, fallback_window=FALLBACK_WINDOW):
+    """The player a draft picks for `team` on its captain's behalf: the best recent form
+    among the remaining players of the team's weakest position, else the best fallback
+    fit for it (as select_squad fills a quota). Returns (player, position)."""
+    remaining = list(remaining)
+    if not remaining:
+        return None, None
+    form = form_by_id(list(team) + remaining)
+    pos = weakest_position(team, form)
+    natural = [p for p in remaining if p.position.upper() == pos]
+    if natural:
+        return max(natural, key=lambda p: form[p.id]), pos
+    return FitnessIndex(remaining, fallback_window).best(pos), pos
+
+
+# --- Split search ---
+# Every group is shared as evenly as possible: each team takes floor or ceil of
+# size/k of it, and team sizes differ by at most one.
+
+def _team1_count_options(group_sizes):
+    n1 = (sum(group_sizes) + 1) // 2
+    options = [[]]
+    for size in group_sizes:
+        options = [o + [c] for o in options for c in sorted({size // 2, (size + 1) // 2})]
+    return [o for o in options if sum(o) == n1]
+
+
+def _group_capacities(group_sizes, num_teams):
+    """capacity[g][t]: how many of group g team t takes. A group's leftover players
+    (size mod k) go to the teams that are smallest so far."""
+    team_totals = [0] * num_teams
+    capacities = []
+    for size in group_sizes:
+        base, extra = divmod(size, num_teams)
+        lucky = set(sorted(range(num_teams), key=lambda t: (team_totals[t], t))[:extra])
+        row = [base + (1 if t in lucky else 0) for t in range(num_teams)]
+        capacities.append(row)
+        team_totals = [a + b for a, b in zip(team_totals, row)]
+    return capacities
+
+
+def _exact_split(values, group_of, group_sizes):
+    """Meet-in-the-middle: enumerates every subset of each half of the squad, keyed by
+    how many of each group it takes (packed into one int), then pairs each left subset
+    with the right subset whose total lands closest to half the squad's strength."""
+    radix, base = [], 1
+    for size in group_sizes:
+        radix.append(base)
+        base *= size + 1
+    targets = [sum(c * r for c, r in zip(option, radix)) for option in _team1_count_options(group_sizes)]
+
+    n = len(values)
+    half = n // 2
+    total = sum(values)
+
+    def enumerate_subsets(indices):
+        subsets = [(0.0, 0, 0)] # (strength, packed group counts, bitmask)
+        for i in indices:
+            value, step, bit = values[i], radix[group_of[i]], 1 << i
+            subsets += [(s + value, code + step, mask | bit) for s, code, mask in subsets]
+        return subsets
+
+    right = defaultdict(list)
+    for subset in enumerate_subsets(range(half, n)):
+        right[subset[1]].append(subset)
+    right_sums = {}
+    for code, subsets in right.items():
+        subsets.sort()
+        right_sums[code] = [s for s, _, _ in subsets]
+
+    best_gap, best_mask = None, 0
+    for left_sum, left_code, left_mask in enumerate_subsets(range(half)):
+        for target in targets:
+            code = target - left_code
+            sums = right_sums.get(code)
+            if sums is None:
+                continue
+            wanted = total / 2 - left_sum
+            i = bisect_left(sums, wanted)
+            for j in (i - 1, i):
+                if 0 <= j < len(sums):
+                    gap = abs(total - 2 * (left_sum + sums[j]))
+                    if best_gap is None or gap < best_gap:
+                        best_gap, best_mask = gap, left_mask | right[code][j][2]
+        if best_gap is not None and best_gap < 1e-9:
             break
+    return [bool(best_mask >> i & 1) for i in range(n)]
+
+
+def _local_search_partition(values, group_of, group_sizes, num_teams, time_budget, rng, patience=50):
+    """Swap hill climbing on the sum of squared team strengths (for two teams, the
+    squared gap). Swapping two players of the same group keeps every quota, so each
+    step takes the best such swap; at a local optimum a few random swaps restart the
+    climb. Stops at the time budget, a perfect split, or after `patience` restarts
+    without a new best."""
+    deadline = time.perf_counter() + time_budget
+    capacities = _group_capacities(group_sizes, num_teams)
+    group_members = [[i for i in range(len(values)) if group_of[i] == g] for g in range(len(group_sizes))]
+
+    team_of = [0] * len(values)
+    strengths = [0.0] * num_teams
+    for g, members in enumerate(group_members):
+        # Greedy start: strongest first, each to the weakest team with room in this group
+        room = list(capacities[g])
+        for i in sorted(members, key=lambda i: -values[i]):
+            t = min((t for t in range(num_teams) if room[t] > 0), key=lambda t: strengths[t])
+            team_of[i] = t
+            room[t] -= 1
+            strengths[t] += values[i]
+
+    def spread(strengths):
+        return max(strengths) - min(strengths)
+
+    def cost(strengths):
+        return sum(s * s for s in strengths)
 
-    return team1, team2
+    best, best_spread = list(team_of), spread(strengths)
+    stale = 0
+    while time.perf_counter() < deadline and best_spread > 1e-9 and stale < patience:
+        # Best single swap. Moving i (team a) and j (team b) with d = v_j - v_i changes
+        # the cost by 2d(s_a - s_b) + 2d^2, smallest when d is closest to (s_b - s_a)/2.
+        move, move_delta = None, -1e-12
+        for members in group_members:
+            by_team = defaultdict(list)
+            for i in members:
+                by_team[team_of[i]].append((values[i], i))
+            for b, side in by_team.items():
+                side.sort()
+                keys = [v for v, _ in side]
+                for a, others in by_team.items():
+                    if a == b:
+                        continue
+                    for value_i, i in others:
+                        wanted = value_i + (strengths[b] - strengths[a]) / 2
+                        k = bisect_left(keys, wanted)
+                        for m in (k - 1, k):
+                            if 0 <= m < len(side):
+                                d = side[m][0] - value_i
+                                delta = 2 * d * (strengths[a] - strengths[b]) + 2 * d * d
+                                if delta < move_delta:
+                                    move, move_delta = (i, a, side[m][1], b, d), delta
+        if move:
+            i, a, j, b, d = move
+            team_of[i], team_of[j] = b, a
+            strengths[a] += d
+            strengths[b] -= d
+            current = spread(strengths)
+            if current < best_spread - 1e-12:
+                best, best_spread, stale = list(team_of), current, 0
+            continue
+        # Local optimum: shake it up with a few random same-group swaps
+        stale += 1
+        for _ in range(3):
+            members = rng.choice(group_members)
+            if len({team_of[i] for i in members}) < 2:
+                continue
+            i = rng.choice(members)
+            j = rng.choice([x for x in members if team_of[x] != team_of[i]])
+            a, b = team_of[i], team_of[j]
+            team_of[i], team_of[j] = b, a
+            strengths[a] += values[j] - values[i]
+            strengths[b] += values[i] - values[j]
+    return best
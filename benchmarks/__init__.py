@@ -0,0 +1,6 @@
+# benchmarks/__init__.py
+# Players hash their access codes on creation, which needs ACCESS_CODE_KEY.
+# The benchmarks only ever use throwaway data, so any key will do.
+import os
+
+os.environ.setdefault('ACCESS_CODE_KEY', 'benchmarks-only')
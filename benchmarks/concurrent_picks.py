@@ -0,0 +1,109 @@
+# benchmarks/concurrent_picks.py
+# Stress test for draft picks: N processes race to pick against the same data
+# directory through store transactions and the draft pick log, then we check
+# nothing was lost. --no-lock runs the old unlocked whole-state rewrite instead.
+#
+#   python -m benchmarks.concurrent_picks --workers 8 --players 400
+#   python -m benchmarks.concurrent_picks --no-lock   # shows the lost updates
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+
+def _pick_worker(worker_id, use_lock, barrier, results):
+    # Imported here so DATA_DIR from the parent is picked up by data_manager
+    from backend.utils.data_manager import (
+        load_draft_state, save_draft_state, load_player, save_player
+    )
+    from backend.utils.store import store
+    barrier.wait()
+    picks = 0
+    while use_lock:
+        # The real path: one transaction per pick, appended to the draft log
+        with store.transaction() as tx:
+            state = load_draft_state()
+            if not state.get('remaining_ids'):
+                results.put(picks)
+                return
+            player_id = state['remaining_ids'][0]
+            tx.draft_pick(state['turn'], player_id)
+            tx.player(player_id).add_notification({"type": "draft_pick", "message": f"Picked by worker {worker_id}"})
+            picks += 1
+    # Unlocked read-modify-write of the whole state, to show the race
+    while True:
+        state = load_draft_state()
+        if not state.get('remaining_ids'):
+            results.put(picks)
+            return
+        player_id = state['remaining_ids'].pop(0)
+        team_key = 'team1_ids' if state['turn'] == state['captain1_id'] else 'team2_ids'
+        state[team_key].append(player_id)
+        state['turn'] = state['captain2_id'] if team_key == 'team1_ids' else state['captain1_id']
+
+        player = load_player(player_id)
+        player.add_notification({"type": "draft_pick", "message": f"Picked by worker {worker_id}"})
+        save_player(player)
+        save_draft_state(state)
+        picks += 1
+
+
+def run(workers, num_players, use_lock):
+    data_dir = tempfile.mkdtemp(prefix='7aside-stress-')
+    os.environ['DATA_DIR'] = data_dir
+
+    from backend.models.player import Player
+    from backend.utils.data_manager import save_players, save_draft_state, load_players, load_draft_state
+
+    captains = [Player(f"Captain {i}", "MID", 5.0, is_captain=True) for i in (1, 2)]
+    pool = [Player(f"Player {i}", "MID", 5.0) for i in range(num_players)]
+    save_players(captains + pool)
+    save_draft_state({
+        'captain1_id': captains[0].id,
+        'captain2_id': captains[1].id,
+        'team1_ids': [],
+        'team2_ids': [],
+        'remaining_ids': [p.id for p in pool],
+        'turn': captains[0].id,
+        'complete': False,
+    })
+
+    ctx = multiprocessing.get_context('fork')
+    barrier = ctx.Barrier(workers)
+    queue = ctx.Queue()
+    procs = [ctx.Process(target=_pick_worker, args=(i, use_lock, barrier, queue)) for i in range(workers)]
+    for proc in procs:
+        proc.start()
+    results = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    state = load_draft_state()
+    picked = state['team1_ids'] + state['team2_ids']
+    notified = sum(1 for p in load_players() if p.notifications)
+
+    problems = []
+    if sum(results) != num_players:
+        problems.append(f"{sum(results)} picks were made for {num_players} players")
+    if len(picked) != num_players or len(set(picked)) != num_players:
+        problems.append(f"draft state records {len(picked)} picks ({len(set(picked))} unique)")
+    if notified != num_players:
+        problems.append(f"{notified} of {num_players} picked players kept their notification")
+
+    print(f"workers={workers} players={num_players} lock={'on' if use_lock else 'off'} data_dir={data_dir}")
+    print(f"picks per worker: {results}")
+    if problems:
+        print("LOST UPDATES: " + "; ".join(problems))
+        return 1
+    print("OK: every pick and notification was persisted exactly once.")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--players', type=int, default=200)
+    parser.add_argument('--no-lock', action='store_true', help='skip data_lock() to demonstrate the race')
+    args = parser.parse_args()
+    sys.exit(run(args.workers, args.players, not args.no_lock))
@@ -0,0 +1,67 @@
+# benchmarks/draft_views.py
+# Resolving a draft's ids to players the way draft_observer_view, draft_final_view
+# and player_page do (both teams, the remaining pool, captains, turn, viewer):
+# a linear get_player scan per id vs Roster lookups. Checks both resolve the
+# same players before timing them.
+#
+#   python -m benchmarks.draft_views                      # 500 players
+#   python -m benchmarks.draft_views --players 2000
+import argparse
+import time
+
+from backend.models.roster import Roster
+from backend.utils.draft_engine import new_draft_state
+from backend.utils.draft_helpers import draft_teams
+from benchmarks.ratings import make_players
+
+
+def linear_get_player(players, player_id):
+    """The per-id scan draft.py and data_manager used to do."""
+    return next((p for p in players if p.id == player_id), None)
+
+
+def view_context(state, lookup):
+    return {
+        'teams': draft_teams(state, lookup),
+        'remaining': [p for pid in state['remaining_ids'] if (p := lookup(pid))],
+        'turn': lookup(state.get('turn')),
+        'viewer': lookup(state['captain1_id']),
+    }
+
+
+def _timed(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    players = make_players(args.players, 5)
+    ids = [p.id for p in players]
+    # Mid-draft: half the pool picked
+    state = new_draft_state(ids[:2], ids[2:])
+    picked = state['remaining_ids'][:len(state['remaining_ids']) // 2]
+    state['team1_ids'], state['team2_ids'] = picked[0::2], picked[1::2]
+    state['remaining_ids'] = state['remaining_ids'][len(picked):]
+
+    linear, expected = _timed(lambda: view_context(state, lambda pid: linear_get_player(players, pid)), args.repeat)
+    # A fresh Roster each time, as load_players() hands out, so the index build is included
+    indexed, result = _timed(lambda: view_context(state, Roster(players).get), args.repeat)
+    assert result == expected, "Roster lookups resolved different players"
+
+    print(f"{args.players} players, {len(picked)} picked, {len(state['remaining_ids'])} remaining")
+    print(f"{'':28}{'ms':>10}{'speedup':>10}")
+    print(f"{'linear get_player':28}{linear * 1000:>10.2f}{1.0:>10.1f}")
+    print(f"{'Roster (incl. index build)':28}{indexed * 1000:>10.2f}{linear / indexed:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/history_memory.py
+# Memory held by match histories: one __dict__ object per log (the old
+# PerformanceLog), slotted PerformanceLogs in a list, and the columnar
+# MatchHistory with interned match ids.
+#
+#   python -m benchmarks.history_memory                      # 1k players x 500 matches
+#   python -m benchmarks.history_memory --players 10000 --matches 100
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from backend.models.performance import PerformanceLog, MatchHistory
+
+
+class DictLog:
+    """PerformanceLog as it was before __slots__."""
+    def __init__(self, goals, assists, tackles, saves, rating, match_id):
+        self.goals = goals
+        self.assists = assists
+        self.tackles = tackles
+        self.saves = saves
+        self.rating = rating
+        self.match_id = match_id
+
+
+def make_logs(num_players, num_matches, seed=7):
+    rng = random.Random(seed)
+    match_ids = [f"2025-{i // 28 % 12 + 1:02d}-{i % 28 + 1:02d}T19:00:00.{i:06d}" for i in range(num_matches)]
+    return [[{
+        "goals": rng.randint(0, 3), "assists": rng.randint(0, 3), "tackles": rng.randint(0, 8),
+        "saves": rng.randint(0, 6), "rating": round(rng.uniform(3, 10), 1),
+        # Parsed JSON gives every log its own copy of the id string
+        "match_id": "".join(list(match_id)),
+    } for match_id in match_ids] for _ in range(num_players)]
+
+
+def dict_logs(raw):
+    return [[DictLog(**log) for log in logs] for logs in raw]
+
+
+def slotted_logs(raw):
+    return [[PerformanceLog.from_dict(log) for log in logs] for logs in raw]
+
+
+def columnar(raw):
+    return [MatchHistory.from_dicts(logs) for logs in raw]
+
+
+def measure(build, num_players, num_matches):
+    """Bytes still held once the parsed dicts are gone, and the build time."""
+    gc.collect()
+    tracemalloc.start()
+    raw = make_logs(num_players, num_matches)
+    start = time.perf_counter()
+    result = build(raw)
+    elapsed = time.perf_counter() - start
+    del raw
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--matches', type=int, default=500)
+    args = parser.parse_args()
+
+    logs = args.players * args.matches
+    print(f"{args.players} players x {args.matches} matches = {logs} logs")
+    print(f"{'':28}{'MB':>10}{'bytes/log':>12}{'build s':>10}")
+    baseline = None
+    for name, build in (("dict PerformanceLog", dict_logs), ("__slots__ PerformanceLog", slotted_logs),
+                        ("MatchHistory columns", columnar)):
+        size, elapsed = measure(build, args.players, args.matches)
+        baseline = baseline or size
+        print(f"{name:28}{size / 1e6:>10.1f}{size / logs:>12.1f}{elapsed:>10.2f}  ({baseline / size:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/lazy_load.py
+# Cold load_players() latency with lazily decoded sub-collections vs decoding
+# match_history / ratings_received / players_player_ratings up front, followed
+# by what a listing endpoint like /api/players actually reads.
+#
+#   python -m benchmarks.lazy_load                        # 1k players x 200 matches
+#   python -m benchmarks.lazy_load --players 5000 --matches 50
+import argparse
+import os
+import tempfile
+import time
+
+from backend.models.player import Player, LAZY_FIELDS
+from backend.utils.storage import JsonStorage
+from benchmarks.storage_format import make_players
+
+
+def _timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=1000)
+    parser.add_argument('--matches', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    players_data = make_players(args.players, args.matches)
+    for p in players_data:
+        p['ratings_received'] = [{"from": f"{j:08x}", "rating": j % 5 + 1, "match_id": f"match_{j:05d}"} for j in range(20)]
+        p['players_player_ratings'] = list(p['ratings_received'])
+        del p['notifications'], p['inbox']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = JsonStorage(tmp, os.path.join(tmp, 'players.json'), os.path.join(tmp, 'matches.json'),
+                              os.path.join(tmp, 'draft_state.json'), os.path.join(tmp, 'config.json'))
+        storage.save_players(players_data)
+
+        def listing(players):
+            return [(p.id, p.name, p.position, p.skill_rating, p.available) for p in players]
+
+        def build(stored, eager):
+            players = [Player.from_dict(p) for p in stored]
+            if eager: # What from_dict used to do for every player
+                for p in players:
+                    for field in LAZY_FIELDS:
+                        getattr(p, field)
+            snapshot = [p.copy() for p in players] # load_players hands out copies
+            listing(snapshot)
+            return snapshot
+
+        parse = _timed(storage.load_players, args.repeat)
+        stored = storage.load_players() # from_dict never mutates it, so it can be reused
+        eager = _timed(lambda: build(stored, True), args.repeat)
+        lazy = _timed(lambda: build(stored, False), args.repeat)
+        form = _timed(lambda: [p.recent_form() for p in build(stored, False)], args.repeat)
+
+        players = build(stored, False)
+        warm_copy = _timed(lambda: listing([p.copy() for p in players]), args.repeat)
+
+    print(f"{args.players} players x {args.matches} matches, 20 ratings each")
+    print(f"{'':42}{'build s':>10}{'cold s':>10}")
+    print(f"{'parse players.json':42}{'':>10}{parse:>10.3f}")
+    print(f"{'from_dict + copy + listing, eager':42}{eager:>10.3f}{parse + eager:>10.3f}")
+    print(f"{'from_dict + copy + listing, lazy':42}{lazy:>10.3f}{parse + lazy:>10.3f}  ({eager / lazy:.1f}x less work)")
+    print(f"{'  + recent_form for everyone (lazy)':42}{form:>10.3f}{parse + form:>10.3f}  (reads only the last five logs)")
+    print(f"{'cached roster: copy + listing (lazy)':42}{warm_copy:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
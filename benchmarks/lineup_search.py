@@ -0,0 +1,57 @@
+# benchmarks/lineup_search.py
+# Time to get the top-K lineups from lineup_search.top_lineups() for a few squad
+# shapes, with and without constraints. Checks every lineup respects the pins and
+# keep-apart pairs and that the ranking is by imbalance.
+#
+#   python -m benchmarks.lineup_search                    # 60 players, top 50
+#   python -m benchmarks.lineup_search --players 200 --k 20
+import argparse
+import time
+
+from backend.utils.lineup_search import top_lineups
+from benchmarks.ratings import make_players
+
+
+def _check(search, pinned, apart):
+    imbalances = [balance.imbalance for balance in search.lineups]
+    assert imbalances == sorted(imbalances), "lineups are not ranked by imbalance"
+    for balance in search.lineups:
+        team_of = {p.id: t for t, team in enumerate(balance.teams) for p in team}
+        for player_id, team in pinned.items():
+            assert team_of.get(player_id) == team, f"pinned player {player_id} moved"
+        for a, b in apart:
+            assert a not in team_of or b not in team_of or team_of[a] != team_of[b], f"{a} and {b} share a team"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=60)
+    parser.add_argument('--matches', type=int, default=20)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--time-budget', type=float, default=0.5)
+    args = parser.parse_args()
+
+    players = make_players(args.players, args.matches)
+    ids = [p.id for p in players]
+    constrained = dict(pinned={ids[0]: 0, ids[1]: 1}, apart=[(ids[2], ids[3]), (ids[4], ids[5])],
+                       excluded=ids[6:8], captains=[ids[8], ids[9]])
+    cases = [
+        ("2 x 7", dict(num_teams=2, team_size=7)),
+        ("2 x 7, constrained", dict(num_teams=2, team_size=7, **constrained)),
+        ("2 x 11", dict(num_teams=2, team_size=11)),
+        ("3 x 7", dict(num_teams=3, team_size=7)),
+    ]
+
+    print(f"{'':24}{'seconds':>10}{'lineups':>10}{'scored':>12}  search")
+    for label, kwargs in cases:
+        start = time.perf_counter()
+        search = top_lineups(players, k=args.k, time_budget=args.time_budget, seed=1, **kwargs)
+        elapsed = time.perf_counter() - start
+        pinned = dict(kwargs.get('pinned', {}))
+        _check(search, pinned, kwargs.get('apart', []))
+        kind = 'exhaustive' if search.exhaustive else 'swap search'
+        print(f"{label:24}{elapsed:>10.3f}{len(search.lineups):>10}{search.candidates:>12}  {kind}")
+
+
+if __name__ == '__main__':
+    main()
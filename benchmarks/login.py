@@ -0,0 +1,68 @@
+# benchmarks/login.py
+# Player login throughput: the old path (copy the roster, scan it comparing name and
+# code) against one login_index lookup, single-threaded and from a pool of threads
+# hammering the same data directory. Checks both find the same players and that
+# wrong codes are refused.
+#
+#   python -m benchmarks.login                        # 500 players, 2000 logins
+#   python -m benchmarks.login --players 5000 --threads 8
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _timed(fn, attempts, threads):
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda a: fn(*a), attempts))
+    else:
+        results = [fn(*a) for a in attempts]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--logins', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='7aside-login-')
+    # Imported here so DATA_DIR is picked up by data_manager
+    from backend.models.player import Player
+    from backend.models.roster import normalise_name
+    from backend.utils.data_manager import save_players, load_players, login_index
+
+    codes = [f"{i:06X}" for i in range(args.players)]
+    players = [Player(f"Player {i}", "MID", 5.0, player_id=f"{i:08x}", access_code=code)
+               for i, code in enumerate(codes)]
+    save_players(players)
+
+    rng = random.Random(3)
+    attempts = []
+    for _ in range(args.logins):
+        i = rng.randrange(args.players)
+        right = rng.random() < 0.9
+        attempts.append((f" player {i} ", codes[i] if right else "WRONG1"))
+    expected = [f"{int(name.split()[1]):08x}" if code != "WRONG1" else None for name, code in attempts]
+
+    def scan(name, code):
+        name = normalise_name(name)
+        player = next((p for p in load_players() if normalise_name(p.name) == name and p.check_access_code(code)), None)
+        return player.id if player else None
+
+    print(f"{args.players} players, {args.logins} logins")
+    print(f"{'':28}{'seconds':>10}{'logins/s':>12}")
+    for threads in sorted({1, args.threads}):
+        for label, fn in (("roster scan", scan), ("login index", login_index.lookup)):
+            elapsed, results = _timed(fn, attempts, threads)
+            assert results == expected, f"{label} returned the wrong players"
+            print(f"{label + f', {threads} thread(s)':28}{elapsed:>10.3f}{args.logins / elapsed:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
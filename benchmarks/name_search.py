@@ -0,0 +1,58 @@
+# benchmarks/name_search.py
+# Name search at roster sizes well past a real club: the old filter (scan every
+# name for the substring) against NameSearch.search() for typeahead and
+# NameSearch.matching_ids() for the players page. Checks the index finds exactly
+# what the scan finds and that results come back best tier first.
+#
+#   python -m benchmarks.name_search                      # 20000 players
+#   python -m benchmarks.name_search --players 50000
+import argparse
+import random
+import time
+
+from backend.models.player import Player
+from backend.utils.name_search import NameSearch, search_key
+
+SYLLABLES = ["an", "bel", "cor", "da", "el", "fin", "gar", "ha", "is", "jo", "ka", "lu",
+             "mar", "ne", "ol", "pe", "ri", "sa", "tom", "ul", "vi", "wil", "yas", "zo"]
+
+
+def _name(rng):
+    word = lambda: ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))).capitalize()
+    return f"{word()} {word()}"
+
+
+def _timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    players = [Player(_name(rng), "MID", 5.0, player_id=f"{i:08x}") for i in range(args.players)]
+    start = time.perf_counter()
+    index = NameSearch(players)
+    print(f"{args.players} players; index built in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"(once per roster version)")
+
+    print(f"{'query':14}{'scan ms':>10}{'search ms':>12}{'filter ms':>12}{'matches':>10}")
+    for query in ("m", "mar", "marel", "an sa", "tomzo", players[123].name, "marrel"):
+        scan, expected = _timed(lambda: {p.id for p in players if search_key(query) in search_key(p.name)}, 3)
+        search, results = _timed(lambda: index.search(query, limit=10, fuzzy=True), args.repeat)
+        filtered, found = _timed(lambda: index.matching_ids(query), args.repeat)
+        assert found == expected, f"matching_ids({query!r}) differs from the scan"
+        tiers = [tier for _, tier in results]
+        assert tiers == sorted(tiers), f"results for {query!r} are not ranked"
+        assert all(p.id in expected for p, tier in results if tier < 4), f"non-fuzzy result for {query!r} doesn't match"
+        print(f"{query!r:14}{scan * 1000:>10.2f}{search * 1000:>12.3f}{filtered * 1000:>12.3f}{len(expected):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/player_listing.py
+# Cost of serving /api/players pages: the old path (copy the roster, sort it,
+# filter with list comprehensions, slice) against a PlayerListing built once per
+# roster version, walked page by page with keyset cursors. Checks the cursor walk
+# returns exactly the filtered, sorted roster.
+#
+#   python -m benchmarks.player_listing                   # 2000 players, pages of 14
+#   python -m benchmarks.player_listing --players 20000 --per-page 50
+import argparse
+import time
+
+from backend.utils.player_listing import PlayerListing, sort_key, encode_cursor, decode_cursor
+from benchmarks.ratings import make_players
+
+
+def _timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def old_page(players, page, per_page, position, availability):
+    players = [p.copy() for p in players]
+    if position:
+        players = [p for p in players if p.position == position]
+    if availability == 'available':
+        players = [p for p in players if p.available]
+    players.sort(key=sort_key)
+    start = (page - 1) * per_page
+    return players[start:start + per_page]
+
+
+def walk(listing, per_page, position, availability):
+    """Every page in turn, following next_cursor."""
+    found, after = [], None
+    while True:
+        page, has_more = listing.page(per_page, after=after, position=position, availability=availability)
+        found.extend(page)
+        if not has_more:
+            return found
+        after = decode_cursor(encode_cursor(page[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=2000)
+    parser.add_argument('--per-page', type=int, default=14)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    players = make_players(args.players, 5)
+    for i, p in enumerate(players):
+        p.available = i % 3 != 0
+
+    build, listing = _timed(lambda: PlayerListing(players), args.repeat)
+    print(f"{args.players} players; PlayerListing built in {build * 1000:.2f} ms (once per roster version)")
+    print(f"{'':28}{'old ms':>10}{'listing ms':>12}")
+    for label, position, availability in (("all", None, None), ("MID", "MID", None),
+                                          ("GK, available", "GK", "available")):
+        expected = sorted((p for p in players if (not position or p.position == position)
+                           and (availability != 'available' or p.available)), key=sort_key)
+        assert [p.id for p in walk(listing, args.per_page, position, availability)] == [p.id for p in expected], \
+            f"cursor walk over {label} is wrong"
+        old, _ = _timed(lambda: old_page(players, 3, args.per_page, position, availability), args.repeat)
+        cursor = decode_cursor(encode_cursor(expected[2 * args.per_page - 1])) if len(expected) > 2 * args.per_page else None
+        new, _ = _timed(lambda: listing.page(args.per_page, after=cursor, position=position, availability=availability),
+                        args.repeat)
+        print(f"{'page 3, ' + label:28}{old * 1000:>10.2f}{new * 1000:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
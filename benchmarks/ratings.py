@@ -0,0 +1,87 @@
+# benchmarks/ratings.py
+# Roster-wide form / skill update / rating diff: backend.models.performance walking
+# each player's full match history against Player's memoised values on players
+# loaded from their stored records (which carry the derived stats). Checks both
+# give identical results, and that building the form map decoded no history.
+#
+#   python -m benchmarks.ratings                          # 10k players x 500 matches
+#   python -m benchmarks.ratings --players 1000 --matches 50
+import argparse
+import random
+import time
+
+from backend.models.performance import PerformanceLog, update_skill_rating, recent_form
+from backend.models.player import Player
+from backend.models.ratings import form_by_id
+
+
+def make_players(num_players, num_matches, seed=7):
+    rng = random.Random(seed)
+    match_ids = [f"match_{i:05d}" for i in range(num_matches)]
+    players = []
+    for i in range(num_players):
+        # Some players have no or very little history, to cover the fallbacks
+        played = match_ids[:rng.choice([0, 1, 2, num_matches, num_matches])]
+        players.append(Player(
+            name=f"Player {i}", position=rng.choice(["GK", "DEF", "MID", "ATT"]),
+            skill_rating=rng.choice([rng.randint(1, 10), round(rng.uniform(1, 10), 2)]),
+            player_id=f"{i:08x}",
+            match_history=[PerformanceLog(rating=round(rng.uniform(1, 10), 2), match_id=m) for m in played],
+        ))
+    return players
+
+
+def per_player(players):
+    form = [recent_form(p.match_history, p.skill_rating) for p in players]
+    skill = [update_skill_rating(p.skill_rating, p.match_history) for p in players]
+    diffs = []
+    for p in players:
+        history = p.match_history
+        diffs.append(round(history[-1].rating - history[-2].rating, 2) if len(history) >= 2 else 0)
+    return form, skill, diffs
+
+
+def memoised(players):
+    form = form_by_id(players)
+    return [form[p.id] for p in players], [p.skill_update() for p in players], [p.rating_diff for p in players]
+
+
+def _timed(fn, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, default=10_000)
+    parser.add_argument('--matches', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Building {args.players} players x up to {args.matches} matches...")
+    stored = [p.to_dict() for p in make_players(args.players, args.matches)]
+
+    loop_time, expected = _timed(lambda: per_player([Player.from_dict(d) for d in stored]), args.repeat)
+    load_time, _ = _timed(lambda: [Player.from_dict(d) for d in stored], args.repeat)
+    loaded = [Player.from_dict(d) for d in stored]
+    cold_time, result = _timed(lambda: memoised(loaded), 1)
+    warm_time, _ = _timed(lambda: memoised(loaded), args.repeat)
+
+    for label, want, got in zip(("form", "skill", "diff"), expected, result):
+        assert got == want, f"{label} differs from the per-player functions"
+    assert not any(p.is_loaded('match_history') for p, d in zip(loaded, stored) if d['match_history']), \
+        "a match history was decoded"
+    print("Results identical to recent_form / update_skill_rating / rating diff; no history decoded.")
+
+    print(f"{'':32}{'seconds':>10}{'speedup':>10}")
+    print(f"{'load + full-history functions':32}{loop_time:>10.4f}{1.0:>10.1f}")
+    print(f"{'load + memoised, first call':32}{load_time + cold_time:>10.4f}{loop_time / (load_time + cold_time):>10.1f}")
+    print(f"{'memoised, cached':32}{warm_time:>10.4f}{loop_time / warm_time:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/storage_format.py
+# Size and load/save time of players.json in pretty JSON vs the compact format.
+#
+#   python -m benchmarks.storage_format                       # 100, 1k, 10k players x 200 matches
+#   python -m benchmarks.storage_format --players 100 1000 --matches 50
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from backend.utils import compact_format
+from backend.utils.file_io import atomic_write_json, atomic_write_bytes
+
+
+def make_players(num_players, num_matches, seed=7):
+    rng = random.Random(seed)
+    match_ids = [f"match_{i:05d}" for i in range(num_matches)]
+    players = []
+    for i in range(num_players):
+        players.append({
+            "id": f"{i:08x}-0000-4000-8000-000000000000",
+            "name": f"Player {i}",
+            "position": rng.choice(["goalkeeper", "defender", "midfielder", "forward"]),
+            "skill_rating": rng.randint(1, 10),
+            "match_history": [{
+                "goals": rng.randint(0, 3), "assists": rng.randint(0, 3),
+                "tackles": rng.randint(0, 8), "saves": rng.randint(0, 6),
+                "rating": round(rng.uniform(3, 10), 1), "match_id": match_id,
+            } for match_id in match_ids],
+            "available": True, "is_captain": False, "access_code": f"{i:06d}",
+            "ratings_received": [], "notifications": [], "inbox": [],
+            "players_player_ratings": [],
+        })
+    return players
+
+
+def _timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(num_players, num_matches, repeat):
+    players = make_players(num_players, num_matches)
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'players.json')
+        compact_path = os.path.join(tmp, 'players.bin')
+
+        def load_json():
+            with open(json_path, 'rb') as f:
+                return json.loads(f.read().decode('utf-8'))
+
+        def load_compact():
+            with open(compact_path, 'rb') as f:
+                return compact_format.loads(f.read())
+
+        rows = []
+        for label, path, save, load in (
+            ('json', json_path, lambda: atomic_write_json(json_path, players, indent=4), load_json),
+            ('compact', compact_path, lambda: atomic_write_bytes(compact_path, compact_format.dumps(players)), load_compact),
+        ):
+            save_s = _timed(save, repeat)
+            load_s = _timed(load, repeat)
+            rows.append((label, os.path.getsize(path), save_s, load_s))
+
+        assert load_compact() == players, "compact round trip is not lossless"
+
+    print(f"\n{num_players} players x {num_matches} matches")
+    _, base_size, _, base_load = rows[0]
+    for label, size, save_s, load_s in rows:
+        print(f"  {label:8} {size / 1e6:9.2f} MB  save {save_s * 1000:9.1f} ms  load {load_s * 1000:9.1f} ms"
+              f"  ({base_size / size:4.1f}x smaller, load {base_load / load_s:4.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--players', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--matches', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    for num_players in args.players:
+        bench(num_players, args.matches, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+// Live draft updates for the observer page and the captain panel.
+// Listens to /api/draft/stream and patches the elements marked with data-draft-* attributes;
+// events that change the page's structure (start, complete, reset) reload it instead.
+document.addEventListener('DOMContentLoaded', function () {
+    const root = document.querySelector('[data-draft-live]');
+    if (!root || !window.EventSource) return;
+
+    const viewerId = root.dataset.viewerId;
+    const since = root.dataset.since;
+    const source = new EventSource('/api/draft/stream' + (since ? `?last_event_id=${encodeURIComponent(since)}` : ''));
+
+    source.addEventListener('pick', function (e) {
+        const { player, team, remaining } = JSON.parse(e.data);
+
+        root.querySelectorAll(`[data-draft-remaining] [data-player-id="${player.id}"]`).forEach(el => el.remove());
+        root.querySelectorAll(`#playerSelect option[value="${player.id}"]`).forEach(el => el.remove());
+        root.querySelectorAll('[data-draft-remaining-count]').forEach(el => { el.textContent = remaining; });
+
+        root.querySelectorAll(`[data-draft-team="${team}"]`).forEach(list => {
+            // A resumed stream can replay a pick we already rendered
+            if (list.querySelector(`[data-player-id="${player.id}"]`)) return;
+            list.querySelectorAll('[data-empty]').forEach(el => el.remove());
+            const item = document.createElement('li');
+            item.className = 'list-group-item';
+            item.dataset.playerId = player.id;
+            item.textContent = `${player.name} (${player.position})`;
+            list.appendChild(item);
+        });
+    });
+
+    // Timed drafts: count down to the current pick's deadline
+    function showDeadline(el) {
+        const deadline = el.dataset.draftDeadline ? new Date(el.dataset.draftDeadline) : null;
+        el.hidden = !deadline;
+        if (!deadline) return;
+        const seconds = Math.max(0, Math.round((deadline - Date.now()) / 1000));
+        el.textContent = seconds ? `${Math.floor(seconds / 60)}:${String(seconds % 60).padStart(2, '0')} left, then auto-pick` : 'Auto-picking...';
+    }
+    setInterval(() => root.querySelectorAll('[data-draft-deadline]').forEach(showDeadline), 1000);
+
+    source.addEventListener('turn', function (e) {
+        const { turn_id, turn_name, deadline } = JSON.parse(e.data);
+        root.querySelectorAll('[data-draft-turn-name]').forEach(el => { el.textContent = turn_name || 'N/A'; });
+        root.querySelectorAll('[data-draft-deadline]').forEach(el => { el.dataset.draftDeadline = deadline || ''; showDeadline(el); });
+        const myTurn = viewerId && turn_id === viewerId;
+        root.querySelectorAll('[data-my-turn]').forEach(el => { el.hidden = !myTurn; });
+        root.querySelectorAll('[data-not-my-turn]').forEach(el => { el.hidden = myTurn; });
+    });
+
+    ['start', 'complete', 'reset'].forEach(type => {
+        source.addEventListener(type, () => window.location.reload());
+    });
+});
@@ -0,0 +1,26 @@
+// Inbox page: the first page is rendered by the server, older pages load on scroll.
+import { initCursorPager } from "./notifications.js";
+
+function initInbox() {
+    const list = document.getElementById("inboxList");
+    if (!list) return;
+
+    const cursor = list.dataset.before
+        ? { before: list.dataset.before, before_seq: list.dataset.beforeSeq }
+        : null;
+
+    const pager = initCursorPager({
+        endpoint: `/api/inbox/${list.dataset.playerId}`,
+        list,
+        key: "inbox",
+        cursor
+    });
+    // Short first page: fill the screen without waiting for a scroll
+    if (document.body.offsetHeight <= window.innerHeight) pager.loadMore();
+}
+
+if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initInbox);
+} else {
+    initInbox();
+}
@@ -3,9 +3,11 @@ export function initInfiniteScroll({
     containerId,
     renderItem,
     perPage = 14,
+    params = {}, // Extra query filters, e.g. { position: "GK", availability: "available" }
     triggerOffset = 200
 }) {
-    let currentPage = 1;
+    // Keyset pagination: each response's next_cursor is sent back as ?after=
+    let cursor = null;
     let loading = false;
     let hasMore = true;
 
@@ -18,7 +20,9 @@ export function initInfiniteScroll({
         if (loadingIndicator) loadingIndicator.style.display = "block";
 
         try {
-            const res = await fetch(`${endpoint}?page=${currentPage}&per_page=${perPage}`);
+            const query = new URLSearchParams({ ...params, per_page: perPage });
+            if (cursor) query.set("after", cursor);
+            const res = await fetch(`${endpoint}?${query}`);
             const data = await res.json();
 
             data.players.forEach(player => {
@@ -27,12 +31,12 @@ export function initInfiniteScroll({
             });
 
             hasMore = data.has_more;
-            currentPage++;
+            cursor = data.next_cursor;
         } catch (err) {
             console.error("Infinite scroll error:", err);
         }
 
-        loading - false;
+        loading = false;
         if (loadingIndicator) loadingIndicator.style.display = hasMore ? "block" : "none";
     }
 
@@ -43,4 +47,4 @@ export function initInfiniteScroll({
 
     //Initial load
     document.addEventListener("DOMContentLoaded", loadMore);
-}
\ No newline at end of file
+}
@@ -0,0 +1,182 @@
+// Cursor-paged notification lists. The inbox modal loads its notifications here
+// when opened; inbox.js reuses renderNote() and initCursorPager() for the inbox page.
+// While the modal is open, new messages arrive over /api/notifications/<id>/stream;
+// the rest of the time the badge is refreshed by polling the unread count, so an
+// idle page doesn't hold a server connection open.
+
+export function renderNote(note) {
+    const item = document.createElement("li");
+    item.className = "list-group-item";
+
+    const body = document.createElement("div");
+    if (note.type === "rating_received") {
+        body.append(`⭐ ${note.rating}/10 from `, strong(note.from));
+    } else if (note.type === "players_player_rating") {
+        body.append(`🙌 Players' Player rating: ${note.rating}/5 from `, strong(note.from));
+    } else if (note.type === "captain_message") {
+        body.textContent = `📢 ${note.message}`;
+    } else if (note.message) {
+        body.textContent = note.message;
+    } else {
+        body.className = "text-muted";
+        body.textContent = "📌 Unknown message";
+    }
+    item.appendChild(body);
+
+    if (note.comment) {
+        const comment = document.createElement("div");
+        comment.className = "text-muted";
+        comment.textContent = `"${note.comment}"`;
+        item.appendChild(comment);
+    }
+    if (note.timestamp) {
+        const time = document.createElement("div");
+        time.className = "small text-muted mt-1";
+        time.textContent = note.timestamp;
+        item.appendChild(time);
+    }
+    return item;
+}
+
+function strong(text) {
+    const el = document.createElement("strong");
+    el.textContent = text ?? "";
+    return el;
+}
+
+// Appends pages from `endpoint` (newest first) to `list` until next_cursor is null.
+// `cursor` is where to start: undefined for the first page, null if there is nothing more.
+// reset() starts over from the first page; the caller clears `list`.
+export function initCursorPager({
+    endpoint,
+    list,
+    key,
+    cursor,
+    scrollContainer = null,
+    limit = 20,
+    triggerOffset = 200,
+    renderItem = renderNote
+}) {
+    let loading = false;
+    let next = cursor;
+    let generation = 0; // Bumped by reset() so a page still in flight is dropped
+
+    async function loadMore() {
+        if (loading || next === null) return;
+        loading = true;
+        const started = generation;
+
+        const params = new URLSearchParams({ limit });
+        if (next) {
+            params.set("before", next.before);
+            params.set("before_seq", next.before_seq);
+        }
+        try {
+            const sep = endpoint.includes("?") ? "&" : "?";
+            const res = await fetch(`${endpoint}${sep}${params}`);
+            const data = await res.json();
+            if (started === generation) {
+                data[key].forEach(note => list.appendChild(renderItem(note)));
+                next = data.next_cursor;
+            }
+        } catch (err) {
+            console.error("Notification paging error:", err);
+        }
+        if (started === generation) loading = false;
+    }
+
+    function reset() {
+        generation++;
+        loading = false;
+        next = undefined;
+    }
+
+    const target = scrollContainer || window;
+    target.addEventListener("scroll", () => {
+        const nearBottom = scrollContainer
+            ? scrollContainer.scrollTop + scrollContainer.clientHeight >= scrollContainer.scrollHeight - triggerOffset
+            : window.innerHeight + window.scrollY >= document.body.offsetHeight - triggerOffset;
+        if (nearBottom) loadMore();
+    });
+
+    return { loadMore, reset };
+}
+
+const POLL_MS = 30000;
+
+function initNotificationModal() {
+    const list = document.getElementById("notificationList");
+    const modal = document.getElementById("inboxModal");
+    if (!list || !modal) return;
+
+    const empty = document.getElementById("notificationEmpty");
+    const badge = document.getElementById("notificationBadge");
+    let stream = null;
+    let loaded = false;
+    // One pager (and one scroll listener) for the life of the page; reset on close
+    const pager = initCursorPager({
+        endpoint: `/api/notifications/${list.dataset.playerId}?all=1`,
+        list,
+        key: "notifications",
+        scrollContainer: modal.querySelector(".modal-body"),
+        triggerOffset: 50
+    });
+
+    const setCount = n => {
+        if (!badge) return;
+        badge.querySelector("[data-count]").textContent = n;
+        badge.hidden = n === 0;
+    };
+
+    // Badge only: a cheap request every POLL_MS while the modal is closed
+    const pollCount = async () => {
+        if (document.hidden || stream) return;
+        try {
+            const res = await fetch(`/api/notifications/${list.dataset.playerId}/unread_count`);
+            if (res.ok) setCount((await res.json()).notifications);
+        } catch (err) {
+            console.error("Notification count error:", err);
+        }
+    };
+    setInterval(pollCount, POLL_MS);
+
+    const openStream = () => {
+        if (stream || !window.EventSource) return;
+        stream = new EventSource(`/api/notifications/${list.dataset.playerId}/stream`);
+        // Refused (403/429) rather than dropped: fall back to polling the count
+        stream.addEventListener("error", () => {
+            if (stream && stream.readyState === EventSource.CLOSED) stream = null;
+        });
+        stream.addEventListener("notification", e => {
+            if (badge) setCount(Number(badge.querySelector("[data-count]").textContent) + 1);
+            // Only once loaded; otherwise the first page fetch will include it
+            if (loaded) {
+                list.prepend(renderNote(JSON.parse(e.data)));
+                if (empty) empty.hidden = true;
+            }
+        });
+    };
+    modal.addEventListener("hidden.bs.modal", () => {
+        if (stream) stream.close();
+        stream = null;
+        // Messages sent while closed aren't streamed; the next open fetches afresh
+        loaded = false;
+        pager.reset();
+        list.replaceChildren();
+    });
+
+    // Nothing is fetched until the modal is first opened
+    modal.addEventListener("show.bs.modal", async () => {
+        openStream();
+        if (loaded) return;
+        loaded = true;
+        await pager.loadMore();
+        if (empty) empty.hidden = list.children.length > 0;
+    });
+}
+
+if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initNotificationModal);
+} else {
+    initNotificationModal();
+}
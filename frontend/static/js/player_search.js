@@ -0,0 +1,41 @@
+// Players page: suggests names from /api/players/search as you type.
+const DEBOUNCE_MS = 150;
+
+function initPlayerSearch() {
+    const input = document.getElementById("search");
+    const list = document.getElementById("searchSuggestions");
+    if (!input || !list) return;
+
+    let timer = null;
+    let latest = 0;
+
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (!query) {
+            list.replaceChildren();
+            return;
+        }
+        timer = setTimeout(async () => {
+            const request = ++latest;
+            try {
+                const res = await fetch(`/api/players/search?${new URLSearchParams({ q: query, limit: 8, fuzzy: 1 })}`);
+                const data = await res.json();
+                if (request !== latest) return; // A newer keystroke already answered
+                list.replaceChildren(...data.players.map(p => {
+                    const option = document.createElement("option");
+                    option.value = p.name;
+                    return option;
+                }));
+            } catch (err) {
+                console.error("Player search error:", err);
+            }
+        }, DEBOUNCE_MS);
+    });
+}
+
+if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", initPlayerSearch);
+} else {
+    initPlayerSearch();
+}
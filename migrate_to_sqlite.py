@@ -0,0 +1,26 @@
+import os
+from backend.utils.data_manager import (
+    DATA_DIR, PLAYER_FILE, MATCH_FILE, DRAFT_FILE, CONFIG_FILE, SQLITE_FILE, NOTIFICATION_LOG_FILE
+)
+from backend.utils.storage import JsonStorage, SqliteStorage, import_json_to_sqlite
+from backend.utils.notification_store import JsonlNotificationStore, SqliteNotificationStore
+
+def migrate_json_to_sqlite():
+    if os.path.exists(SQLITE_FILE):
+        print(f"ℹ️ {SQLITE_FILE} already exists. Remove it first to re-import.")
+        return
+
+    json_storage = JsonStorage(DATA_DIR, PLAYER_FILE, MATCH_FILE, DRAFT_FILE, CONFIG_FILE)
+    sqlite_storage = SqliteStorage(SQLITE_FILE)
+    counts = import_json_to_sqlite(json_storage, sqlite_storage)
+
+    notification_log = JsonlNotificationStore(NOTIFICATION_LOG_FILE)
+    notification_table = SqliteNotificationStore(sqlite_storage)
+    for player_id in notification_log.player_ids():
+        notification_table.import_player(player_id, *notification_log.export(player_id))
+    print(f"✅ Import complete. {counts['players']} players, {counts['performance_logs']} performance logs "
+          f"and {counts['matches']} matches copied to {SQLITE_FILE}.")
+    print("Set STORAGE_BACKEND=sqlite to start using it.")
+
+if __name__ == "__main__":
+    migrate_json_to_sqlite()